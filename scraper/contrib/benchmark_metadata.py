@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# vim: ai ts=4 sts=4 et sw=4 nu
+
+"""benchmark the metadata phase of the scraper against a local stand-in API
+
+For each channel size, measures wall-clock time, API requests (and quota) and peak
+Python memory of the three metadata steps:
+- extract_playlists_details_from (channel, playlists and special playlists)
+- extract_videos_list (PlaylistItems of all playlists)
+- get_videos_authors_info (Video details of all videos)
+
+Each step runs on a cold cache (fresh cache folder).
+
+Usage: python contrib/benchmark_metadata.py --videos 100,10000,100000
+"""
+
+import argparse
+import functools
+import json
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+from yt_dlp.utils import DateRange
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent))
+
+from fake_youtube_api import (
+    CHANNEL_ID,
+    FakeChannel,
+    FakeYoutubeApi,
+    FakeYoutubeApiServer,
+)
+
+from youtube2zim.api import api_client
+from youtube2zim.constants import YOUTUBE
+from youtube2zim.scraper import Youtube2Zim
+from youtube2zim.utils import close_stores, open_store
+from youtube2zim.youtube import (
+    DEFAULT_METADATA_CONCURRENCY,
+    extract_playlists_details_from,
+    get_videos_authors_info,
+)
+
+
+def measure(api, func):
+    """(result, dict of measures) of calling func"""
+    api.reset_stats()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = api.stats()
+    return result, {
+        "seconds": round(duration, 3),
+        "requests": stats["requests"],
+        "quota": stats["quota"],
+        "errors": stats["errors"],
+        "peak_memory_mib": round(peak / 2**20, 2),
+    }
+
+
+def run_benchmark(nb_videos, nb_playlists, concurrency, latency, error_rate):
+    """measures of each metadata step for a channel of nb_videos"""
+    api = FakeYoutubeApi(
+        FakeChannel(nb_videos, nb_playlists), latency=latency, error_rate=error_rate
+    )
+    results = {}
+    with FakeYoutubeApiServer(api) as server, tempfile.TemporaryDirectory() as tmp:
+        api_client.configure(api_url=server.url, pool_size=max(concurrency, 10))
+        YOUTUBE.api_key = "fake"
+        YOUTUBE.cache_dir = pathlib.Path(tmp)
+        open_store(YOUTUBE.cache_dir)
+
+        details, results["extract_playlists_details_from"] = measure(
+            api,
+            functools.partial(
+                extract_playlists_details_from, CHANNEL_ID, concurrency=concurrency
+            ),
+        )
+
+        # only the attributes extract_videos_list relies on
+        scraper = types.SimpleNamespace(
+            cache_dir=YOUTUBE.cache_dir,
+            playlists=details[0],
+            metadata_concurrency=concurrency,
+            dateafter=DateRange("19700101"),
+        )
+        _, results["extract_videos_list"] = measure(
+            api, functools.partial(Youtube2Zim.extract_videos_list, scraper)
+        )
+
+        _, results["get_videos_authors_info"] = measure(
+            api,
+            functools.partial(
+                get_videos_authors_info, scraper.videos_ids, concurrency=concurrency
+            ),
+        )
+        close_stores()
+    api_client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--videos",
+        default="100,10000",
+        help="comma-separated channel sizes (number of videos)",
+    )
+    parser.add_argument("--playlists", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_METADATA_CONCURRENCY)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to each request"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="share of 503 responses"
+    )
+    args = parser.parse_args()
+
+    report = {}
+    for nb_videos in map(int, args.videos.split(",")):
+        report[nb_videos] = run_benchmark(
+            nb_videos, args.playlists, args.concurrency, args.latency, args.error_rate
+        )
+        print(json.dumps({nb_videos: report[nb_videos]}, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# vim: ai ts=4 sts=4 et sw=4 nu
+
+"""benchmark optimization cache transfers against a local stand-in S3
+
+Each request of the stand-in is throttled to a per-stream bandwidth, as a single
+TCP stream to a remote storage would be. For each storage configuration, measures
+wall-clock time and throughput of uploading then downloading `--objects` objects
+at once (as pipeline workers and background uploads do), and the number of
+requests it took and of connections it opened:
+- single-stream: one request per object (what a plain PUT/GET does)
+- boto3-defaults: KiwixStorage as is (8M parts, 10 threads, 10 connections)
+- tuned: TunedStorage with --chunk-size, --concurrency and a pool sized for all
+
+Usage: python contrib/benchmark_s3_transfers.py --size 256M --objects 4
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+from boto3.s3.transfer import TransferConfig
+from kiwixstorage import KiwixStorage
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent))
+
+from fake_s3 import FakeS3, FakeS3Server
+
+from youtube2zim.artifacts import parse_size
+from youtube2zim.transfers import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_TRANSFER_CONCURRENCY,
+    TunedStorage,
+    get_pool_size,
+)
+
+
+def get_storages(url, chunk_size, concurrency, nb_objects):
+    """(name, storage, extra transfer kwargs) of each compared configuration"""
+    return [
+        (
+            "single-stream",
+            KiwixStorage(url),
+            {"Config": TransferConfig(multipart_threshold=2**40, use_threads=False)},
+        ),
+        ("boto3-defaults", KiwixStorage(url), {}),
+        (
+            "tuned",
+            TunedStorage(
+                url,
+                chunk_size=chunk_size,
+                concurrency=concurrency,
+                pool_size=get_pool_size(concurrency, nb_objects),
+            ),
+            {},
+        ),
+    ]
+
+
+def measure(s3, nb_bytes, func, paths):
+    """dict of measures of calling func on all paths at once"""
+    s3.reset_stats()
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(paths)) as executor:
+        for future in [executor.submit(func, path) for path in paths]:
+            future.result()
+    duration = time.perf_counter() - start
+    stats = s3.stats()
+    return {
+        "seconds": round(duration, 3),
+        "mib_per_second": round(nb_bytes / duration / 2**20, 1),
+        "requests": sum(stats["requests"].values()),
+        "connections": stats["connections"],
+    }
+
+
+def run_benchmark(
+    size, nb_objects, chunk_size, concurrency, bandwidth, latency, connect_latency
+):
+    """measures of uploads and downloads for each storage configuration"""
+    s3 = FakeS3(
+        stream_bandwidth=bandwidth, latency=latency, connect_latency=connect_latency
+    )
+    results = {}
+    with FakeS3Server(s3) as server, tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = pathlib.Path(tmp)
+        sources = []
+        for index in range(nb_objects):
+            sources.append(tmp_dir.joinpath(f"source{index}.webm"))
+            sources[-1].write_bytes(os.urandom(size))
+
+        for name, storage, kwargs in get_storages(
+            server.url, chunk_size, concurrency, nb_objects
+        ):
+            results[name] = {
+                "upload": measure(
+                    s3,
+                    size * nb_objects,
+                    lambda path, storage=storage, kwargs=kwargs, name=name: (
+                        storage.upload_file(
+                            path,
+                            f"{name}/{path.stem}",
+                            meta={"encoder_version": "v1"},
+                            **kwargs,
+                        )
+                    ),
+                    sources,
+                ),
+                "download": measure(
+                    s3,
+                    size * nb_objects,
+                    lambda path, storage=storage, kwargs=kwargs, name=name: (
+                        storage.download_file(
+                            f"{name}/{path.stem}",
+                            path.with_suffix(".downloaded"),
+                            **kwargs,
+                        )
+                    ),
+                    sources,
+                ),
+            }
+            for source in sources:
+                if (
+                    source.with_suffix(".downloaded").read_bytes()
+                    != source.read_bytes()
+                ):
+                    raise ValueError(f"{name} corrupted {source.name}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--size", type=parse_size, default="128M", help="size of each object"
+    )
+    parser.add_argument(
+        "--objects", type=int, default=2, help="objects transferred at once"
+    )
+    parser.add_argument("--chunk-size", type=parse_size, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_TRANSFER_CONCURRENCY)
+    parser.add_argument(
+        "--stream-bandwidth",
+        type=parse_size,
+        default="5M",
+        help="bytes per second of each request",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="seconds added to each request"
+    )
+    parser.add_argument(
+        "--connect-latency",
+        type=float,
+        default=0.1,
+        help="seconds added to each new connection (TCP and TLS handshakes)",
+    )
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        args.size,
+        args.objects,
+        args.chunk_size,
+        args.concurrency,
+        args.stream_bandwidth,
+        args.latency,
+        args.connect_latency,
+    )
+    print(json.dumps(report, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
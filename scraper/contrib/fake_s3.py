@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# vim: ai ts=4 sts=4 et sw=4 nu
+
+"""local stand-in for an S3-compatible storage, with per-connection bandwidth
+
+Serves a single bucket from memory (path-style addressing), implementing what the
+optimization cache relies on: HEAD, GET (with Range), PUT and multipart uploads of
+objects with their metadata, and ListObjectsV2.
+
+Each request is served at most at `stream_bandwidth` bytes per second (both ways)
+after `latency` seconds, emulating the throughput of a single TCP stream to a
+remote storage, so that transfers over parallel connections can be compared to
+single-stream ones. New connections are delayed by `connect_latency` seconds, as
+TCP and TLS handshakes would.
+
+Usage: python contrib/fake_s3.py --port 8766 --stream-bandwidth 20M
+then use http://127.0.0.1:8766/?keyId=x&secretAccessKey=y&bucketName=cache
+as --optimization-cache
+"""
+
+import argparse
+import collections
+import datetime
+import email.utils
+import hashlib
+import threading
+import time
+import uuid
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.etree import ElementTree as ET
+
+from youtube2zim.artifacts import parse_size
+
+BUCKET_NAME = "cache"
+BLOCK_SIZE = 64 * 2**10  # bytes sent or received between bandwidth checks
+MAX_KEYS = 1000
+XMLNS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+class StoredObject:
+    def __init__(self, data, metadata):
+        self.data = data
+        self.metadata = metadata
+        self.etag = f'"{hashlib.md5(data).hexdigest()}"'  # noqa: S324
+        self.last_modified = datetime.datetime.now(datetime.UTC)
+
+
+class FakeS3:
+    """in-memory bucket with requests statistics"""
+
+    def __init__(self, stream_bandwidth=None, latency=0.0, connect_latency=0.0):
+        self.stream_bandwidth = stream_bandwidth
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.objects = {}
+        self.uploads = {}  # multipart uploads: id -> (key, metadata, parts)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = collections.Counter()
+            self.connections = 0  # opened
+            self.bytes_sent = self.bytes_received = 0
+
+    def record_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def record(self, operation, sent=0, received=0):
+        with self._lock:
+            self.requests[operation] += 1
+            self.bytes_sent += sent
+            self.bytes_received += received
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "connections": self.connections,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+            }
+
+    def put(self, key, data, metadata):
+        with self._lock:
+            self.objects[key] = StoredObject(data, metadata)
+
+    def get(self, key):
+        return self.objects.get(key)
+
+    def list(self, prefix, start_after):
+        """sorted keys after start_after under prefix, at most MAX_KEYS + 1"""
+        with self._lock:
+            keys = sorted(
+                key
+                for key in self.objects
+                if key.startswith(prefix) and key > start_after
+            )
+        return keys[: MAX_KEYS + 1]
+
+    def create_upload(self, key, metadata):
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self.uploads[upload_id] = (key, metadata, {})
+        return upload_id
+
+    def put_part(self, upload_id, number, data):
+        with self._lock:
+            self.uploads[upload_id][2][number] = data
+        return f'"{hashlib.md5(data).hexdigest()}"'  # noqa: S324
+
+    def complete_upload(self, upload_id):
+        with self._lock:
+            key, metadata, parts = self.uploads.pop(upload_id)
+        self.put(key, b"".join(parts[number] for number in sorted(parts)), metadata)
+        return key, self.objects[key].etag
+
+    def abort_upload(self, upload_id):
+        with self._lock:
+            self.uploads.pop(upload_id, None)
+
+
+def decode_aws_chunked(body):
+    """payload of an aws-chunked encoded body (signed chunks and trailers)"""
+    payload, offset = [], 0
+    while True:
+        line_end = body.index(b"\r\n", offset)
+        size = int(body[offset:line_end].split(b";", 1)[0], 16)
+        if not size:
+            return b"".join(payload)
+        payload.append(body[line_end + 2 : line_end + 2 + size])
+        offset = line_end + 2 + size + 2
+
+
+def to_xml(tag, children):
+    root = ET.Element(tag, xmlns=XMLNS)
+    for name, value in children:
+        if isinstance(value, list):
+            element = ET.SubElement(root, name)
+            for sub_name, sub_value in value:
+                ET.SubElement(element, sub_name).text = str(sub_value)
+        else:
+            ET.SubElement(root, name).text = str(value)
+    return ET.tostring(root, xml_declaration=True, encoding="utf-8")
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: connections are pooled by clients
+    s3: FakeS3
+
+    def parse(self):
+        """bucket, key and query params of request"""
+        url = urlparse(self.path)
+        bucket, _, key = url.path.lstrip("/").partition("/")
+        params = {
+            name: values[0]
+            for name, values in parse_qs(url.query, keep_blank_values=True).items()
+        }
+        return bucket, unquote(key), params
+
+    def throttle(self, start, nb_bytes):
+        """sleep so that nb_bytes took at least their time at stream bandwidth"""
+        if self.s3.stream_bandwidth:
+            delay = start + nb_bytes / self.s3.stream_bandwidth - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        chunks, received, start = [], 0, time.perf_counter()
+        while received < length:
+            chunk = self.rfile.read(min(BLOCK_SIZE, length - received))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            received += len(chunk)
+            self.throttle(start, received)
+        body = b"".join(chunks)
+        if "aws-chunked" in self.headers.get("Content-Encoding", ""):
+            body = decode_aws_chunked(body)
+        return body
+
+    def get_metadata(self):
+        return {
+            name[len("x-amz-meta-") :]: value
+            for name, value in self.headers.items()
+            if name.lower().startswith("x-amz-meta-")
+        }
+
+    def send(self, status, headers=None, body=b"", *, head=False):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if "Content-Length" not in (headers or {}):
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if head:
+            return
+        start = time.perf_counter()
+        for offset in range(0, len(body), BLOCK_SIZE):
+            self.wfile.write(body[offset : offset + BLOCK_SIZE])
+            self.throttle(start, min(offset + BLOCK_SIZE, len(body)))
+
+    def send_not_found(self, *, head=False):
+        self.send(
+            HTTPStatus.NOT_FOUND,
+            {"Content-Type": "application/xml"},
+            to_xml("Error", [("Code", "NoSuchKey")]),
+            head=head,
+        )
+
+    def object_headers(self, obj):
+        headers = {
+            "ETag": obj.etag,
+            "Last-Modified": email.utils.format_datetime(obj.last_modified, True),
+            "Accept-Ranges": "bytes",
+            "Content-Type": "binary/octet-stream",
+        }
+        for name, value in obj.metadata.items():
+            headers[f"x-amz-meta-{name}"] = value
+        return headers
+
+    def setup(self):
+        self.s3.record_connection()
+        if self.s3.connect_latency:
+            time.sleep(self.s3.connect_latency)
+        super().setup()
+
+    def handle_one_request(self):
+        if self.s3.latency:
+            time.sleep(self.s3.latency)
+        super().handle_one_request()
+
+    def do_HEAD(self):
+        bucket, key, _ = self.parse()
+        self.s3.record("HEAD")
+        if bucket != BUCKET_NAME:
+            self.send_not_found(head=True)
+        elif not key:
+            self.send(HTTPStatus.OK, head=True)
+        elif obj := self.s3.get(key):
+            headers = self.object_headers(obj)
+            headers["Content-Length"] = str(len(obj.data))
+            self.send(HTTPStatus.OK, headers, head=True)
+        else:
+            self.send_not_found(head=True)
+
+    def do_GET(self):
+        bucket, key, params = self.parse()
+        if bucket == BUCKET_NAME and not key and params.get("list-type") == "2":
+            self.list_objects(params)
+            return
+        obj = self.s3.get(key) if bucket == BUCKET_NAME else None
+        if obj is None:
+            self.s3.record("GET")
+            self.send_not_found()
+            return
+        headers, data = self.object_headers(obj), obj.data
+        status = HTTPStatus.OK
+        if range_header := self.headers.get("Range"):
+            first, last = range_header.removeprefix("bytes=").split("-")
+            first, last = int(first), min(int(last or len(data) - 1), len(data) - 1)
+            headers["Content-Range"] = f"bytes {first}-{last}/{len(obj.data)}"
+            data, status = data[first : last + 1], HTTPStatus.PARTIAL_CONTENT
+        self.s3.record("GET range" if range_header else "GET", sent=len(data))
+        self.send(status, headers, data)
+
+    def list_objects(self, params):
+        self.s3.record("LIST")
+        keys = self.s3.list(
+            params.get("prefix", ""),
+            params.get("continuation-token", params.get("start-after", "")),
+        )
+        truncated = len(keys) > MAX_KEYS
+        keys = keys[:MAX_KEYS]
+        children = [
+            ("Name", BUCKET_NAME),
+            ("Prefix", params.get("prefix", "")),
+            ("KeyCount", len(keys)),
+            ("MaxKeys", MAX_KEYS),
+            ("IsTruncated", str(truncated).lower()),
+        ]
+        if truncated:
+            children.append(("NextContinuationToken", keys[-1]))
+        for key in keys:
+            if obj := self.s3.get(key):
+                children.append(
+                    (
+                        "Contents",
+                        [
+                            ("Key", key),
+                            ("LastModified", obj.last_modified.isoformat()),
+                            ("ETag", obj.etag),
+                            ("Size", len(obj.data)),
+                        ],
+                    )
+                )
+        self.send(
+            HTTPStatus.OK,
+            {"Content-Type": "application/xml"},
+            to_xml("ListBucketResult", children),
+        )
+
+    def do_PUT(self):
+        _, key, params = self.parse()
+        body = self.read_body()
+        if "uploadId" in params:
+            self.s3.record("PUT part", received=len(body))
+            etag = self.s3.put_part(params["uploadId"], int(params["partNumber"]), body)
+        else:
+            self.s3.record("PUT", received=len(body))
+            self.s3.put(key, body, self.get_metadata())
+            etag = self.s3.get(key).etag
+        self.send(HTTPStatus.OK, {"ETag": etag})
+
+    def do_POST(self):
+        _, key, params = self.parse()
+        self.read_body()  # parts list of completion, parts are all kept
+        if "uploads" in params:
+            self.s3.record("POST create")
+            upload_id = self.s3.create_upload(key, self.get_metadata())
+            body = to_xml(
+                "InitiateMultipartUploadResult",
+                [("Bucket", BUCKET_NAME), ("Key", key), ("UploadId", upload_id)],
+            )
+        else:
+            self.s3.record("POST complete")
+            key, etag = self.s3.complete_upload(params["uploadId"])
+            body = to_xml(
+                "CompleteMultipartUploadResult",
+                [("Bucket", BUCKET_NAME), ("Key", key), ("ETag", etag)],
+            )
+        self.send(HTTPStatus.OK, {"Content-Type": "application/xml"}, body)
+
+    def do_DELETE(self):
+        _, key, params = self.parse()
+        self.s3.record("DELETE")
+        if "uploadId" in params:
+            self.s3.abort_upload(params["uploadId"])
+        else:
+            self.s3.objects.pop(key, None)
+        self.send(HTTPStatus.NO_CONTENT)
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+
+class FakeS3Server(ThreadingHTTPServer):
+    """threaded HTTP server for a FakeS3, usable as a context manager
+
+    `url` is to be used as --optimization-cache"""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, s3, host="127.0.0.1", port=0):
+        handler = type("Handler", (FakeS3Handler,), {"s3": s3})
+        super().__init__((host, port), handler)
+        self.s3 = s3
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return (
+            f"http://{host}:{port}/?keyId=fake&secretAccessKey=fake"
+            f"&bucketName={BUCKET_NAME}"
+        )
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument(
+        "--stream-bandwidth",
+        type=parse_size,
+        help="bytes per second of each request (eg. 20M)",
+    )
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--connect-latency", type=float, default=0.0, help="seconds")
+    args = parser.parse_args()
+
+    server = FakeS3Server(
+        FakeS3(
+            stream_bandwidth=args.stream_bandwidth,
+            latency=args.latency,
+            connect_latency=args.connect_latency,
+        ),
+        args.host,
+        args.port,
+    )
+    print(f"serving bucket {BUCKET_NAME} on {server.url}")  # noqa: T201
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# vim: ai ts=4 sts=4 et sw=4 nu
+
+"""local stand-in for the Youtube Data API v3, serving a synthetic channel
+
+Emulates the channels, playlists, playlistItems, videos, search and i18nRegions
+endpoints (pagination, ETag revalidation, quota accounting) with optional latency
+and error injection, so that the metadata phase of the scraper can be exercised
+and benchmarked without an API key.
+
+The synthetic channel has `nb_videos` videos: a fifth are shorts (UUSH playlist),
+others are long videos (UULF playlist) ; all are in the uploads (UU) playlist.
+`nb_playlists` user playlists share the videos evenly.
+
+Usage: python contrib/fake_youtube_api.py --videos 10000 --port 8765
+then point the scraper to it with api_client.configure(api_url=...)
+"""
+
+import argparse
+import collections
+import datetime
+import hashlib
+import json
+import random
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CHANNEL_ID = "UCfakeChannel0000000000a"
+CHANNEL_HANDLE = "@fakechannel"
+# quota cost of each endpoint, as documented by Youtube
+ENDPOINTS_COSTS = {"search": 100}
+MAX_RESULTS = 50
+SHORTS_EVERY = 5  # one video out of SHORTS_EVERY is a short
+
+
+class FakeChannel:
+    """synthetic channel data, computed on the fly from videos indexes"""
+
+    def __init__(self, nb_videos=100, nb_playlists=10):
+        self.nb_videos = nb_videos
+        self.nb_playlists = nb_playlists
+        self.uploads = [self.get_video_id(index) for index in range(nb_videos)]
+        self.playlists = {
+            f"UU{CHANNEL_ID[2:]}": self.uploads,
+            f"UULF{CHANNEL_ID[2:]}": [
+                video_id
+                for index, video_id in enumerate(self.uploads)
+                if index % SHORTS_EVERY
+            ],
+            f"UUSH{CHANNEL_ID[2:]}": [
+                video_id
+                for index, video_id in enumerate(self.uploads)
+                if not index % SHORTS_EVERY
+            ],
+        }
+        for index in range(nb_playlists):
+            self.playlists[self.get_playlist_id(index)] = self.uploads[
+                index::nb_playlists
+            ]
+
+    @staticmethod
+    def get_video_id(index):
+        return f"v{index:010d}"
+
+    @staticmethod
+    def get_playlist_id(index):
+        return f"PLfake{index:026d}"
+
+    @staticmethod
+    def get_published_at(video_id):
+        """newest videos first in uploads: one video a day back from 2025"""
+        published_on = datetime.datetime(
+            2025, 1, 1, tzinfo=datetime.UTC
+        ) - datetime.timedelta(days=int(video_id[1:]))
+        return published_on.isoformat().replace("+00:00", "Z")
+
+    def get_channel(self):
+        return {
+            "kind": "youtube#channel",
+            "id": CHANNEL_ID,
+            "snippet": {
+                "title": "Fake Channel",
+                "description": "A synthetic channel",
+                "customUrl": CHANNEL_HANDLE,
+                "publishedAt": "2010-01-01T00:00:00Z",
+                "thumbnails": {
+                    "high": {"url": "http://localhost/profile.jpg"},
+                },
+            },
+            "contentDetails": {"relatedPlaylists": {"uploads": f"UU{CHANNEL_ID[2:]}"}},
+            "brandingSettings": {"image": {}},
+        }
+
+    def get_playlist(self, playlist_id):
+        return {
+            "kind": "youtube#playlist",
+            "id": playlist_id,
+            "snippet": {
+                "title": f"Playlist {playlist_id}",
+                "description": "",
+                "channelId": CHANNEL_ID,
+                "channelTitle": "Fake Channel",
+                "publishedAt": "2020-01-01T00:00:00Z",
+            },
+        }
+
+    def get_playlist_item(self, playlist_id, position, video_id):
+        published_at = self.get_published_at(video_id)
+        return {
+            "kind": "youtube#playlistItem",
+            "id": f"{playlist_id}.{video_id}",
+            "snippet": {
+                "title": f"Video {video_id}",
+                "description": f"Description of video {video_id}",
+                "position": position,
+                "publishedAt": published_at,
+                "channelId": CHANNEL_ID,
+                "channelTitle": "Fake Channel",
+                "thumbnails": {},
+            },
+            "contentDetails": {"videoId": video_id, "videoPublishedAt": published_at},
+            "status": {"privacyStatus": "public"},
+        }
+
+    def get_video(self, video_id):
+        index = int(video_id[1:])
+        seconds = 30 if not index % SHORTS_EVERY else 60 + index % 3600
+        return {
+            "kind": "youtube#video",
+            "id": video_id,
+            "snippet": {
+                "title": f"Video {video_id}",
+                "channelId": CHANNEL_ID,
+                "channelTitle": "Fake Channel",
+            },
+            "contentDetails": {"duration": f"PT{seconds // 60}M{seconds % 60}S"},
+        }
+
+
+def paginate(items, params):
+    """(page of items, nextPageToken) according to maxResults and pageToken"""
+    max_results = min(int(params.get("maxResults", 5)), MAX_RESULTS)
+    offset = int(params.get("pageToken", "0"))
+    next_offset = offset + max_results
+    return items[offset:next_offset], (
+        str(next_offset) if next_offset < len(items) else None
+    )
+
+
+class FakeYoutubeApi:
+    """request handling logic and statistics, independent from HTTP server"""
+
+    def __init__(self, channel, latency=0.0, error_rate=0.0, seed=0):
+        self.channel = channel
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)  # noqa: S311
+        self.requests = collections.Counter()
+        self.quota = collections.Counter()
+        self.errors = 0
+        self.not_modified = 0
+        self.lock = threading.Lock()
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests.clear()
+            self.quota.clear()
+            self.errors = self.not_modified = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": sum(self.requests.values()),
+                "quota": sum(self.quota.values()),
+                "endpoints": dict(self.requests),
+                "errors": self.errors,
+                "not_modified": self.not_modified,
+            }
+
+    def handle(self, endpoint, params, if_none_match=None):
+        """(status, headers, payload) for a GET on endpoint"""
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.requests[endpoint] += 1
+            self.quota[endpoint] += ENDPOINTS_COSTS.get(endpoint, 1)
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.errors += 1
+                return HTTPStatus.SERVICE_UNAVAILABLE, {}, {"error": "injected"}
+        if not params.get("key"):
+            return HTTPStatus.FORBIDDEN, {}, {"error": "missing key"}
+
+        handler = getattr(self, f"get_{endpoint}", None)
+        if handler is None:
+            return HTTPStatus.NOT_FOUND, {}, {"error": f"unknown {endpoint}"}
+        items, next_page_token = handler(params)
+        # channels API omits items when none is found
+        payload = {"items": items} if items or endpoint != "channels" else {}
+        if next_page_token:
+            payload["nextPageToken"] = next_page_token
+        etag = hashlib.sha256(
+            json.dumps(payload, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        payload["etag"] = etag
+        if if_none_match == etag:
+            with self.lock:
+                self.not_modified += 1
+            return HTTPStatus.NOT_MODIFIED, {"ETag": etag}, None
+        return HTTPStatus.OK, {"ETag": etag}, payload
+
+    def get_i18nRegions(self, params):  # noqa: N802 ARG002
+        return [{"id": "US", "snippet": {"gl": "US", "name": "United States"}}], None
+
+    def get_channels(self, params):
+        if params.get("id"):
+            found = CHANNEL_ID in params["id"].split(",")
+        elif params.get("forHandle"):
+            found = params["forHandle"].lstrip("@") == CHANNEL_HANDLE[1:]
+        else:
+            found = False
+        return [self.channel.get_channel()] if found else [], None
+
+    def get_playlists(self, params):
+        if params.get("channelId"):
+            if params["channelId"] != CHANNEL_ID:
+                return [], None
+            playlists_ids = [
+                self.channel.get_playlist_id(index)
+                for index in range(self.channel.nb_playlists)
+            ]
+            playlists_ids, next_page_token = paginate(playlists_ids, params)
+        else:
+            playlists_ids = [
+                playlist_id
+                for playlist_id in params.get("id", "").split(",")[:MAX_RESULTS]
+                if playlist_id in self.channel.playlists
+            ]
+            next_page_token = None
+        return [
+            self.channel.get_playlist(playlist_id) for playlist_id in playlists_ids
+        ], next_page_token
+
+    def get_playlistItems(self, params):  # noqa: N802
+        videos_ids = self.channel.playlists.get(params.get("playlistId"), [])
+        offset = int(params.get("pageToken", "0"))
+        page, next_page_token = paginate(videos_ids, params)
+        return [
+            self.channel.get_playlist_item(params["playlistId"], offset + index, video)
+            for index, video in enumerate(page)
+        ], next_page_token
+
+    def get_videos(self, params):
+        return [
+            self.channel.get_video(video_id)
+            for video_id in params.get("id", "").split(",")[:MAX_RESULTS]
+            if video_id[1:].isdigit() and int(video_id[1:]) < self.channel.nb_videos
+        ], None
+
+    def get_search(self, params):
+        page, next_page_token = paginate(self.channel.uploads, params)
+        return [
+            {"id": {"kind": "youtube#video", "videoId": video_id}} for video_id in page
+        ], next_page_token
+
+
+class FakeYoutubeApiHandler(BaseHTTPRequestHandler):
+    api: FakeYoutubeApi
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/_stats":
+            self.send(HTTPStatus.OK, {}, self.api.stats())
+            return
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        status, headers, payload = self.api.handle(
+            url.path.rsplit("/", 1)[-1], params, self.headers.get("If-None-Match")
+        )
+        self.send(status, headers, payload)
+
+    def send(self, status, headers, payload):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+
+class FakeYoutubeApiServer(ThreadingHTTPServer):
+    """threaded HTTP server for a FakeYoutubeApi, usable as a context manager
+
+    `url` is to be used as api_url of the scraper's API client"""
+
+    daemon_threads = True
+
+    def __init__(self, api, host="127.0.0.1", port=0):
+        handler = type("Handler", (FakeYoutubeApiHandler,), {"api": api})
+        super().__init__((host, port), handler)
+        self.api = api
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/youtube/v3"
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--videos", type=int, default=100)
+    parser.add_argument("--playlists", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="0 to 1")
+    args = parser.parse_args()
+
+    api = FakeYoutubeApi(
+        FakeChannel(args.videos, args.playlists),
+        latency=args.latency,
+        error_rate=args.error_rate,
+    )
+    server = FakeYoutubeApiServer(api, args.host, args.port)
+    print(f"serving {CHANNEL_ID} ({args.videos} videos) on {server.url}")  # noqa: T201
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# vim: ai ts=4 sts=4 et sw=4 nu
+
+"""HTTP client used for all Youtube Data API v3 calls
+
+A single requests Session is shared by all callers (including worker threads) so
+that connections are kept alive and reused across pages and endpoints.
+Transient errors (429 and 5xx) are retried with a jittered exponential backoff,
+honoring the `Retry-After` header when Youtube sends one. Requests are paced by
+the shared rate limiter (see ratelimit).
+
+Quota units consumed by each request are accounted per endpoint and an optional
+budget can be set so that the scraper stops before exhausting the API key.
+
+When a persistent cache folder is configured, responses are stored (in its metadata
+store) along with their ETag and revalidated with `If-None-Match` on later runs."""
+
+import collections
+import hashlib
+import json
+import threading
+from http import HTTPStatus
+from pathlib import Path
+
+import requests
+from urllib3.util.retry import Retry
+
+from youtube2zim.constants import YOUTUBE, logger
+from youtube2zim.ratelimit import RateLimitedAdapter
+from youtube2zim.utils import load_json, save_json
+
+YOUTUBE_API = "https://www.googleapis.com/youtube/v3"
+PLAYLIST_API = f"{YOUTUBE_API}/playlists"
+PLAYLIST_ITEMS_API = f"{YOUTUBE_API}/playlistItems"
+CHANNEL_SECTIONS_API = f"{YOUTUBE_API}/channelSections"
+CHANNELS_API = f"{YOUTUBE_API}/channels"
+SEARCH_API = f"{YOUTUBE_API}/search"
+VIDEOS_API = f"{YOUTUBE_API}/videos"
+I18N_REGIONS_API = f"{YOUTUBE_API}/i18nRegions"
+
+# quota cost of a request, see https://developers.google.com/youtube/v3/determine_quota_cost
+ENDPOINTS_COSTS = {SEARCH_API: 100}
+DEFAULT_COST = 1
+
+REQUEST_TIMEOUT = 60
+# (connect, read) timeouts per endpoint ; lists of videos are the slowest to come
+ENDPOINTS_TIMEOUTS = {
+    SEARCH_API: (10, 30),
+    I18N_REGIONS_API: (10, 30),
+    CHANNELS_API: (10, 30),
+    CHANNEL_SECTIONS_API: (10, 30),
+    PLAYLIST_API: (10, 30),
+    PLAYLIST_ITEMS_API: (10, REQUEST_TIMEOUT),
+    VIDEOS_API: (10, REQUEST_TIMEOUT),
+}
+
+DEFAULT_POOL_SIZE = 10
+MAX_RETRIES = 8
+BACKOFF_FACTOR = 1  # 1s, 2s, 4s, 8s… between attempts
+BACKOFF_JITTER = 1  # up to 1s added randomly to each backoff
+BACKOFF_MAX = 300
+RETRY_STATUSES = (
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.INTERNAL_SERVER_ERROR,
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+)
+
+
+class QuotaBudgetExceededError(Exception):
+    """Exception raised when a request would exceed the API quota budget"""
+
+    pass
+
+
+def get_endpoint_name(url):
+    """short name of an API endpoint from its URL"""
+    return url.rsplit("/", 1)[-1]
+
+
+class EtagCache:
+    """Persistent store of API responses along with their ETag
+
+    One metadata record per request (endpoint and parameters), in a namespace per
+    endpoint"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+
+    def get_location(self, url, params):
+        """(folder, key) of the record for a request"""
+        params_str = json.dumps(
+            {key: value for key, value in params.items() if value is not None},
+            sort_keys=True,
+        )
+        digest = hashlib.sha256(params_str.encode("utf-8")).hexdigest()
+        return self.cache_dir.joinpath(get_endpoint_name(url)), digest
+
+    def load(self, url, params):
+        """(etag, response) stored for this request or (None, None)"""
+        stored = load_json(*self.get_location(url, params))
+        if stored is None:
+            return None, None
+        return stored["etag"], stored["response"]
+
+    def save(self, url, params, etag, response):
+        """store response and its etag"""
+        save_json(*self.get_location(url, params), {"etag": etag, "response": response})
+
+
+class YoutubeApiClient:
+    """Thread-safe, pooled and retrying client for the Youtube Data API"""
+
+    def __init__(
+        self,
+        pool_size=DEFAULT_POOL_SIZE,
+        max_retries=MAX_RETRIES,
+        quota_budget=None,
+        etag_cache_dir=None,
+        api_url=None,
+    ):
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.quota_budget = quota_budget
+        self.quota_used = collections.Counter()
+        # units discovery requests can't use, kept for later steps (see reserve_quota)
+        self.quota_reserved = 0
+        self.nb_not_modified = 0
+        self.etag_cache = EtagCache(etag_cache_dir) if etag_cache_dir else None
+        # base URL replacing YOUTUBE_API in requests (eg. a local stand-in server)
+        self.api_url = api_url
+        self._session = None
+        self._lock = threading.Lock()
+        self._quota_lock = threading.Lock()
+
+    def configure(
+        self,
+        *,
+        pool_size=None,
+        max_retries=None,
+        quota_budget=None,
+        etag_cache_dir=None,
+        api_url=None,
+    ):
+        """update settings ; session is recreated on next use"""
+        with self._lock:
+            if api_url is not None:
+                self.api_url = api_url
+            if etag_cache_dir is not None:
+                self.etag_cache = EtagCache(etag_cache_dir)
+            if pool_size is not None:
+                self.pool_size = pool_size
+            if max_retries is not None:
+                self.max_retries = max_retries
+            if quota_budget is not None:
+                self.quota_budget = quota_budget
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _make_session(self):
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=BACKOFF_FACTOR,
+            backoff_jitter=BACKOFF_JITTER,
+            backoff_max=BACKOFF_MAX,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = RateLimitedAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @property
+    def session(self) -> requests.Session:
+        """shared session, created on first use"""
+        with self._lock:
+            if self._session is None:
+                self._session = self._make_session()
+            return self._session
+
+    @property
+    def quota_units_used(self):
+        return sum(self.quota_used.values())
+
+    def reserve_quota(self, units):
+        """set units of the budget that discovery requests can't use
+
+        discovery (listing videos) is thus stopped while later steps, such as
+        details of the videos found so far, can still be paid for"""
+        with self._quota_lock:
+            self.quota_reserved = units
+
+    def consume_quota(self, url, *, discovery=False):
+        """account quota cost of a request to url, raising if over budget
+
+        discovery requests can't use the reserved units (see reserve_quota)"""
+        cost = ENDPOINTS_COSTS.get(url, DEFAULT_COST)
+        with self._quota_lock:
+            if self.quota_budget is not None:
+                limit = self.quota_budget
+                if discovery:
+                    limit -= self.quota_reserved
+                if self.quota_units_used + cost > limit:
+                    raise QuotaBudgetExceededError(
+                        f"API quota budget reached ({self.quota_units_used} units "
+                        f"used, {limit} allowed for this request)"
+                    )
+            self.quota_used[get_endpoint_name(url)] += cost
+
+    def quota_report(self):
+        """dict of used quota units (total and per endpoint) and budget"""
+        with self._quota_lock:
+            return {
+                "used": self.quota_units_used,
+                "budget": self.quota_budget,
+                "endpoints": dict(self.quota_used),
+                "not_modified": self.nb_not_modified,
+            }
+
+    def get(self, url, params, *, discovery=False) -> dict:
+        """JSON response of a GET on an API endpoint, raising on HTTP errors
+
+        API key is added to params automatically. Stored responses are only
+        revalidated (If-None-Match) when both their ETag and body are present.
+        Raises QuotaBudgetExceededError if request would exceed quota budget"""
+        self.consume_quota(url, discovery=discovery)
+
+        etag, stored_response = (
+            self.etag_cache.load(url, params) if self.etag_cache else (None, None)
+        )
+        revalidate = bool(etag) and stored_response is not None
+        resp = self.session.get(
+            url.replace(YOUTUBE_API, self.api_url, 1) if self.api_url else url,
+            params={**params, "key": YOUTUBE.api_key},
+            headers={"If-None-Match": etag} if revalidate else None,
+            timeout=ENDPOINTS_TIMEOUTS.get(url, REQUEST_TIMEOUT),
+        )
+        if resp.status_code == HTTPStatus.NOT_MODIFIED and stored_response is not None:
+            with self._quota_lock:
+                self.nb_not_modified += 1
+            return stored_response
+        if resp.status_code >= HTTPStatus.BAD_REQUEST:
+            logger.error(f"HTTP {resp.status_code} Error response: {resp.text}")
+        resp.raise_for_status()
+        response = resp.json()
+
+        if self.etag_cache:
+            etag = resp.headers.get("ETag") or response.get("etag")
+            if etag:
+                self.etag_cache.save(url, params, etag, response)
+        return response
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+api_client = YoutubeApiClient()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# vim: ai ts=4 sts=4 et sw=4 nu
+
+"""Local on-disk cache of processed files, kept across runs on the same host
+
+Encoded videos, processed thumbnails, subtitles and chapters are stored under the
+same keys as in the S3 optimization cache (`{format}/{quality}/{id}`,
+`thumbnails/high/{id}`…) with the version of the preset which produced them.
+It is checked before the S3 cache (and filled from it) so that rebuilding a ZIM on
+the same host barely touches the network.
+
+Files are materialized in and out of the cache with hardlinks (or reflinks, or
+copies as a last resort) and least recently used ones are evicted once the cache
+exceeds its size."""
+
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from youtube2zim.constants import logger
+from youtube2zim.store import MetadataStore
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+DEFAULT_LOCAL_CACHE_SIZE = 20 * 2**30  # bytes
+FICLONE = 0x40049409  # Linux ioctl cloning a file (reflink) on CoW filesystems
+SIZE_UNITS = {"": 1, "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+SIZE_PATTERN = re.compile(r"^(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>[KMGT]?)(?:I?B)?$")
+
+
+def parse_size(value):
+    """number of bytes of a human size (eg. 500M, 20GiB or 1.5T)"""
+    match = SIZE_PATTERN.match(value.strip().upper())
+    if not match:
+        raise ValueError(f"Invalid size `{value}`")
+    return int(float(match.group("value")) * SIZE_UNITS[match.group("unit")])
+
+
+def link_file(src_path: Path, dest_path: Path):
+    """make dest_path a hardlink, reflink or (failing both) copy of src_path"""
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    dest_path.unlink(missing_ok=True)
+    try:
+        os.link(src_path, dest_path)
+        return
+    except OSError:
+        pass  # other filesystem or no hardlink support
+    if fcntl:
+        try:
+            with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+                fcntl.ioctl(dest.fileno(), FICLONE, src.fileno())
+            return
+        except OSError:
+            dest_path.unlink(missing_ok=True)
+    shutil.copyfile(src_path, dest_path)
+
+
+class ArtifactCache:
+    """size-bounded LRU cache of files identified by key and version
+
+    files are in root_dir/files/{key}, indexed in an SQLite database"""
+
+    def __init__(self, root_dir: Path, max_size=DEFAULT_LOCAL_CACHE_SIZE):
+        self.root_dir = root_dir
+        self.files_dir = root_dir.joinpath("files")
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # reuses the per-thread connections of a metadata store, for own table
+        self.store = MetadataStore(root_dir.joinpath("artifacts.sqlite3"))
+        self.store.connection.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "key TEXT PRIMARY KEY, "
+            "version TEXT, "
+            "size INTEGER NOT NULL, "
+            "stored_at REAL NOT NULL, "
+            "accessed_at REAL NOT NULL"
+            ")"
+        )
+        self.store.connection.execute(
+            "CREATE INDEX IF NOT EXISTS artifacts_accessed_at "
+            "ON artifacts(accessed_at)"
+        )
+
+    def get_path(self, key):
+        return self.files_dir.joinpath(key)
+
+    def get(self, key, dest_path: Path, version=None, max_age_seconds=None):
+        """whether file of key (in version if set) was materialized at dest_path"""
+        conn = self.store.connection
+        row = conn.execute(
+            "SELECT version, stored_at FROM artifacts WHERE key=?", (key,)
+        ).fetchone()
+        if row is None:
+            return False
+        stored_version, stored_at = row
+        if version is not None and stored_version != version:
+            return False
+        if max_age_seconds is not None and time.time() - stored_at > max_age_seconds:
+            logger.debug(f"Local cache for {key} is expired")
+            return False
+        try:
+            link_file(self.get_path(key), dest_path)
+        except FileNotFoundError:
+            conn.execute("DELETE FROM artifacts WHERE key=?", (key,))
+            return False
+        conn.execute(
+            "UPDATE artifacts SET accessed_at=? WHERE key=?", (time.time(), key)
+        )
+        logger.debug(f"retrieved {dest_path} from local cache at {key}")
+        return True
+
+    def put(self, key, src_path: Path, version=None):
+        """store src_path under key, evicting least recently used files if needed"""
+        path = self.get_path(key)
+        tmp_path = path.with_name(f"{path.name}.tmp{threading.get_ident()}")
+        link_file(src_path, tmp_path)
+        tmp_path.replace(path)
+        now = time.time()
+        self.store.connection.execute(
+            "INSERT OR REPLACE INTO artifacts "
+            "(key, version, size, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, version, path.stat().st_size, now, now),
+        )
+        self.evict()
+
+    def get_size(self):
+        """total size of cached files, in bytes"""
+        return self.store.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM artifacts"
+        ).fetchone()[0]
+
+    def evict(self):
+        """remove least recently used files until cache fits in max_size"""
+        if not self.max_size:
+            return
+        with self._lock:
+            conn = self.store.connection
+            excess = self.get_size() - self.max_size
+            if excess <= 0:
+                return
+            for key, size in conn.execute(
+                "SELECT key, size FROM artifacts ORDER BY accessed_at"
+            ).fetchall():
+                logger.debug(f"evicting {key} from local cache")
+                conn.execute("DELETE FROM artifacts WHERE key=?", (key,))
+                self.get_path(key).unlink(missing_ok=True)
+                excess -= size
+                if excess <= 0:
+                    break
+
+    def close(self):
+        self.store.close()
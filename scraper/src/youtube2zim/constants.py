@@ -13,6 +13,9 @@ NAME = ROOT_DIR.name
 
 SCRAPER = f"{NAME} {__version__}"
 
+# build folder created (and removed once ZIM is complete) inside --work-dir
+WORK_BUILD_DIR_NAME = f"{NAME}-build"
+
 # Youtube uses some non-standard language codes
 YOUTUBE_LANG_MAP = {
     "iw": "he",  # Hebrew
@@ -32,6 +35,10 @@ class Youtube:
     build_dir: Path
     cache_dir: Path
     api_key: str
+    # persistent (across runs) folder for API responses, if any
+    api_cache_dir: Path | None = None
+    # days after which uploads playlists are fully refetched (not incrementally)
+    full_refresh_days: int = 30
 
 
 YOUTUBE = Youtube()
@@ -7,8 +7,19 @@ import os
 import sys
 from pathlib import Path
 
+from youtube2zim.api import DEFAULT_POOL_SIZE
+from youtube2zim.artifacts import DEFAULT_LOCAL_CACHE_SIZE, parse_size
 from youtube2zim.constants import NAME, SCRAPER, logger
+from youtube2zim.processing import IONICE_CLASSES, MAX_NICENESS
+from youtube2zim.ratelimit import DEFAULT_RATE_LIMITS, parse_rate_limits
 from youtube2zim.scraper import Youtube2Zim
+from youtube2zim.transfers import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_TRANSFER_CONCURRENCY,
+    MIN_S3_CHUNK_SIZE,
+)
+from youtube2zim.uploads import DEFAULT_UPLOAD_CONCURRENCY
+from youtube2zim.youtube import DEFAULT_METADATA_CONCURRENCY
 
 
 def main():
@@ -74,6 +85,16 @@ def main():
         "Used to temporarily store downloaded files before adding to ZIM",
     )
 
+    parser.add_argument(
+        "--work-dir",
+        help="Path of a persistent folder to build in (in a youtube2zim-build "
+        "subfolder) instead of a temp folder. "
+        "It is kept if scraper fails or is interrupted, and a new run with the "
+        "same work dir resumes from it, skipping already processed videos. "
+        "All processed files are kept there until the ZIM is complete, which "
+        "requires as much disk space as the ZIM itself",
+    )
+
     parser.add_argument(
         "--zimui-dist",
         type=str,
@@ -167,6 +188,88 @@ def main():
         default=1,
     )
 
+    parser.add_argument(
+        "--encode-concurrency",
+        help="Number of videos re-encoded concurrently, while others are being "
+        "downloaded. Defaults to --concurrency, up to the number of CPUs",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--encode-threads",
+        help="Number of ffmpeg threads of each re-encoding. Defaults to the number "
+        "of CPUs shared among --encode-concurrency re-encodings",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--encode-nice",
+        help="Niceness increment (1-19) of re-encodings, for downloads and ZIM "
+        "creation not to be slowed down by them",
+        type=int,
+        default=0,
+    )
+
+    parser.add_argument(
+        "--encode-ionice",
+        help="I/O scheduling class of re-encodings (Linux only)",
+        choices=list(IONICE_CLASSES),
+    )
+
+    parser.add_argument(
+        "--postprocess-concurrency",
+        help="Number of videos whose thumbnail, subtitles and chapters are "
+        "retrieved concurrently. Defaults to --concurrency",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--api-pool-size",
+        help="Number of keep-alive connections to the Youtube API to keep open",
+        type=int,
+        default=DEFAULT_POOL_SIZE,
+    )
+
+    parser.add_argument(
+        "--metadata-concurrency",
+        help="Number of concurrent Youtube API requests when listing playlists "
+        "and their videos. Should not exceed --api-pool-size",
+        type=int,
+        default=DEFAULT_METADATA_CONCURRENCY,
+    )
+
+    parser.add_argument(
+        "--api-quota-budget",
+        help="Maximum number of Youtube API quota units to use. Videos listing "
+        "stops gracefully once remaining units are only enough for details of the "
+        "videos already found",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--api-cache-dir",
+        help="Persistent folder to keep Youtube API responses in, across runs. "
+        "Cached responses are revalidated using their ETag",
+    )
+
+    parser.add_argument(
+        "--full-refresh-days",
+        help="With --api-cache-dir, uploads playlists are only fetched until videos "
+        "known from previous run. They are fully fetched again (to catch deleted "
+        "videos) when last full fetch is older than this number of days",
+        type=int,
+        default=30,
+    )
+
+    parser.add_argument(
+        "--rate-limits",
+        help="Maximum requests per second to Youtube hosts, shared by all workers. "
+        "Comma-separated list of category=rate with categories api, web, "
+        "googlevideo, timedtext and images (0 for no limit). Default: "
+        + ",".join(f"{key}={value:g}" for key, value in DEFAULT_RATE_LIMITS.items()),
+        type=parse_rate_limits,
+    )
+
     parser.add_argument(
         "--version",
         help="Display scraper version and exit",
@@ -200,6 +303,53 @@ def main():
         dest="s3_url_with_credentials",
     )
 
+    parser.add_argument(
+        "--local-cache-dir",
+        help="Path of a local optimization cache, kept across runs: processed "
+        "videos, thumbnails, subtitles and chapters are retrieved from it (before "
+        "--optimization-cache, if set) and stored in it",
+    )
+
+    parser.add_argument(
+        "--local-cache-size",
+        help="Maximum size of --local-cache-dir (eg. 500M, 100G), least recently "
+        f"used files being evicted. Defaults to {DEFAULT_LOCAL_CACHE_SIZE // 2**30}G",
+        type=parse_size,
+        default=DEFAULT_LOCAL_CACHE_SIZE,
+    )
+
+    parser.add_argument(
+        "--upload-concurrency",
+        help="Number of concurrent uploads to optimization cache, running in "
+        f"background. Defaults to {DEFAULT_UPLOAD_CONCURRENCY}",
+        type=int,
+        default=DEFAULT_UPLOAD_CONCURRENCY,
+    )
+
+    parser.add_argument(
+        "--s3-chunk-size",
+        help="Size of parts of multipart uploads and ranged downloads of "
+        "--optimization-cache objects (eg. 8M), smaller objects being transferred "
+        f"at once. Defaults to {DEFAULT_CHUNK_SIZE // 2**20}M",
+        type=parse_size,
+        default=DEFAULT_CHUNK_SIZE,
+    )
+
+    parser.add_argument(
+        "--s3-transfer-concurrency",
+        help="Number of parts of an --optimization-cache object transferred "
+        f"concurrently. Defaults to {DEFAULT_TRANSFER_CONCURRENCY}",
+        type=int,
+        default=DEFAULT_TRANSFER_CONCURRENCY,
+    )
+
+    parser.add_argument(
+        "--s3-pool-size",
+        help="Maximum number of connections to --optimization-cache. Defaults to "
+        "enough for all transfers (--concurrency and --upload-concurrency) at once",
+        type=int,
+    )
+
     parser.add_argument(
         "--use-any-optimized-version",
         help="Use the cached files if present, whatever the version",
@@ -236,6 +386,50 @@ def main():
     try:
         if args.max_concurrency < 1:
             raise ValueError(f"Invalid concurrency value: {args.max_concurrency}")
+        if args.metadata_concurrency < 1:
+            raise ValueError(
+                f"Invalid metadata concurrency value: {args.metadata_concurrency}"
+            )
+        if args.api_quota_budget is not None and args.api_quota_budget < 1:
+            raise ValueError(f"Invalid API quota budget: {args.api_quota_budget}")
+        if args.encode_concurrency is not None and args.encode_concurrency < 1:
+            raise ValueError(
+                f"Invalid encode concurrency value: {args.encode_concurrency}"
+            )
+        if args.encode_threads is not None and args.encode_threads < 1:
+            raise ValueError(f"Invalid encode threads value: {args.encode_threads}")
+        if not 0 <= args.encode_nice <= MAX_NICENESS:
+            raise ValueError(f"Invalid encode nice value: {args.encode_nice}")
+        if (
+            args.postprocess_concurrency is not None
+            and args.postprocess_concurrency < 1
+        ):
+            raise ValueError(
+                "Invalid post-process concurrency value: "
+                f"{args.postprocess_concurrency}"
+            )
+        if args.local_cache_dir and args.skip_reencoding:
+            raise ValueError(
+                "--local-cache-dir cannot be used with --skip-reencoding "
+                "(cached videos are assumed to be in requested format)"
+            )
+        if args.upload_concurrency < 1:
+            raise ValueError(
+                f"Invalid upload concurrency value: {args.upload_concurrency}"
+            )
+        if args.s3_chunk_size < MIN_S3_CHUNK_SIZE:
+            raise ValueError(
+                f"Invalid S3 chunk size: {args.s3_chunk_size} "
+                f"(S3 parts are at least {MIN_S3_CHUNK_SIZE // 2**20}M)"
+            )
+        if args.s3_transfer_concurrency < 1:
+            raise ValueError(
+                f"Invalid S3 transfer concurrency value: {args.s3_transfer_concurrency}"
+            )
+        if args.s3_pool_size is not None and args.s3_pool_size < 1:
+            raise ValueError(f"Invalid S3 pool size: {args.s3_pool_size}")
+        if args.api_pool_size < 1:
+            raise ValueError(f"Invalid API pool size: {args.api_pool_size}")
         scraper = Youtube2Zim(
             **{
                 key: value
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# vim: ai ts=4 sts=4 et sw=4 nu
+
+"""Single yt-dlp extraction per video, shared by all its download steps
+
+Extracting a video (webpage, player and manifests requests) is the most expensive
+and most rate-limited part of a yt-dlp download. Video file, thumbnail and
+subtitles are thus all downloaded from the same extracted info, and chapters are
+read from it.
+
+Each thread reuses its own long-lived YoutubeDL (HTTP connections, cookies and
+player cache are kept), as YoutubeDL instances are not thread-safe.
+
+Format URLs of an extracted info expire after a few hours: a step refused with an
+HTTP 403 extracts the video again before being retried once."""
+
+import copy
+import threading
+from http import HTTPStatus
+from typing import Any, cast
+
+from yt_dlp.utils import DownloadError
+
+from youtube2zim.constants import logger
+from youtube2zim.ratelimit import RateLimitedYoutubeDL
+
+
+def is_forbidden(exc: DownloadError):
+    """whether a download failed with an HTTP 403 (expired format URLs)"""
+    cause = exc.exc_info[1] if exc.exc_info else None
+    return getattr(
+        cause, "status", None
+    ) == HTTPStatus.FORBIDDEN or "HTTP Error 403" in str(exc)
+
+
+class VideoInfoExtractor:
+    """extracts videos info once and downloads their files from it
+
+    options are the YoutubeDL options shared by all steps ; each step overrides
+    some of them (skip_download, writethumbnail…) when processing info"""
+
+    def __init__(self, options):
+        self.options = options
+        self._infos = {}
+        self._local = threading.local()
+        self._ydls = []
+        self._lock = threading.Lock()
+
+    @property
+    def ydl(self):
+        """YoutubeDL of current thread"""
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            ydl = self._local.ydl = RateLimitedYoutubeDL(self.options.copy())
+            with self._lock:
+                self._ydls.append(ydl)
+        return ydl
+
+    def get_info(self, video_id):
+        """sanitized info dict of a video, extracted on first request
+
+        raises yt_dlp.utils.DownloadError if video could not be extracted"""
+        info = self._infos.get(video_id)
+        if info is None:
+            logger.debug(f"Extracting info of {video_id}")
+            extracted = self.ydl.extract_info(video_id, download=False)
+            if extracted is not None:
+                info = self.ydl.sanitize_info(extracted, remove_private_keys=True)
+            if info is None:
+                raise DownloadError(f"No info extracted for {video_id}")
+            self._infos[video_id] = info
+        return info
+
+    def process(self, video_id, **params):
+        """download files of a video from its info, overriding options with params
+
+        raises yt_dlp.utils.DownloadError on failure"""
+        try:
+            self._process(self.get_info(video_id), **params)
+        except DownloadError as exc:
+            if not is_forbidden(exc):
+                raise
+            logger.warning(f"Info of {video_id} has expired, extracting it again")
+            self.forget(video_id)
+            self._process(self.get_info(video_id), **params)
+
+    def _process(self, info, **params):
+        ydl = self.ydl
+        # options are set at runtime, as YoutubeDL does itself
+        ydl_params = cast(dict[str, Any], ydl.params)
+        previous = {key: ydl_params[key] for key in params if key in ydl_params}
+        ydl_params.update(params)
+        try:
+            # info is altered by processing and used by next steps: work on a copy
+            ydl.process_ie_result(copy.deepcopy(info), download=True)
+        finally:
+            for key in params:
+                ydl_params.pop(key, None)
+            ydl_params.update(previous)
+
+    def forget(self, video_id):
+        """release info of a video once all its steps are done"""
+        self._infos.pop(video_id, None)
+
+    def close(self):
+        """close YoutubeDL of all threads"""
+        with self._lock:
+            for ydl in self._ydls:
+                ydl.close()
+            self._ydls.clear()
+        self._infos.clear()
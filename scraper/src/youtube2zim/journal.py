@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# vim: ai ts=4 sts=4 et sw=4 nu
+
+"""On-disk journal of the processing stages completed for each video
+
+Each stage of a video (downloaded, encoded, thumbnail, subtitles, chapters) is
+recorded in the metadata store as soon as it completes, its files being kept in the
+build folder. When a scrape in a persistent --work-dir is interrupted (crash, OOM,
+kill), a rerun skips completed stages and only adds their files to the new ZIM.
+
+The journal is bound to the options affecting produced files (format, quality…):
+it is reset when they change between runs."""
+
+from pathlib import Path
+from typing import Any
+
+from youtube2zim.utils import get_store, load_json, save_json
+
+STAGES = ("downloaded", "encoded", "thumbnail", "subtitles", "chapters")
+OPTIONS_KEY = "options"
+
+
+class Journal:
+    """completed stages of videos, stored in the metadata store of cache_dir"""
+
+    def __init__(self, cache_dir: Path, options: dict):
+        self.cache_dir = cache_dir.joinpath("journal")
+        previous_options = load_json(self.cache_dir, OPTIONS_KEY)
+        # journal of a previous run with other options is useless
+        self.options_changed = previous_options not in (None, options)
+        if previous_options != options:
+            store, namespace = get_store(self.cache_dir)
+            store.clear(namespace)
+            save_json(self.cache_dir, OPTIONS_KEY, options)
+
+    @staticmethod
+    def _get_key(video_id, stage):
+        if stage not in STAGES:
+            raise ValueError(f"Unknown processing stage: {stage}")
+        return f"{video_id}/{stage}"
+
+    def get(self, video_id, stage):
+        """value recorded when stage was completed for video_id or None"""
+        return load_json(self.cache_dir, self._get_key(video_id, stage))
+
+    def mark(self, video_id, stage, *, value: Any = True):
+        """record stage as completed for video_id, with a JSON value"""
+        save_json(self.cache_dir, self._get_key(video_id, stage), value)
+
+    def forget(self, video_id):
+        """remove all stages of video_id (eg. when it failed)"""
+        store, namespace = get_store(self.cache_dir)
+        for stage in STAGES:
+            store.delete(namespace, self._get_key(video_id, stage))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# vim: ai ts=4 sts=4 et sw=4 nu
+
+"""Multi-stage processing of items with a pool of worker threads per stage
+
+Each stage pulls items from a bounded queue, processes them with its own workers
+and pushes results to the queue of next stage, so that stages of different nature
+(network-bound, CPU-bound…) run concurrently on different items."""
+
+import queue
+import threading
+from typing import Any
+
+from youtube2zim.constants import logger
+
+QUEUE_POLL_INTERVAL = 0.5  # seconds between checks of abortion while waiting
+_STOP = object()  # marker telling a worker there are no more items
+
+
+class Stage:
+    """a processing step: func(item) returns item for next stage or None if failed
+
+    queue_size bounds the number of items waiting for this stage (0: no limit) ;
+    initializer() is called by each worker thread before processing items"""
+
+    def __init__(self, name, func, workers=1, queue_size=0, initializer=None):
+        if workers < 1:
+            raise ValueError(f"Invalid number of workers for {name}: {workers}")
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue_size = queue_size
+        self.initializer = initializer
+
+
+class Pipeline:
+    """chain of stages through which items are processed
+
+    on_item_done(item, success) is called once per input item, when it went through
+    all stages or failed at one of them"""
+
+    def __init__(self, stages, on_item_done=None):
+        self.stages = stages
+        self.on_item_done = on_item_done
+        self._abort = threading.Event()
+        self._lock = threading.Lock()
+
+    def _done(self, item, *, success):
+        if self.on_item_done:
+            self.on_item_done(item, success)
+
+    def run_sequentially(self, items):
+        """process items one after the other in current thread, returning succeeded
+
+        useful for debugging ; stages initializers are not called"""
+        succeeded = []
+        for item in items:
+            result = item
+            for stage in self.stages:
+                result = stage.func(result)
+                if result is None:
+                    break
+            if result is not None:
+                succeeded.append(result)
+            self._done(item, success=result is not None)
+        return succeeded
+
+    def _get(self, items_queue: queue.Queue) -> Any:
+        """next item of items_queue, or _STOP if pipeline is aborted"""
+        while not self._abort.is_set():
+            try:
+                return items_queue.get(timeout=QUEUE_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _STOP
+
+    def _put(self, items_queue, item):
+        """put item in items_queue unless pipeline is aborted"""
+        while not self._abort.is_set():
+            try:
+                items_queue.put(item, timeout=QUEUE_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def run(self, items):
+        """process items through all stages concurrently, returning succeeded ones
+
+        first exception raised by a stage function aborts the pipeline and is
+        re-raised once all workers are stopped"""
+        self._abort.clear()
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        succeeded = []
+        errors = []
+        # number of running workers per stage, to propagate end of items
+        running = [stage.workers for stage in self.stages]
+
+        def work(index):
+            stage = self.stages[index]
+            is_last = index == len(self.stages) - 1
+            try:
+                if stage.initializer:
+                    stage.initializer()
+                while True:
+                    item = self._get(queues[index])
+                    if item is _STOP:
+                        break
+                    source, value = item
+                    result = stage.func(value)
+                    if result is None:
+                        self._done(source, success=False)
+                    elif is_last:
+                        with self._lock:
+                            succeeded.append(result)
+                        self._done(source, success=True)
+                    else:
+                        self._put(queues[index + 1], (source, result))
+            except Exception as exc:
+                logger.error(f"Error in {stage.name} stage, aborting: {exc}")
+                with self._lock:
+                    errors.append(exc)
+                self._abort.set()
+            finally:
+                with self._lock:
+                    running[index] -= 1
+                    is_last_worker = running[index] == 0
+                if is_last_worker and not is_last:
+                    for _ in range(self.stages[index + 1].workers):
+                        self._put(queues[index + 1], _STOP)
+
+        threads = [
+            threading.Thread(
+                target=work, args=(index,), name=f"{stage.name}-{number}", daemon=True
+            )
+            for index, stage in enumerate(self.stages)
+            for number in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for item in items:
+            self._put(queues[0], (item, item))
+        for _ in range(self.stages[0].workers):
+            self._put(queues[0], _STOP)
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+        return succeeded
@@ -21,9 +21,10 @@ import tempfile
 import requests
 from zimscraperlib.logging import nicer_args_join
 
+from youtube2zim.api import REQUEST_TIMEOUT
 from youtube2zim.constants import NAME, YOUTUBE, logger
+from youtube2zim.utils import close_stores, open_store
 from youtube2zim.youtube import (
-    REQUEST_TIMEOUT,
     credentials_ok,
     extract_playlists_details_from,
 )
@@ -80,6 +81,7 @@ class YoutubeHandler:
         # create required sub folders
         for sub_folder in ("cache", "videos", "channels"):
             self.build_dir.joinpath(sub_folder).mkdir()
+        open_store(YOUTUBE.cache_dir)
 
         logger.info("testing Youtube credentials")
         if not credentials_ok():
@@ -105,6 +107,7 @@ class YoutubeHandler:
         )
 
         # no need for build_dir anymore
+        close_stores()
         shutil.rmtree(self.build_dir, ignore_errors=True)
 
         for playlist in playlists:
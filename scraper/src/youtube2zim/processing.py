@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 # vim: ai ts=4 sts=4 et sw=4 nu
 
+import os
 import pathlib
+import subprocess
+import threading
 
 from zimscraperlib.image.conversion import convert_image
 from zimscraperlib.image.optimization import OptimizeWebpOptions, optimize_webp
@@ -11,6 +14,73 @@ from zimscraperlib.video.encoding import reencode
 
 from youtube2zim.constants import logger
 
+# relative cost of processing a second of video: downloading it and, unless skipped,
+# re-encoding it (per format and quality ; VP9 is slower to encode than H.264)
+DOWNLOAD_COST_FACTOR = 0.5
+ENCODING_COST_FACTORS = {
+    ("webm", "high"): 4.0,
+    ("webm", "low"): 2.0,
+    ("mp4", "high"): 2.0,
+    ("mp4", "low"): 1.0,
+}
+
+
+MAX_NICENESS = 19
+# ionice scheduling classes by name
+IONICE_CLASSES = {"best-effort": "2", "idle": "3"}
+
+
+def get_cpu_count():
+    """number of CPUs this process may run on"""
+    return os.process_cpu_count() or 1
+
+
+def compute_encode_threads(encode_concurrency, cpu_count=None):
+    """ffmpeg threads per encoding so that concurrent encodings share all CPUs"""
+    return max(1, (cpu_count or get_cpu_count()) // encode_concurrency)
+
+
+def lower_thread_priority(niceness=0, ionice_class=None):
+    """lower CPU (nice) and I/O (ionice) priorities of current thread
+
+    on Linux, priorities are per-thread and inherited by spawned processes: applied
+    to an encoding worker, they apply to all its ffmpeg processes while other
+    threads (downloads, ZIM writer) keep their priority. Failures are only logged"""
+    thread_id = threading.get_native_id()
+    if niceness:
+        try:
+            os.setpriority(
+                os.PRIO_PROCESS,
+                thread_id,
+                os.getpriority(os.PRIO_PROCESS, thread_id) + niceness,
+            )
+        except (AttributeError, OSError) as exc:
+            logger.warning(f"Unable to set nice priority of encoding: {exc}")
+    if ionice_class:
+        try:
+            subprocess.run(
+                [
+                    "/usr/bin/env",
+                    "ionice",
+                    "-c",
+                    IONICE_CLASSES[ionice_class],
+                    "-p",
+                    str(thread_id),
+                ],
+                check=True,
+                capture_output=True,
+            )
+        except (OSError, subprocess.CalledProcessError) as exc:
+            logger.warning(f"Unable to set I/O priority of encoding: {exc}")
+
+
+def estimate_video_cost(duration_seconds, video_format, video_quality, *, reencode):
+    """estimated (relative) cost of processing a video of duration_seconds"""
+    factor = DOWNLOAD_COST_FACTOR
+    if reencode:
+        factor += ENCODING_COST_FACTORS.get((video_format, video_quality), 1.0)
+    return duration_seconds * factor
+
 
 def process_thumbnail(thumbnail_path: pathlib.Path, options: OptimizeWebpOptions):
     # thumbnail might be WebP as .webp, JPEG as .jpg or WebP as .jpg
@@ -34,15 +104,22 @@ def process_thumbnail(thumbnail_path: pathlib.Path, options: OptimizeWebpOptions
     optimize_webp(thumbnail_path, thumbnail_path, options)
 
 
-def find_video_in_dir(video_dir, video_id):
-
-    # find downloaded video from video_dir
-    files = [
+def list_videos_in_dir(video_dir):
+    """video files (neither thumbnails nor subtitles) in video_dir, if it exists"""
+    if not video_dir.exists():
+        return []
+    return [
         p
         for p in video_dir.iterdir()
         if p.stem == "video" and p.suffix not in (".jpg", ".webp")
     ]
 
+
+def find_video_in_dir(video_dir, video_id):
+
+    # find downloaded video from video_dir
+    files = list_videos_in_dir(video_dir)
+
     if len(files) == 0:
         logger.error(f"Video file missing in {video_dir} for {video_id}")
         logger.debug(list(video_dir.iterdir()))
@@ -56,11 +133,11 @@ def find_video_in_dir(video_dir, video_id):
     return files[0]
 
 
-def post_process_video(video_dir, video_id, preset, video_format):
+def post_process_video(video_dir, video_id, preset, video_format, threads=1):
     """apply custom post-processing to downloaded video
 
     - resize thumbnail
-    - recompress video"""
+    - recompress video with `threads` ffmpeg threads"""
 
     src_path = find_video_in_dir(video_dir, video_id)
 
@@ -70,6 +147,7 @@ def post_process_video(video_dir, video_id, preset, video_format):
         src_path,
         dst_path,
         preset.to_ffmpeg_args(),
+        threads=threads,
         delete_src=True,
         failsafe=True,
     )  # pyright: ignore[reportGeneralTypeIssues]
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# vim: ai ts=4 sts=4 et sw=4 nu
+
+"""Process-wide pacing of requests to Youtube hosts
+
+Requests are sorted into categories of hosts (API, web pages, videos, subtitles and
+images) and each category has its own token bucket: requests are spread smoothly
+at a sustained rate (with short bursts allowed) instead of being fired as fast as
+possible, which triggers 429s and bot challenges.
+
+The limiter is shared by the API client (via its HTTP adapter) and by yt-dlp
+(via RateLimitedYoutubeDL) so that all worker threads are coordinated."""
+
+import threading
+import time
+from urllib.parse import urlparse
+
+import yt_dlp
+from requests.adapters import HTTPAdapter
+
+# requests per second allowed by default, per category ; None for no limit
+DEFAULT_RATE_LIMITS = {
+    "api": 10.0,
+    "web": 5.0,
+    "googlevideo": 20.0,
+    "timedtext": 5.0,
+    "images": 10.0,
+}
+
+
+def get_host_category(url):
+    """rate limit category of an URL or None if not a Youtube host"""
+    parsed = urlparse(url)
+    host = parsed.hostname or ""
+    if host.endswith("googleapis.com"):
+        return "api"
+    if host.endswith("googlevideo.com"):
+        return "googlevideo"
+    if host.endswith(("ytimg.com", "ggpht.com")):
+        return "images"
+    if host == "youtube.com" or host.endswith((".youtube.com", "youtu.be")):
+        if parsed.path.startswith("/api/timedtext"):
+            return "timedtext"
+        return "web"
+    return None
+
+
+def parse_rate_limits(value):
+    """dict of category: rate from a `category=rate,…` string (0 for no limit)"""
+    rate_limits = {}
+    for part in filter(None, value.split(",")):
+        category, _, rate = part.partition("=")
+        category = category.strip()
+        if category not in DEFAULT_RATE_LIMITS:
+            raise ValueError(
+                f"Unknown rate limit category `{category}`, "
+                f"choose from {', '.join(DEFAULT_RATE_LIMITS)}"
+            )
+        rate = float(rate)
+        if rate < 0:
+            raise ValueError(f"Invalid rate `{rate}` for `{category}`")
+        rate_limits[category] = rate or None
+    return rate_limits
+
+
+class TokenBucket:
+    """thread-safe token bucket refilled at `rate` tokens per second"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = max(burst or rate, 1)
+        self.tokens = self.capacity
+        self.updated_on = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """take a token, waiting for one to be available"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_on) * self.rate
+            )
+            self.updated_on = now
+            # tokens can go negative: waiters are served in turn, each one later
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """token buckets per host category"""
+
+    def __init__(self, rate_limits=None):
+        self.configure(rate_limits)
+
+    def configure(self, rate_limits=None):
+        """set rate per category (updating defaults) ; buckets are recreated"""
+        self.rate_limits = {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}
+        self.buckets = {
+            category: TokenBucket(rate)
+            for category, rate in self.rate_limits.items()
+            if rate
+        }
+
+    def acquire(self, url):
+        """wait until a request to url is allowed"""
+        bucket = self.buckets.get(get_host_category(url))
+        if bucket:
+            bucket.acquire()
+
+
+rate_limiter = HostRateLimiter()
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """requests adapter pacing requests with the shared rate limiter"""
+
+    def send(self, request, *args, **kwargs):
+        rate_limiter.acquire(request.url)
+        return super().send(request, *args, **kwargs)
+
+
+class RateLimitedYoutubeDL(yt_dlp.YoutubeDL):
+    """YoutubeDL pacing all its HTTP requests with the shared rate limiter
+
+    covers extraction, media (fragments included), thumbnails and subtitles"""
+
+    def urlopen(self, req):
+        if isinstance(req, str):
+            rate_limiter.acquire(req)
+        else:
+            # yt-dlp Request or (deprecated) urllib Request
+            rate_limiter.acquire(getattr(req, "url", None) or req.full_url)
+        return super().urlopen(req)
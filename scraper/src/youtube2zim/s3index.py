@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# vim: ai ts=4 sts=4 et sw=4 nu
+
+"""In-memory index of the S3 optimization cache, built with bulk listings
+
+Looking up the cache with a HEAD request per object (video, thumbnail, subtitles
+and each of their files, chapters) means thousands of sequential round-trips per
+run. Listing the relevant prefixes once (ListObjectsV2, 1000 keys per request)
+answers existence, size and age of all objects at once.
+
+Listings do not include objects metadata (encoder version): a HEAD is still needed
+to check the version of an object which exists, right before downloading it.
+
+The bucket is shared by all collections: listing is only worth it while prefixes
+are not much larger than what the run looks up. A prefix is thus listed up to
+KEYS_PER_LOOKUP objects per lookup (one LIST request per 100 HEADs at most) and
+left to HEADs beyond, which also bounds memory usage."""
+
+import threading
+from typing import NamedTuple
+
+from youtube2zim.constants import logger
+
+LIST_PAGE_SIZE = 1000  # keys returned per ListObjectsV2 request
+# objects listed per expected lookup, a video having a few files under some prefixes
+KEYS_PER_LOOKUP = 10
+
+
+def get_max_keys(nb_lookups):
+    """number of objects a prefix is listed up to, for nb_lookups in it"""
+    return max(nb_lookups * KEYS_PER_LOOKUP, LIST_PAGE_SIZE)
+
+
+class ObjectInfo(NamedTuple):
+    size: int
+    last_modified: object  # datetime.datetime
+
+
+class S3CacheIndex:
+    """objects of an S3 bucket under some prefixes, up to max_keys per prefix"""
+
+    def __init__(self, s3_storage, prefixes, max_keys=LIST_PAGE_SIZE):
+        self.s3_storage = s3_storage
+        self.prefixes = prefixes
+        self.max_keys = max_keys
+        self.indexed_prefixes = []
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def build(self):
+        """list objects of all prefixes, returning number of indexed objects"""
+        paginator = self.s3_storage.client.get_paginator("list_objects_v2")
+        for prefix in self.prefixes:
+            objects = {}
+            for page in paginator.paginate(
+                Bucket=self.s3_storage.bucket_name, Prefix=prefix
+            ):
+                for entry in page.get("Contents", []):
+                    objects[entry["Key"]] = ObjectInfo(
+                        entry["Size"], entry["LastModified"]
+                    )
+                if len(objects) > self.max_keys:
+                    logger.warning(
+                        f"Over {self.max_keys} objects in S3 cache under {prefix}, "
+                        "looking them up one by one"
+                    )
+                    break
+            else:
+                with self._lock:
+                    self.objects.update(objects)
+                    self.indexed_prefixes.append(prefix)
+        return len(self.objects)
+
+    def is_indexed(self, key):
+        """whether key is under an indexed prefix, ie. its lookup is answered"""
+        return key.startswith(tuple(self.indexed_prefixes))
+
+    def get(self, key):
+        """ObjectInfo of an indexed key or None if it does not exist"""
+        return self.objects.get(key)
+
+    def add(self, key, info):
+        """record an object uploaded after the index was built"""
+        if self.is_indexed(key):
+            with self._lock:
+                self.objects[key] = info
@@ -7,7 +7,6 @@ Add Youtube Data API v3 to it
 Create credentials (Other non-UI, Public Data)
 """
 
-import concurrent.futures
 import datetime
 import functools
 import json
@@ -18,10 +17,8 @@ import tempfile
 from gettext import gettext as _
 from pathlib import Path
 
-import isodate
 import yt_dlp
 import yt_dlp.utils
-from kiwixstorage import KiwixStorage
 from pif import get_public_ip
 from schedule import every, run_pending
 from zimscraperlib.download import stream_file
@@ -42,18 +39,31 @@ from zimscraperlib.zim import Creator, metadata
 from zimscraperlib.zim.filesystem import validate_file_creatable
 from zimscraperlib.zim.indexing import IndexData
 
+from youtube2zim.api import QuotaBudgetExceededError, api_client
+from youtube2zim.artifacts import ArtifactCache
 from youtube2zim.constants import (
     ROOT_DIR,
     SCRAPER,
+    WORK_BUILD_DIR_NAME,
     YOUTUBE,
     YOUTUBE_LANG_MAP,
     logger,
 )
+from youtube2zim.extraction import VideoInfoExtractor
+from youtube2zim.journal import Journal
+from youtube2zim.pipeline import Pipeline, Stage
 from youtube2zim.processing import (
+    compute_encode_threads,
+    estimate_video_cost,
     find_video_in_dir,
+    get_cpu_count,
+    list_videos_in_dir,
+    lower_thread_priority,
     post_process_video,
     process_thumbnail,
 )
+from youtube2zim.ratelimit import rate_limiter
+from youtube2zim.s3index import ObjectInfo, S3CacheIndex, get_max_keys
 from youtube2zim.schemas import (
     Author,
     Channel,
@@ -68,18 +78,29 @@ from youtube2zim.schemas import (
     Video,
     VideoPreview,
 )
+from youtube2zim.transfers import TunedStorage, get_pool_size
+from youtube2zim.uploads import UploadQueue, file_refs
 from youtube2zim.utils import (
     clean_text,
-    delete_callback,
+    close_stores,
+    format_duration,
     get_slug,
+    get_store,
+    iter_paged_json,
     load_json,
     load_mandatory_json,
+    map_concurrently,
+    open_store,
     save_json,
+    save_json_file,
 )
 from youtube2zim.youtube import (
+    DiscoveredVideos,
     credentials_ok,
     extract_playlists_details_from,
     get_channel_json,
+    get_channels_json,
+    get_collection_type,
     get_videos_authors_info,
     get_videos_json,
     save_channel_branding,
@@ -103,17 +124,35 @@ class Youtube2Zim:
         fname,
         debug,
         tmp_dir,
+        work_dir,
         max_concurrency,
         language,
         tags,
         dateafter,
         use_any_optimized_version,
         s3_url_with_credentials,
+        local_cache_dir,
+        local_cache_size,
+        upload_concurrency,
+        s3_chunk_size,
+        s3_transfer_concurrency,
+        s3_pool_size,
         publisher,
         disable_metadata_checks,
         stats_filename,
         skip_reencoding,
         subtitles_chapters_cache_expiry_days,
+        api_pool_size,
+        metadata_concurrency,
+        api_quota_budget,
+        api_cache_dir,
+        full_refresh_days,
+        rate_limits,
+        encode_concurrency,
+        postprocess_concurrency,
+        encode_threads,
+        encode_nice,
+        encode_ionice,
         title=None,
         description=None,
         long_description=None,
@@ -128,6 +167,7 @@ class Youtube2Zim:
         self.youtube_id = youtube_id
         self.api_key = api_key
         self.dateafter = dateafter
+        self.dateafter_input = dateafter  # as passed, dateafter being parsed later
 
         # video-encoding info
         self.video_format = video_format
@@ -173,11 +213,23 @@ class Youtube2Zim:
 
         # directory setup
         self.output_dir = Path(output_dir).expanduser().resolve()
-        if tmp_dir:
-            tmp_dir = Path(tmp_dir).expanduser().resolve()
-            tmp_dir.mkdir(parents=True, exist_ok=True)
-        self.build_dir = Path(tempfile.mkdtemp(dir=tmp_dir))
+        # persistent build folder, kept on failure to resume from it ; it is a
+        # subfolder of work_dir owned by the scraper, as it is removed on success
+        self.work_dir = Path(work_dir).expanduser().resolve() if work_dir else None
+        if self.work_dir:
+            self.build_dir = self.work_dir.joinpath(WORK_BUILD_DIR_NAME)
+            self.build_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            if tmp_dir:
+                tmp_dir = Path(tmp_dir).expanduser().resolve()
+                tmp_dir.mkdir(parents=True, exist_ok=True)
+            self.build_dir = Path(tempfile.mkdtemp(dir=tmp_dir))
         self.zimui_dist = Path(zimui_dist)
+        # persistent (across runs) folder for Youtube API responses
+        self.api_cache_dir = None
+        if api_cache_dir:
+            self.api_cache_dir = Path(api_cache_dir).expanduser().resolve()
+            open_store(self.api_cache_dir)
 
         # process-related
         self.playlists = []
@@ -186,23 +238,65 @@ class Youtube2Zim:
         self.user_lives_playlist_id = None
         self.videos_ids = []
         self.video_ids_count = 0
+        # estimated processing cost of each video (see compute_videos_costs)
+        self.videos_costs = {}
         self.videos_processed = 0
         self.main_channel_id = None  # use for branding
 
         # debug/devel options
         self.debug = debug
         self.max_concurrency = max_concurrency
+        self.metadata_concurrency = metadata_concurrency
+        self.encode_concurrency = encode_concurrency or min(
+            max_concurrency, get_cpu_count()
+        )
+        # ffmpeg threads of each encoding, sharing CPUs among concurrent encodings
+        self.encode_threads = encode_threads or compute_encode_threads(
+            self.encode_concurrency
+        )
+        self.encode_nice = encode_nice
+        self.encode_ionice = encode_ionice
+        self.postprocess_concurrency = postprocess_concurrency or max_concurrency
 
         # update youtube credentials store
         YOUTUBE.build_dir = self.build_dir
         YOUTUBE.api_key = self.api_key
         YOUTUBE.cache_dir = self.cache_dir
+        YOUTUBE.api_cache_dir = self.api_cache_dir
+        YOUTUBE.full_refresh_days = full_refresh_days
+        api_client.configure(
+            pool_size=api_pool_size,
+            quota_budget=api_quota_budget,
+            etag_cache_dir=(
+                self.api_cache_dir.joinpath("etags") if self.api_cache_dir else None
+            ),
+        )
+        rate_limiter.configure(rate_limits)
 
         # Optimization-cache
         self.s3_url_with_credentials = s3_url_with_credentials
         self.use_any_optimized_version = use_any_optimized_version
         self.video_quality = "low" if self.low_quality else "high"
         self.s3_storage = None
+        self.s3_index = None
+        # background uploads to optimization cache
+        self.uploads = None
+        self.upload_concurrency = upload_concurrency
+        # multipart transfers from/to S3 optimization cache
+        self.s3_chunk_size = s3_chunk_size
+        self.s3_transfer_concurrency = s3_transfer_concurrency
+        self.s3_pool_size = s3_pool_size or get_pool_size(
+            s3_transfer_concurrency, self.max_concurrency + upload_concurrency
+        )
+        # local (first tier) optimization cache
+        self.local_cache = (
+            ArtifactCache(
+                Path(local_cache_dir).expanduser().resolve(),
+                max_size=local_cache_size,
+            )
+            if local_cache_dir
+            else None
+        )
 
         # scraper progess
         self.stats_path = None
@@ -249,6 +343,7 @@ class Youtube2Zim:
     def run(self):
         """execute the scraper step by step"""
 
+        completed = False
         try:
             # first report => creates a file with appropriate structure
             self.report_progress()
@@ -302,6 +397,7 @@ class Youtube2Zim:
 
             logger.info("compute list of videos")
             self.extract_videos_list()
+            self.log_quota_usage()
 
             self.video_ids_count = len(self.videos_ids)
             nb_videos_msg = f".. {self.video_ids_count} videos"
@@ -376,16 +472,37 @@ class Youtube2Zim:
             # download videos (and recompress)
             logger.info(
                 "downloading all videos, subtitles and thumbnails "
-                f"(concurrency={self.max_concurrency})"
+                f"(concurrency={self.max_concurrency}, "
+                f"encode={self.encode_concurrency}x{self.encode_threads} threads, "
+                f"post-process={self.postprocess_concurrency})"
             )
             logger.info(f"  format: {self.video_format}")
             logger.info(f"  quality: {self.video_quality}")
             logger.info(f"  generated-subtitles: {self.all_subtitles}")
+            if self.local_cache:
+                logger.info(
+                    f"  using local cache: {self.local_cache.root_dir} "
+                    f"({self.local_cache.get_size() / 2**30:.1f} GiB used)"
+                )
             if self.s3_storage:
                 logger.info(
                     f"  using cache: {self.s3_storage.url.netloc} "
                     f"with bucket: {self.s3_storage.bucket_name}"
                 )
+            logger.info("retrieve details for all videos (author and duration)")
+            videos_details = get_videos_authors_info(
+                self.videos_ids, concurrency=self.metadata_concurrency
+            )
+            self.skip_videos_without_details(videos_details)
+            self.compute_videos_costs(videos_details)
+
+            if self.s3_storage:
+                self.build_s3_index()
+            if self.has_cache:
+                self.uploads = UploadQueue(
+                    self.upload_to_cache, workers=self.upload_concurrency
+                )
+
             succeeded, failed = self.download_video_files(
                 max_concurrency=self.max_concurrency
             )
@@ -395,8 +512,16 @@ class Youtube2Zim:
                     logger.critical("More than half of videos failed. exiting")
                     raise OSError("Too much videos failed to download")
 
-            logger.info("retrieve channel-info for all videos (author details)")
-            get_videos_authors_info(succeeded)
+            # keep channel-info (author details) of downloaded videos only
+            save_json(
+                self.cache_dir,
+                "videos_channels",
+                {
+                    video_id: videos_details[video_id]
+                    for video_id in succeeded
+                    if video_id in videos_details
+                },
+            )
 
             logger.info("download all author's profile pictures")
             self.download_authors_branding()
@@ -411,12 +536,30 @@ class Youtube2Zim:
             logger.exception(exc)
             return 1
         else:
+            if self.uploads:
+                logger.info(
+                    f"waiting for {self.uploads.pending()} pending uploads to cache"
+                )
+                self.uploads.flush()
+                if self.uploads.failed:
+                    logger.warning(f"{self.uploads.failed} uploads to cache failed")
             logger.info("Finishing ZIM file…")
             self.zim_file.finish()
+            completed = True
         finally:
             self.report_progress()
-            logger.info("removing temp folder")
-            shutil.rmtree(self.build_dir, ignore_errors=True)
+            self.log_quota_usage()
+            if self.uploads:
+                self.uploads.close()
+            api_client.close()
+            close_stores()
+            if self.local_cache:
+                self.local_cache.close()
+            if self.work_dir and not completed:
+                logger.info(f"keeping work folder {self.build_dir} to resume from it")
+            else:
+                logger.info("removing temp folder")
+                shutil.rmtree(self.build_dir, ignore_errors=True)
 
         logger.info("all done!")
 
@@ -463,7 +606,12 @@ class Youtube2Zim:
 
     def s3_credentials_ok(self):
         logger.info("testing S3 Optimization Cache credentials")
-        self.s3_storage = KiwixStorage(self.s3_url_with_credentials)
+        self.s3_storage = TunedStorage(
+            self.s3_url_with_credentials,
+            chunk_size=self.s3_chunk_size,
+            concurrency=self.s3_transfer_concurrency,
+            pool_size=self.s3_pool_size,
+        )
         if not self.s3_storage.check_credentials(
             list_buckets=True, bucket=True, write=True, read=True, failsafe=True
         ):
@@ -475,6 +623,29 @@ class Youtube2Zim:
             return False
         return True
 
+    def build_s3_index(self):
+        """index S3 cache objects of all kinds of files to look up
+
+        prefixes much larger than this collection are looked up with HEADs"""
+        logger.info("indexing S3 optimization cache")
+        self.s3_index = S3CacheIndex(
+            self.s3_storage,
+            [
+                f"{self.video_format}/{self.video_quality}/",
+                "thumbnails/high/",
+                "subtitles/",
+                "chapters/",
+            ],
+            max_keys=get_max_keys(len(self.videos_ids)),
+        )
+        try:
+            nb_objects = self.s3_index.build()
+        except Exception as exc:
+            logger.warning(f"Unable to index S3 cache, looking up objects: {exc}")
+            self.s3_index = None
+            return
+        logger.info(f".. {nb_objects} objects in S3 cache")
+
     def validate_dateafter_input(self):
         try:
             self.dateafter = yt_dlp.utils.DateRange(
@@ -490,11 +661,33 @@ class Youtube2Zim:
     def prepare_build_folder(self):
         """prepare build folder before we start downloading data"""
 
-        # cache folder to store youtube-api results
+        # cache folder to store youtube-api results (in a metadata store)
         self.cache_dir.mkdir(exist_ok=True)
+        open_store(self.cache_dir)
         self.subtitles_cache_dir.mkdir(exist_ok=True)
         self.chapters_cache_dir.mkdir(exist_ok=True)
 
+        # stages completed for each video, by a previous run in case of resume
+        self.journal = Journal(
+            self.cache_dir,
+            {
+                "video_format": self.video_format,
+                "video_quality": self.video_quality,
+                "skip_reencoding": self.skip_reencoding,
+                "all_subtitles": self.all_subtitles,
+                # collection (and its type, which depends on IDs) and its filters
+                "youtube_id": self.youtube_id,
+                "collection_type": get_collection_type(self.youtube_id),
+                "dateafter": self.dateafter_input,
+            },
+        )
+        if self.journal.options_changed:
+            logger.warning("Options changed since previous run, not resuming it")
+            # metadata (videos, channels, playlists) and files of previous run
+            store, namespace = get_store(self.journal.cache_dir)
+            store.clear_except(namespace)
+            shutil.rmtree(self.videos_dir, ignore_errors=True)
+
         # make videos placeholder
         self.videos_dir.mkdir(exist_ok=True)
 
@@ -573,33 +766,47 @@ class Youtube2Zim:
             self.user_short_uploads_playlist_id,
             self.user_lives_playlist_id,
             self.is_playlist,
-        ) = extract_playlists_details_from(self.youtube_id)
+        ) = extract_playlists_details_from(
+            self.youtube_id, concurrency=self.metadata_concurrency
+        )
 
     def extract_videos_list(self):
         all_videos = load_json(self.cache_dir, "videos")
         if all_videos is None:
             all_videos = {}
 
+            # discovery stops while details of videos found can still be paid for
+            discovered = DiscoveredVideos(concurrency=self.metadata_concurrency)
+
             empty_playlists = []
+            # fetch all playlists items in parallel, results are in playlists order.
+            # items are stored as they are fetched and read back lazily
+            playlists_videos_json = map_concurrently(
+                functools.partial(
+                    get_videos_json, date_range=self.dateafter, discovered=discovered
+                ),
+                [playlist.playlist_id for playlist in self.playlists],
+                self.metadata_concurrency,
+            )
+            discovered.release()
             # we only return video_ids that we'll use later on. per-playlist JSON stored
-            for playlist in self.playlists:
-                videos_json = get_videos_json(playlist.playlist_id)
+            skip_outofrange = functools.partial(skip_outofrange_videos, self.dateafter)
+            for playlist, videos_json in zip(
+                self.playlists, playlists_videos_json, strict=True
+            ):
                 # filter in videos within date range and filter away deleted videos
-                skip_outofrange = functools.partial(
-                    skip_outofrange_videos, self.dateafter
-                )
                 filter_videos = filter(skip_outofrange, videos_json)
                 filter_videos = filter(skip_deleted_videos, filter_videos)
                 filter_videos = filter(skip_non_public_videos, filter_videos)
-                filter_videos = list(filter_videos)
-                if len(filter_videos) == 0:
+                is_empty = True
+                for video in filter_videos:
+                    all_videos[video["contentDetails"]["videoId"]] = video
+                    is_empty = False
+                if is_empty:
                     logger.warning(
                         f"Playlist '{playlist.playlist_id}' is empty, will be ignored"
                     )
                     empty_playlists.append(playlist)
-                all_videos.update(
-                    {v["contentDetails"]["videoId"]: v for v in filter_videos}
-                )
             save_json(self.cache_dir, "videos", all_videos)
 
             for playlist in empty_playlists:
@@ -610,7 +817,43 @@ class Youtube2Zim:
                 raise Exception("No videos found in playlists")
         self.videos_ids = [*all_videos.keys()]  # unpacking so it's subscriptable
 
+    def skip_videos_without_details(self, videos_details):
+        """remove videos that have no details from the list of videos
+
+        those are unavailable ones or were over quota budget ; they would not be
+        listed in the ZIM anyway (see videos_channels)"""
+        videos_ids = [
+            video_id for video_id in self.videos_ids if video_id in videos_details
+        ]
+        if len(videos_ids) < len(self.videos_ids):
+            logger.warning(
+                f"{len(self.videos_ids) - len(videos_ids)} video(s) without details "
+                "are skipped"
+            )
+            self.videos_ids = videos_ids
+            self.video_ids_count = len(videos_ids)
+        if not videos_ids:
+            raise Exception("No videos to process: none of them has details")
+
+    def compute_videos_costs(self, videos_details):
+        """estimate processing cost of each video from its duration
+
+        videos without details (unavailable ones, most likely) cost nothing"""
+        self.videos_costs = {
+            video_id: estimate_video_cost(
+                videos_details[video_id]["duration_seconds"],
+                self.video_format,
+                self.video_quality,
+                reencode=not self.skip_reencoding,
+            )
+            for video_id in self.videos_ids
+            if video_id in videos_details
+        }
+
     def download_video_files(self, max_concurrency):
+        if not self.video_ids_count:
+            return [], []
+
         # prepare options which are shared with every downloader
         options = {
             "cachedir": self.videos_dir,
@@ -638,87 +881,134 @@ class Youtube2Zim:
         nb_videos = self.video_ids_count
         concurrency = nb_videos if nb_videos < max_concurrency else max_concurrency
 
-        # short-circuit concurency if we have only one thread (can help debug)
-        if concurrency <= 1:
-            return self.download_video_files_batch(options, self.videos_ids)
-
-        # prepare out videos_ids batches
-        def get_slot():
-            n = 0
-            while True:
-                yield n
-                n += 1
-                if n >= concurrency:
-                    n = 0
-
-        batches = [[] for _ in range(0, concurrency)]
-        slot = get_slot()
-        for video_id in self.videos_ids:
-            batches[next(slot)].append(video_id)
-
-        overall_succeeded = []
-        overall_failed = []
-        # execute the batches concurrently
-        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
-            fs = [
-                executor.submit(self.download_video_files_batch, options, videos_ids)
-                for videos_ids in batches
-            ]
-            done, not_done = concurrent.futures.wait(
-                fs, return_when=concurrent.futures.ALL_COMPLETED
-            )
+        # each video is extracted once, its info feeding all following steps
+        extractor = VideoInfoExtractor(options)
 
-            # we have some `not_done` batches, indicating errors within
-            if not_done:
-                logger.critical(
-                    "Not all video-processing batches completed. Cancelling…"
-                )
-                for future in not_done:
-                    exc = future.exception()
-                    if exc:
-                        logger.exception(exc)
-                        raise exc
-
-            # retrieve our list of successful/failed video_ids
-            for future in done:
-                succeeded, failed = future.result()
-                overall_succeeded += succeeded
-                overall_failed += failed
+        def stage(func):
+            """pipeline stage function returning video_id or None if failed"""
+
+            def stage_func(video_id):
+                return video_id if func(video_id, extractor) else None
+
+            return stage_func
+
+        def on_video_done(video_id, success):  # noqa: ARG001
+            extractor.forget(video_id)
+            self.videos_processed += 1
+            run_pending()
+
+        # videos go through a pipeline of stages, each with its own pool of
+        # workers, so that network and CPU are used at the same time: download
+        # (from cache or youtube), re-encoding then thumbnail, subtitles and chapters
+        pipeline = Pipeline(
+            [
+                Stage("download", stage(self.download_video), workers=concurrency),
+                Stage(
+                    "encode",
+                    stage(self.process_video),
+                    workers=self.encode_concurrency,
+                    # limit downloaded videos waiting for encoding (disk usage)
+                    queue_size=self.encode_concurrency,
+                    initializer=(
+                        functools.partial(
+                            lower_thread_priority, self.encode_nice, self.encode_ionice
+                        )
+                        if self.encode_nice or self.encode_ionice
+                        else None
+                    ),
+                ),
+                Stage(
+                    "post-process",
+                    stage(self.post_process_video_files),
+                    workers=self.postprocess_concurrency,
+                ),
+            ],
+            on_item_done=on_video_done,
+        )
+
+        # Most expensive videos come first (longest processing time first) to
+        # shorten the overall time
+        videos_ids = sorted(
+            self.videos_ids,
+            key=lambda video_id: self.videos_costs.get(video_id, 0),
+            reverse=True,
+        )
+
+        # short-circuit concurency if we have only one video (can help debug)
+        try:
+            if nb_videos <= 1:
+                overall_succeeded = pipeline.run_sequentially(videos_ids)
+            else:
+                overall_succeeded = pipeline.run(videos_ids)
+        finally:
+            extractor.close()
+        succeeded_ids = set(overall_succeeded)
+        overall_failed = [
+            video_id for video_id in videos_ids if video_id not in succeeded_ids
+        ]
 
         # remove left-over files for failed downloads
         logger.debug(f"removing left-over files of {len(overall_failed)} failed videos")
         for video_id in overall_failed:
             shutil.rmtree(self.videos_dir.joinpath(video_id), ignore_errors=True)
+            self.journal.forget(video_id)
 
         return overall_succeeded, overall_failed
 
+    @property
+    def has_cache(self):
+        """whether an optimization cache (local and/or S3) is configured"""
+        return bool(self.local_cache or self.s3_storage)
+
     def download_from_cache(
         self, key, dest_path, encoder_version=None, max_age_seconds=None
     ):
-        """whether it successfully downloaded from cache"""
+        """whether it successfully downloaded from cache
+
+        local cache is checked first ; files from S3 are then kept in it"""
+        if not self.has_cache:
+            raise Exception("Cannot download from cache if none is configured")
+
+        version = f"v{encoder_version}" if encoder_version else None
+        if self.local_cache and self.local_cache.get(
+            key,
+            dest_path,
+            version=None if self.use_any_optimized_version else version,
+            max_age_seconds=max_age_seconds,
+        ):
+            return True
         if not self.s3_storage:
-            raise Exception(
-                "Cannot download from cache if s3_storage is not configured"
-            )
+            return False
 
-        if encoder_version:
-            if self.use_any_optimized_version:
-                if not self.s3_storage.has_object(key, self.s3_storage.bucket_name):
-                    return False
-            elif not self.s3_storage.has_object_matching_meta(
+        # existence and age are known from the index if it covers key
+        indexed, info = False, None
+        if self.s3_index and self.s3_index.is_indexed(key):
+            indexed, info = True, self.s3_index.get(key)
+            if info is None:
+                return False
+
+        if encoder_version and not self.use_any_optimized_version:
+            # metadata are not part of the index
+            if not self.s3_storage.has_object_matching_meta(
                 key, tag="encoder_version", value=f"v{encoder_version}"
             ):
                 return False
-        elif not self.s3_storage.has_object(key, self.s3_storage.bucket_name):
+        elif not indexed and not self.s3_storage.has_object(
+            key, self.s3_storage.bucket_name
+        ):
             return False
 
         if max_age_seconds is not None:
             try:
-                response = self.s3_storage.client.head_object(
-                    Bucket=self.s3_storage.bucket_name, Key=key
+                last_modified = (
+                    info.last_modified
+                    if info
+                    else self.s3_storage.client.head_object(
+                        Bucket=self.s3_storage.bucket_name, Key=key
+                    )["LastModified"]
                 )
                 age_seconds = (
-                    datetime.datetime.now(datetime.UTC) - response["LastModified"]
+                    datetime.datetime.now(datetime.UTC) - last_modified
                 ).total_seconds()
                 if age_seconds > max_age_seconds:
                     logger.debug(f"S3 cache for {key} is expired")
@@ -733,24 +1023,53 @@ class Youtube2Zim:
             logger.error(f"{key} failed to download from cache: {exc}")
             return False
         logger.info(f"downloaded {dest_path} from cache at {key}")
+        if self.local_cache:
+            # version of object is only known if it was checked
+            self.store_in_local_cache(
+                key, dest_path, None if self.use_any_optimized_version else version
+            )
+        return True
+
+    def store_in_local_cache(self, key, dest_path, version):
+        """whether it successfully stored dest_path in local cache"""
+        if not self.local_cache:
+            return False
+        try:
+            self.local_cache.put(key, dest_path, version)
+        except Exception as exc:
+            logger.error(f"{key} failed to be stored in local cache: {exc}")
+            return False
         return True
 
     def upload_to_cache(self, key, dest_path, encoder_version=None):
-        """whether it successfully uploaded to cache"""
+        """whether it successfully uploaded to (all configured) cache"""
+        if not self.has_cache:
+            raise Exception("Cannot upload to cache if none is configured")
+        meta = {"encoder_version": f"v{encoder_version}"} if encoder_version else {}
+        succeeded = True
+        if self.local_cache:
+            succeeded = self.store_in_local_cache(
+                key, dest_path, meta.get("encoder_version")
+            )
         if not self.s3_storage:
-            raise Exception("Cannot upload to cache if s3_storage is not configured")
+            return succeeded
         try:
-            meta = {"encoder_version": f"v{encoder_version}"} if encoder_version else {}
             self.s3_storage.upload_file(dest_path, key, meta=meta)
+            if self.s3_index:
+                self.s3_index.add(
+                    key,
+                    ObjectInfo(
+                        dest_path.stat().st_size, datetime.datetime.now(datetime.UTC)
+                    ),
+                )
         except Exception as exc:
             logger.error(f"{key} failed to upload to cache: {exc}")
             return False
         logger.info(f"uploaded {dest_path} to cache at {key}")
-        return True
-
-    def download_video(self, video_id, options):
-        """download the video from cache/youtube and return True if successful"""
+        return succeeded
 
+    def get_video_preset(self):
+        """video encoding preset for requested format and quality"""
         preset = {
             "mp4": VideoMp4Low if self.low_quality else VideoMp4High,
             "webm": VideoWebmLow if self.low_quality else VideoWebmHigh,
@@ -760,14 +1079,32 @@ class Youtube2Zim:
                 f"Impossible to find preset for {self.video_format} video format "
                 f"(low quality: {self.low_quality})"
             )
-        preset = preset()
-        options_copy = options.copy()
-        video_location = options_copy["y2z_videos_dir"].joinpath(video_id)
+        return preset()
+
+    def download_video(self, video_id, extractor):
+        """download the video from cache/youtube and return True if successful
+
+        videos from cache are added to the ZIM right away ; others have to go
+        through process_video"""
+
+        preset = self.get_video_preset()
+        video_location = extractor.options["y2z_videos_dir"].joinpath(video_id)
         video_path = video_location.joinpath(f"video.{self.video_format}")
         zim_path = f"videos/{video_id}/video.{self.video_format}"
 
-        s3_key = None
-        if self.s3_storage:
+        # already processed or downloaded by an interrupted run
+        processed_zim_path = self.journal.get(video_id, "encoded")
+        if processed_zim_path and self.add_kept_file_to_zim(processed_zim_path):
+            logger.debug(f"Video file for {video_id} kept from previous run")
+            self.videos_zim_path.update({video_id: processed_zim_path})
+            return True
+        if self.journal.get(video_id, "downloaded") and list_videos_in_dir(
+            video_location
+        ):
+            logger.debug(f"Downloaded video file for {video_id} kept from previous run")
+            return True
+
+        if self.has_cache:
 
             s3_key = f"{self.video_format}/{self.video_quality}/{video_id}"
             logger.debug(
@@ -777,24 +1114,40 @@ class Youtube2Zim:
                 self.add_file_to_zim(
                     zim_path,
                     video_path,
-                    callback=Callback(delete_callback, args=(video_path,)),
+                    callback=file_refs.callback(video_path),
                 )
                 self.videos_zim_path.update({video_id: zim_path})
+                self.journal.mark(video_id, "encoded", value=zim_path)
                 return True
 
         try:
             # skip downloading the thumbnails
-            options_copy.update(
-                {
-                    "writethumbnail": False,
-                    "writesubtitles": False,
-                    "allsubtitles": False,
-                    "writeautomaticsub": False,
-                }
+            extractor.process(
+                video_id,
+                writethumbnail=False,
+                writesubtitles=False,
+                allsubtitles=False,
+                writeautomaticsub=False,
             )
-            with yt_dlp.YoutubeDL(options_copy) as ydl:
-                ydl.download([video_id])
+        except yt_dlp.utils.DownloadError as exc:
+            logger.error(f"Video file for {video_id} could not be downloaded")
+            logger.debug(exc)
+            return False
+        self.journal.mark(video_id, "downloaded")
+        return True
+
+    def process_video(self, video_id, extractor):
+        """re-encode a downloaded video and add it to ZIM, returning True if successful
+
+        nothing to do for videos retrieved from cache by download_video"""
+        if video_id in self.videos_zim_path:
+            return True
 
+        preset = self.get_video_preset()
+        video_location = extractor.options["y2z_videos_dir"].joinpath(video_id)
+        video_path = video_location.joinpath(f"video.{self.video_format}")
+        zim_path = f"videos/{video_id}/video.{self.video_format}"
+        try:
             if self.skip_reencoding:
                 video_path = find_video_in_dir(video_location, video_id)
                 zim_path = f"videos/{video_id}/video{video_path.suffix}"
@@ -804,39 +1157,49 @@ class Youtube2Zim:
                     video_id,
                     preset,
                     self.video_format,
+                    threads=self.encode_threads,
                 )
-
-            self.add_file_to_zim(
-                zim_path,
-                video_path,
-                callback=Callback(delete_callback, args=(video_path,)),
-            )
-            self.videos_zim_path.update({video_id: zim_path})
         except (
-            yt_dlp.utils.DownloadError,
             FileNotFoundError,
             subprocess.CalledProcessError,
         ) as exc:
-            logger.error(f"Video file for {video_id} could not be downloaded")
+            logger.error(f"Video file for {video_id} could not be processed")
             logger.debug(exc)
             return False
-        else:  # upload to cache only if everything went well
-            if self.s3_storage:
-                logger.debug(f"Uploading video file for {video_id} to cache ...")
-                self.upload_to_cache(s3_key, video_path, preset.VERSION)
-            return True
 
-    def download_thumbnail(self, video_id, options):
+        # upload to cache only if everything went well
+        with file_refs.holding([video_path]):
+            if self.uploads:
+                logger.debug(
+                    f"Queuing upload of video file for {video_id} to cache ..."
+                )
+                self.uploads.submit(
+                    f"{self.video_format}/{self.video_quality}/{video_id}",
+                    video_path,
+                    preset.VERSION,
+                )
+            self.add_file_to_zim(
+                zim_path, video_path, callback=file_refs.callback(video_path)
+            )
+        self.videos_zim_path.update({video_id: zim_path})
+        self.journal.mark(video_id, "encoded", value=zim_path)
+        return True
+
+    def download_thumbnail(self, video_id, extractor):
         """download the thumbnail from cache/youtube and return True if successful"""
 
         preset = WebpHigh()
-        options_copy = options.copy()
-        video_location = options_copy["y2z_videos_dir"].joinpath(video_id)
+        video_location = extractor.options["y2z_videos_dir"].joinpath(video_id)
         thumbnail_path = video_location.joinpath("video.webp")
         zim_path = f"videos/{video_id}/video.webp"
 
+        if self.journal.get(video_id, "thumbnail") and self.add_kept_file_to_zim(
+            zim_path
+        ):
+            return True
+
         s3_key = None
-        if self.s3_storage:
+        if self.has_cache:
             s3_key = f"thumbnails/high/{video_id}"
             logger.debug(
                 f"Attempting to download thumbnail for {video_id} from cache..."
@@ -845,28 +1208,21 @@ class Youtube2Zim:
                 self.add_file_to_zim(
                     zim_path,
                     thumbnail_path,
-                    callback=Callback(delete_callback, args=(thumbnail_path,)),
+                    callback=file_refs.callback(thumbnail_path),
                 )
+                self.journal.mark(video_id, "thumbnail")
                 return True
 
         try:
             # skip downloading the video
-            options_copy.update(
-                {
-                    "skip_download": True,
-                    "writesubtitles": False,
-                    "allsubtitles": False,
-                    "writeautomaticsub": False,
-                }
+            extractor.process(
+                video_id,
+                skip_download=True,
+                writesubtitles=False,
+                allsubtitles=False,
+                writeautomaticsub=False,
             )
-            with yt_dlp.YoutubeDL(options_copy) as ydl:
-                ydl.download([video_id])
             process_thumbnail(thumbnail_path, preset.options)
-            self.add_file_to_zim(
-                zim_path,
-                thumbnail_path,
-                callback=Callback(delete_callback, args=(thumbnail_path,)),
-            )
         except (
             yt_dlp.utils.DownloadError,
             FileNotFoundError,
@@ -875,11 +1231,17 @@ class Youtube2Zim:
             logger.error(f"Thumbnail for {video_id} could not be downloaded")
             logger.debug(exc)
             return False
-        else:  # upload to cache only if everything went well
-            if self.s3_storage:
-                logger.debug(f"Uploading thumbnail for {video_id} to cache ...")
-                self.upload_to_cache(s3_key, thumbnail_path, preset.VERSION)
-            return True
+
+        # upload to cache only if everything went well
+        with file_refs.holding([thumbnail_path]):
+            if self.uploads:
+                logger.debug(f"Queuing upload of thumbnail for {video_id} to cache ...")
+                self.uploads.submit(s3_key, thumbnail_path, preset.VERSION)
+            self.add_file_to_zim(
+                zim_path, thumbnail_path, callback=file_refs.callback(thumbnail_path)
+            )
+        self.journal.mark(video_id, "thumbnail")
+        return True
 
     def add_chapters_to_zim(self, video_id: str):
         """add chapters file to zim file"""
@@ -889,7 +1251,7 @@ class Youtube2Zim:
             self.add_file_to_zim(
                 f"videos/{video_id}/{chapters_file.name}",
                 chapters_file,
-                callback=Callback(delete_callback, args=(chapters_file,)),
+                callback=file_refs.callback(chapters_file),
             )
 
     def _write_chapters_vtt(self, video_id, chapters):
@@ -919,13 +1281,17 @@ class Youtube2Zim:
                 chapter_f.write(f"{title}\n\n")
         return chapters_file
 
-    def generate_chapters_vtt(self, video_id):
+    def generate_chapters_vtt(self, video_id, extractor):
         """generate the chapters file of a video if chapters available"""
 
         s3_chapters_key = f"chapters/{video_id}.json"
         chapters_path = self.chapters_cache_dir.joinpath(f"{video_id}.json")
 
-        if self.s3_storage:
+        if self.journal.get(video_id, "chapters"):
+            self.add_chapters_to_zim(video_id)
+            return
+
+        if self.has_cache:
             if self.download_from_cache(
                 s3_chapters_key,
                 chapters_path,
@@ -934,36 +1300,42 @@ class Youtube2Zim:
                 logger.info(f"chapters for {video_id} loaded from S3 cache")
                 with open(chapters_path, encoding="utf-8") as f:
                     cached = json.load(f)
+                save_json(self.chapters_cache_dir, video_id, cached)
                 chapters = cached.get("chapters", [])
                 if chapters:
                     self._write_chapters_vtt(video_id, chapters)
                     self.add_chapters_to_zim(video_id)
+                self.journal.mark(video_id, "chapters")
                 return
 
-        metadata_file = self.videos_dir.joinpath(video_id, "video.info.json")
-        if metadata_file.exists():
-            with open(metadata_file, encoding="utf-8") as f:
-                metadata = json.load(f)
-                chapters = metadata.get("chapters", [])
+        try:
+            chapters = extractor.get_info(video_id).get("chapters") or []
+        except yt_dlp.utils.DownloadError as exc:
+            logger.error(f"Could not retrieve chapters for {video_id}")
+            logger.debug(exc)
+            return
 
-                if not chapters:
-                    logger.info(f"No chapters found for {video_id}")
-                    return
+        if not chapters:
+            logger.info(f"No chapters found for {video_id}")
+            self.journal.mark(video_id, "chapters")
+            return
 
-                logger.info(f"Found {len(chapters)} chapters for {video_id}")
+        logger.info(f"Found {len(chapters)} chapters for {video_id}")
 
-                save_json(
-                    self.chapters_cache_dir,
-                    video_id,
-                    {"chapters": chapters},
-                )
+        save_json(
+            self.chapters_cache_dir,
+            video_id,
+            {"chapters": chapters},
+        )
 
-                self._write_chapters_vtt(video_id, chapters)
-                logger.info(f"Chapters file saved for {video_id}")
-                self.add_chapters_to_zim(video_id)
+        self._write_chapters_vtt(video_id, chapters)
+        logger.info(f"Chapters file saved for {video_id}")
+        self.add_chapters_to_zim(video_id)
+        self.journal.mark(video_id, "chapters")
 
-                if self.s3_storage:
-                    self.upload_to_cache(s3_chapters_key, chapters_path)
+        if self.uploads:
+            save_json_file(chapters_path, {"chapters": chapters})
+            self.uploads.submit(s3_chapters_key, chapters_path)
 
     def fetch_video_subtitles_list(self, video_id: str) -> Subtitles:
         """fetch list of subtitles for a video"""
@@ -1008,16 +1380,20 @@ class Youtube2Zim:
                 self.add_file_to_zim(
                     f"videos/{video_id}/{file.name}",
                     file,
-                    callback=Callback(delete_callback, args=(file,)),
+                    callback=file_refs.callback(file),
                 )
 
-    def download_subtitles(self, video_id, options):
+    def download_subtitles(self, video_id, extractor):
         """download subtitles for a video"""
 
         s3_subtitles_key = f"subtitles/{video_id}.json"
         subtitles_path = self.subtitles_cache_dir.joinpath(f"{video_id}.json")
 
-        if self.s3_storage:
+        if self.journal.get(video_id, "subtitles"):
+            self.add_video_subtitles_to_zim(video_id)
+            return
+
+        if self.has_cache:
             if self.download_from_cache(
                 s3_subtitles_key,
                 subtitles_path,
@@ -1052,16 +1428,13 @@ class Youtube2Zim:
                         break
                 else:
                     # all .vtt files retrieved succeffuly
+                    save_json(self.subtitles_cache_dir, video_id, cached)
                     self.add_video_subtitles_to_zim(video_id)
+                    self.journal.mark(video_id, "subtitles")
                     return
 
-        options_copy = options.copy()
-        options_copy.update(
-            {"skip_download": True, "writethumbnail": False, "writeinfojson": True}
-        )
         try:
-            with yt_dlp.YoutubeDL(options_copy) as ydl:
-                ydl.download([video_id])
+            extractor.process(video_id, skip_download=True, writethumbnail=False)
             subtitles_list = self.fetch_video_subtitles_list(video_id)
             # save subtitles to cache for generating JSON files later
             save_json(
@@ -1069,54 +1442,71 @@ class Youtube2Zim:
                 video_id,
                 subtitles_list.dict(by_alias=True),
             )
-            self.add_video_subtitles_to_zim(video_id)
         except Exception:
             logger.error(f"Could not download subtitles for {video_id}")
             return
 
-        # upload JSON and each .vtt to s3
-        if self.s3_storage:
-            self.upload_to_cache(s3_subtitles_key, subtitles_path)
-            video_dir = self.videos_dir.joinpath(video_id)
-
-            for vtt_file in video_dir.iterdir():
-                if vtt_file.suffix == ".vtt" and vtt_file.name != "chapters.vtt":
-                    self.upload_to_cache(
+        # upload JSON and each .vtt to cache, .vtt being kept until added to ZIM
+        vtt_files = [
+            vtt_file
+            for vtt_file in self.videos_dir.joinpath(video_id).iterdir()
+            if vtt_file.suffix == ".vtt" and vtt_file.name != "chapters.vtt"
+        ]
+        with file_refs.holding(vtt_files):
+            if self.uploads:
+                save_json_file(subtitles_path, subtitles_list.dict(by_alias=True))
+                self.uploads.submit(s3_subtitles_key, subtitles_path)
+                for vtt_file in vtt_files:
+                    self.uploads.submit(
                         f"subtitles/{video_id}/{vtt_file.name}", vtt_file
                     )
+            self.add_video_subtitles_to_zim(video_id)
+        self.journal.mark(video_id, "subtitles")
 
-    def download_video_files_batch(self, options, videos_ids):
-        """download video file and thumbnail for all videos in batch
-
-        returning succeeded and failed video ids"""
+    def post_process_video_files(self, video_id, extractor):
+        """download thumbnail, subtitles and chapters of a processed video
 
-        succeeded = []
-        failed = []
-        for video_id in videos_ids:
-            run_pending()
-            if self.download_video(video_id, options) and self.download_thumbnail(
-                video_id, options
-            ):
-                self.download_subtitles(video_id, options)
-                self.generate_chapters_vtt(video_id)
-                succeeded.append(video_id)
-            else:
-                failed.append(video_id)
-            self.videos_processed += 1
-        return succeeded, failed
+        returning whether it succeeded (thumbnail is mandatory)"""
+        if not self.download_thumbnail(video_id, extractor):
+            return False
+        self.download_subtitles(video_id, extractor)
+        self.generate_chapters_vtt(video_id, extractor)
+        return True
 
     def download_authors_branding(self):
         videos_channels_json = load_mandatory_json(self.cache_dir, "videos_channels")
         uniq_channel_ids = list(
             {chan["channelId"] for chan in videos_channels_json.values()}
         )
+        # warm channels cache for all authors at once (batched requests)
+        try:
+            get_channels_json(uniq_channel_ids, concurrency=self.metadata_concurrency)
+        except QuotaBudgetExceededError as exc:
+            logger.warning(f"Authors channels not all retrieved: {exc}")
+        missing_channel_ids = set()
         for channel_id in uniq_channel_ids:
-            save_channel_branding(self.channels_dir, channel_id, save_banner=False)
+            try:
+                save_channel_branding(self.channels_dir, channel_id, save_banner=False)
+            except QuotaBudgetExceededError as exc:
+                logger.warning(f"Videos of channel #{channel_id} are skipped: {exc}")
+                missing_channel_ids.add(channel_id)
+                continue
             channel_profile_path = self.channels_dir / channel_id / "profile.jpg"
             self.add_file_to_zim(
                 f"channels/{channel_id}/profile.jpg",
                 channel_profile_path,
-                callback=Callback(delete_callback, args=(channel_profile_path,)),
+                callback=file_refs.callback(channel_profile_path),
+            )
+        # videos of authors without channel info are not listed (see has_channel)
+        if missing_channel_ids:
+            save_json(
+                self.cache_dir,
+                "videos_channels",
+                {
+                    video_id: chan
+                    for video_id, chan in videos_channels_json.items()
+                    if chan["channelId"] not in missing_channel_ids
+                },
             )
 
     def add_main_channel_branding_to_zim(self):
@@ -1128,9 +1518,7 @@ class Youtube2Zim:
         ]
         for filename, path in branding_items:
             if path.exists():
-                self.add_file_to_zim(
-                    filename, path, callback=Callback(delete_callback, args=(path,))
-                )
+                self.add_file_to_zim(filename, path, callback=file_refs.callback(path))
 
     def update_metadata(self):
         # we use title, description, profile and banner of channel/user
@@ -1235,7 +1623,7 @@ class Youtube2Zim:
             return chapters_list["chapters"]
 
         def get_videos_list(playlist):
-            videos = load_mandatory_json(
+            videos = iter_paged_json(
                 self.cache_dir, f"playlist_{playlist.playlist_id}_videos"
             )
             videos = list(filter(skip_deleted_videos, videos))
@@ -1326,9 +1714,7 @@ class Youtube2Zim:
                 thumbnail_path=get_thumbnail_path(
                     videos[0]["contentDetails"]["videoId"]
                 ),
-                duration=isodate.duration_isoformat(
-                    datetime.timedelta(seconds=playlist_duration)
-                ),
+                duration=format_duration(playlist_duration),
             )
 
         def generate_playlist_preview_object(playlist) -> PlaylistPreview:
@@ -1346,9 +1732,7 @@ class Youtube2Zim:
                 ),
                 videos_count=len(videos),
                 main_video_slug=get_video_slug(videos[0]),
-                duration=isodate.duration_isoformat(
-                    datetime.timedelta(seconds=playlist_duration)
-                ),
+                duration=format_duration(playlist_duration),
             )
 
         def get_playlist_slug(playlist) -> str:
@@ -1498,6 +1882,9 @@ class Youtube2Zim:
         if not fpath.exists():
             logger.error(f"File {fpath} does not exist")
             return
+        if self.work_dir:
+            # files are kept for the ZIM to be rebuilt if this run is interrupted
+            callback = None
         logger.debug(f"Adding {path} to ZIM")
         self.zim_file.add_item_for(
             path,
@@ -1505,6 +1892,16 @@ class Youtube2Zim:
             callbacks=callback,
         )
 
+    def add_kept_file_to_zim(self, zim_path: str):
+        """add file of a stage completed by a previous run, returning if it exists
+
+        files are kept in build_dir at their path in ZIM"""
+        fpath = self.build_dir.joinpath(zim_path)
+        if not fpath.exists():
+            return False
+        self.add_file_to_zim(zim_path, fpath, callback=file_refs.callback(fpath))
+        return True
+
     def add_custom_item_to_zim_index(
         self, title: str, content: str, fname: str, zimui_redirect: str
     ):
@@ -1534,5 +1931,15 @@ class Youtube2Zim:
         progress = {
             "done": self.videos_processed,
             "total": self.video_ids_count,
+            "api_quota": api_client.quota_report(),
         }
         self.stats_path.write_text(json.dumps(progress, indent=2))
+
+    def log_quota_usage(self):
+        """log Youtube API quota units used so far"""
+        report = api_client.quota_report()
+        budget = f" (budget: {report['budget']})" if report["budget"] else ""
+        logger.info(
+            f"Youtube API quota used: {report['used']} units{budget} "
+            f"{report['endpoints']}, {report['not_modified']} not modified"
+        )
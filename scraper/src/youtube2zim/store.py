@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# vim: ai ts=4 sts=4 et sw=4 nu
+
+"""SQLite-backed store for JSON metadata (API responses and derived data)
+
+Records are JSON documents identified by a namespace and a key, with an optional
+expiry. The database uses WAL journaling and one connection per thread so that
+download workers can read and write concurrently. A store can be kept across runs
+(see --api-cache-dir)."""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+BUSY_TIMEOUT_MS = 30000
+
+
+class MetadataStore:
+    """Thread-safe key/JSON-value store in a single SQLite database"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        conn = self.connection
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "namespace TEXT NOT NULL, "
+            "key TEXT NOT NULL, "
+            "data TEXT NOT NULL, "
+            "expires_at REAL, "
+            "PRIMARY KEY (namespace, key)"
+            ") WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS records_expires_at ON records(expires_at)"
+        )
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """connection of current thread, opened on first use"""
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, isolation_level=None, check_same_thread=False
+            )
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def get(self, namespace, key):
+        """JSON data of a record or None if missing or expired"""
+        row = self.connection.execute(
+            "SELECT data, expires_at FROM records WHERE namespace=? AND key=?",
+            (namespace, key),
+        ).fetchone()
+        if row is None:
+            return None
+        data, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            self.delete(namespace, key)
+            return None
+        return json.loads(data)
+
+    def set(self, namespace, key, data, ttl=None):
+        """create or replace a record, expiring after ttl seconds if set"""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO records (namespace, key, data, expires_at) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                namespace,
+                key,
+                json.dumps(data, separators=(",", ":")),
+                time.time() + ttl if ttl is not None else None,
+            ),
+        )
+
+    def delete(self, namespace, key):
+        self.connection.execute(
+            "DELETE FROM records WHERE namespace=? AND key=?", (namespace, key)
+        )
+
+    def clear(self, namespace):
+        """remove all records of a namespace"""
+        self.connection.execute("DELETE FROM records WHERE namespace=?", (namespace,))
+
+    def clear_except(self, namespace):
+        """remove all records but those of a namespace"""
+        self.connection.execute("DELETE FROM records WHERE namespace!=?", (namespace,))
+
+    def purge_expired(self):
+        """remove all expired records, returning their number"""
+        return self.connection.execute(
+            "DELETE FROM records WHERE expires_at < ?", (time.time(),)
+        ).rowcount
+
+    def close(self):
+        """close connections of all threads"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._local = threading.local()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# vim: ai ts=4 sts=4 et sw=4 nu
+
+"""S3 optimization cache storage with tuned multipart transfers
+
+Cached videos are hundreds of MB: transferred over a single connection, a cache hit
+is bound by the throughput of one TCP stream rather than by the network bandwidth.
+Objects larger than the chunk size are thus uploaded in multipart and downloaded
+with ranged GETs of chunk size, `concurrency` parts of an object being transferred
+in parallel.
+
+All transfers (pipeline workers and background uploads) share the client's
+connection pool, which is sized for all of them to run at once."""
+
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from kiwixstorage import KiwixStorage
+
+DEFAULT_CHUNK_SIZE = 8 * 2**20  # bytes
+MIN_S3_CHUNK_SIZE = 5 * 2**20  # S3 multipart parts (except last) are at least 5MiB
+DEFAULT_TRANSFER_CONCURRENCY = 10  # parts of an object transferred at once
+MIN_POOL_SIZE = 10  # botocore's default
+
+
+def get_pool_size(transfer_concurrency, nb_transfers):
+    """connections needed for nb_transfers concurrent transfers"""
+    return max(MIN_POOL_SIZE, transfer_concurrency * nb_transfers)
+
+
+class TunedStorage(KiwixStorage):
+    """KiwixStorage transferring files with a tuned TransferConfig by default"""
+
+    def __init__(
+        self,
+        url,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        concurrency=DEFAULT_TRANSFER_CONCURRENCY,
+        pool_size=MIN_POOL_SIZE,
+        **kwargs,
+    ):
+        super().__init__(url, **kwargs)
+        self._config = self._config.merge(Config(max_pool_connections=pool_size))
+        self.transfer_config = TransferConfig(
+            multipart_threshold=chunk_size,
+            multipart_chunksize=chunk_size,
+            max_concurrency=concurrency,
+            use_threads=concurrency > 1,
+        )
+
+    def upload_file(self, fpath, key, bucket_name=None, meta=None, **kwargs):
+        kwargs.setdefault("Config", self.transfer_config)
+        super().upload_file(fpath, key, bucket_name=bucket_name, meta=meta, **kwargs)
+
+    def download_file(self, key, fpath, bucket_name=None, **kwargs):
+        kwargs.setdefault("Config", self.transfer_config)
+        super().download_file(key, fpath, bucket_name=bucket_name, **kwargs)
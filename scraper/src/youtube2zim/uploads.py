@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# vim: ai ts=4 sts=4 et sw=4 nu
+
+"""Background upload of processed files to the optimization cache
+
+Uploads are queued and run by their own pool of workers instead of blocking the
+pipeline worker which produced the file. The queue is bounded: producers wait
+when uploads lag behind (backpressure), so that files pending upload do not fill
+the disk.
+
+A file is both added to the ZIM (and deleted by the Creator's callback once written)
+and uploaded: its lifetime is reference-counted so that it is deleted only once
+both are done with it. A reference is held while the file is handed over to both,
+as an upload may complete before the file is added to the ZIM."""
+
+import collections
+import contextlib
+import queue
+import threading
+import time
+from pathlib import Path
+
+from zimscraperlib.typing import Callback
+
+from youtube2zim.constants import logger
+from youtube2zim.utils import delete_callback
+
+DEFAULT_UPLOAD_CONCURRENCY = 2
+UPLOAD_RETRIES = 3
+UPLOAD_RETRY_BACKOFF = 5  # seconds, doubled after each failed attempt
+_STOP = object()  # marker telling a worker there are no more uploads
+
+
+class FileRefs:
+    """reference counts of files, deleted when their last reference is released"""
+
+    def __init__(self):
+        self._refs = collections.Counter()
+        self._lock = threading.Lock()
+
+    def acquire(self, fpath: Path):
+        with self._lock:
+            self._refs[fpath] += 1
+
+    def release(self, fpath: Path):
+        with self._lock:
+            self._refs[fpath] -= 1
+            if self._refs[fpath] > 0:
+                return
+            del self._refs[fpath]
+        delete_callback(fpath)
+
+    @contextlib.contextmanager
+    def holding(self, fpaths: list[Path]):
+        """keep fpaths while they are queued for upload and added to ZIM"""
+        for fpath in fpaths:
+            self.acquire(fpath)
+        try:
+            yield
+        finally:
+            for fpath in fpaths:
+                self.release(fpath)
+
+    def callback(self, fpath: Path):
+        """Creator callback releasing a reference acquired right away"""
+        self.acquire(fpath)
+        return Callback(self.release, args=(fpath,))
+
+
+file_refs = FileRefs()
+
+
+class UploadQueue:
+    """bounded queue of files uploaded in background by a pool of threads
+
+    upload(key, fpath, *args) returns whether it succeeded ; failed uploads are
+    retried with a backoff. Files are released (see FileRefs) once uploaded"""
+
+    def __init__(
+        self,
+        upload,
+        workers=DEFAULT_UPLOAD_CONCURRENCY,
+        retries=UPLOAD_RETRIES,
+        backoff=UPLOAD_RETRY_BACKOFF,
+    ):
+        self.upload = upload
+        self.retries = retries
+        self.backoff = backoff
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=workers * 2)
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"upload-{number}", daemon=True)
+            for number in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key, fpath: Path, *args):
+        """queue upload of fpath to key, waiting if queue is full"""
+        file_refs.acquire(fpath)
+        self._queue.put((key, fpath, args))
+
+    def _upload(self, key, fpath, args):
+        for attempt in range(self.retries + 1):
+            if attempt:
+                delay = self.backoff * 2 ** (attempt - 1)
+                logger.debug(f"Retrying upload of {key} in {delay}s")
+                time.sleep(delay)
+            if self.upload(key, fpath, *args):
+                return
+        logger.error(f"Giving up uploading {key} after {self.retries + 1} attempts")
+        with self._lock:
+            self.failed += 1
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                key, fpath, args = item
+                try:
+                    self._upload(key, fpath, args)
+                except Exception as exc:
+                    logger.error(f"Unexpected error uploading {key}: {exc}")
+                    with self._lock:
+                        self.failed += 1
+                finally:
+                    file_refs.release(fpath)
+            finally:
+                self._queue.task_done()
+
+    def pending(self):
+        """approximate number of queued uploads"""
+        return self._queue.qsize()
+
+    def flush(self):
+        """wait for all queued uploads to complete"""
+        self._queue.join()
+
+    def close(self):
+        """complete queued uploads and stop workers"""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
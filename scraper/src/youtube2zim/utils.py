@@ -1,12 +1,33 @@
 #!/usr/bin/env python3
 # vim: ai ts=4 sts=4 et sw=4 nu
 
+import concurrent.futures
+import datetime
 import json
 import os
+import re
+import sqlite3
+import threading
 from pathlib import Path
 
+import isodate
+from dateutil import parser as dt_parser
 from slugify import slugify
 
+from youtube2zim.constants import logger
+from youtube2zim.store import MetadataStore
+
+METADATA_DB_NAME = "metadata.sqlite3"
+
+# durations as sent by Youtube API (eg. PT1H2M3S, P1DT2H or P0D)
+YOUTUBE_DURATION_PATTERN = re.compile(
+    r"^P(?:(?P<days>\d+)D)?"
+    r"(?:T(?=\d)(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$"
+)
+
+_stores: dict[Path, MetadataStore] = {}
+_stores_lock = threading.Lock()
+
 
 def get_slug(text, *, js_safe=True):
     """slug from text to build URL parts"""
@@ -20,26 +41,179 @@ def clean_text(text):
     return text.strip().replace("\n", " ").replace("\r", " ")
 
 
-def save_json(cache_dir: Path, key, data):
-    """save JSON collection to path"""
-    with open(cache_dir.joinpath(f"{key}.json"), "w") as fp:
-        json.dump(data, fp, indent=4)
+def parse_datetime(value: str) -> datetime.datetime:
+    """datetime of an RFC 3339 timestamp (as sent by Youtube API)
+
+    falls back to the (much slower) generic parser for other formats"""
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return dt_parser.parse(value)
+
+
+def parse_duration(value: str) -> int:
+    """number of seconds of an ISO-8601 duration (as sent by Youtube API)
+
+    falls back to the (much slower) generic parser for other formats"""
+    match = YOUTUBE_DURATION_PATTERN.match(value)
+    if match is None or value == "P":
+        return int(isodate.parse_duration(value).total_seconds())
+    days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def format_duration(seconds: int) -> str:
+    """ISO-8601 duration of a number of seconds (same output as isodate)"""
+    days, seconds = divmod(int(seconds), 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    time_part = "".join(
+        f"{value}{unit}"
+        for value, unit in ((hours, "H"), (minutes, "M"), (seconds, "S"))
+        if value
+    )
+    if not days and not time_part:
+        return "P0D"
+    return "P" + (f"{days}D" if days else "") + (f"T{time_part}" if time_part else "")
+
+
+def open_store(root_dir: Path) -> MetadataStore:
+    """metadata store for root_dir and its sub-folders (created if needed)"""
+    root_dir = Path(root_dir)
+    with _stores_lock:
+        if root_dir not in _stores:
+            _stores[root_dir] = MetadataStore(root_dir.joinpath(METADATA_DB_NAME))
+        return _stores[root_dir]
+
+
+def get_store(cache_dir: Path) -> tuple[MetadataStore, str]:
+    """metadata store holding cache_dir records and cache_dir namespace in it
+
+    cache_dir uses the store opened (see open_store) for it or a parent folder ;
+    raises ValueError if there is none"""
+    cache_dir = Path(cache_dir)
+    with _stores_lock:
+        for root_dir, store in _stores.items():
+            if cache_dir == root_dir or root_dir in cache_dir.parents:
+                return store, cache_dir.relative_to(root_dir).as_posix()
+    raise ValueError(f"No metadata store open for {cache_dir}")
+
+
+def close_stores():
+    """close all open metadata stores"""
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
+
+
+def save_json(cache_dir: Path, key, data, ttl=None):
+    """save JSON collection to store, expiring after ttl seconds if set"""
+    store, namespace = get_store(cache_dir)
+    store.set(namespace, key, data, ttl=ttl)
 
 
 def load_json(cache_dir: Path, key):
-    """load JSON collection from path or None"""
-    fname = cache_dir.joinpath(f"{key}.json")
-    if not fname.exists():
-        return None
+    """load JSON collection from store or None (also if unreadable)"""
+    store, namespace = get_store(cache_dir)
     try:
-        return json.loads(fname.read_bytes())
-    except Exception:
+        return store.get(namespace, key)
+    except (sqlite3.OperationalError, json.JSONDecodeError) as exc:
+        logger.warning(f"Unable to load {key} from {cache_dir} metadata: {exc}")
         return None
 
 
 def load_mandatory_json(cache_dir: Path, key):
-    """load mandatory JSON collection from path"""
-    return json.loads(cache_dir.joinpath(f"{key}.json").read_bytes())
+    """load mandatory JSON collection from store"""
+    data = load_json(cache_dir, key)
+    if data is None:
+        raise KeyError(f"Missing {key} in {cache_dir} metadata")
+    return data
+
+
+def get_page_key(key, index):
+    """key of a page record of a paged JSON collection"""
+    return f"{key}/{index}"
+
+
+def is_paged_json_complete(cache_dir: Path, key):
+    """whether all pages of a paged JSON collection are stored"""
+    state = load_json(cache_dir, key)
+    return bool(state and state["complete"])
+
+
+def iter_paged_json(cache_dir: Path, key, fetch_page=None):
+    """items of a paged JSON collection, stored page by page as they are fetched
+
+    Stored pages are yielded first. If collection is not complete and `fetch_page`
+    is set, remaining pages are fetched and stored one at a time: fetch_page takes
+    a page token (None for first page) and returns (items, next_page_token).
+    An interrupted pagination thus resumes from the last stored page token."""
+    state = load_json(cache_dir, key) or {
+        "pages": 0,
+        "next_page_token": None,
+        "complete": False,
+    }
+    for index in range(state["pages"]):
+        yield from load_json(cache_dir, get_page_key(key, index)) or []
+    if fetch_page is None:
+        return
+    while not state["complete"]:
+        items, next_page_token = fetch_page(state["next_page_token"])
+        save_json(cache_dir, get_page_key(key, state["pages"]), items)
+        state = {
+            "pages": state["pages"] + 1,
+            "next_page_token": next_page_token,
+            "complete": not next_page_token,
+        }
+        save_json(cache_dir, key, state)
+        yield from items
+
+
+def save_paged_json(cache_dir: Path, key, items, page_size=50):
+    """store items iterable as a complete paged JSON collection
+
+    items are consumed page by page ; pages of a previous collection are replaced"""
+    previous = load_json(cache_dir, key)
+    store, namespace = get_store(cache_dir)
+    store.delete(namespace, key)
+    index, page = 0, []
+    for item in items:
+        page.append(item)
+        if len(page) == page_size:
+            save_json(cache_dir, get_page_key(key, index), page)
+            index, page = index + 1, []
+    if page:
+        save_json(cache_dir, get_page_key(key, index), page)
+        index += 1
+    for stale_index in range(index, previous["pages"] if previous else 0):
+        store.delete(namespace, get_page_key(key, stale_index))
+    save_json(
+        cache_dir, key, {"pages": index, "next_page_token": None, "complete": True}
+    )
+
+
+def save_json_file(fpath: Path, data):
+    """save JSON to a file (eg. for exchange with S3 cache)
+
+    file is replaced rather than overwritten, as it might be linked to a cached one"""
+    tmp_path = Path(fpath).with_name(f"{Path(fpath).name}.tmp")
+    with open(tmp_path, "w") as fp:
+        json.dump(data, fp, indent=4)
+    tmp_path.replace(fpath)
+
+
+def map_concurrently(func, items, concurrency):
+    """list of func(item) for each item, computed by up to `concurrency` threads
+
+    results are in the same order as items ; first exception is re-raised"""
+    items = list(items)
+    if concurrency <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(concurrency, len(items))
+    ) as executor:
+        return list(executor.map(func, items))
 
 
 def has_argument(arg_name, all_args):
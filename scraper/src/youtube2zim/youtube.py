@@ -1,27 +1,108 @@
 #!/usr/bin/env python3
 # vim: ai ts=4 sts=4 et sw=4 nu
 
-from http import HTTPStatus
+import datetime
+import math
+import re
+import threading
 
-import isodate
-import requests
-from dateutil import parser as dt_parser
 from zimscraperlib.download import stream_file
 from zimscraperlib.image.transformation import resize_image
 
+from youtube2zim.api import (
+    CHANNELS_API,
+    I18N_REGIONS_API,
+    PLAYLIST_API,
+    PLAYLIST_ITEMS_API,
+    VIDEOS_API,
+    QuotaBudgetExceededError,
+    api_client,
+)
 from youtube2zim.constants import YOUTUBE, logger
-from youtube2zim.utils import get_slug, load_json, save_json
-
-YOUTUBE_API = "https://www.googleapis.com/youtube/v3"
-PLAYLIST_API = f"{YOUTUBE_API}/playlists"
-PLAYLIST_ITEMS_API = f"{YOUTUBE_API}/playlistItems"
-CHANNEL_SECTIONS_API = f"{YOUTUBE_API}/channelSections"
-CHANNELS_API = f"{YOUTUBE_API}/channels"
-SEARCH_API = f"{YOUTUBE_API}/search"
-VIDEOS_API = f"{YOUTUBE_API}/videos"
+from youtube2zim.utils import (
+    get_slug,
+    is_paged_json_complete,
+    iter_paged_json,
+    load_json,
+    map_concurrently,
+    parse_datetime,
+    parse_duration,
+    save_json,
+    save_paged_json,
+)
+
 MAX_VIDEOS_PER_REQUEST = 50  # for VIDEOS_API
+MAX_PLAYLISTS_PER_REQUEST = 50  # for PLAYLIST_API
+MAX_CHANNELS_PER_REQUEST = 50  # for CHANNELS_API
+CHANNEL_PARTS = "brandingSettings,snippet,contentDetails"
+CHANNEL_ID_PATTERN = re.compile(r"^UC[\w-]{22}$")
+# parts and keys of PlaylistItem actually used by the scraper
+PLAYLIST_ITEM_PROJECTION = {
+    "snippet": ("title", "description", "position", "publishedAt"),
+    "contentDetails": ("videoId", "videoPublishedAt"),
+    "status": ("privacyStatus",),
+}
+# parts and keys of Video (from VIDEOS_API) actually used by the scraper
+VIDEO_PROJECTION = {
+    "id": None,
+    "snippet": ("channelId", "channelTitle"),
+    "contentDetails": ("duration",),
+}
+# uploads playlists (UU, UULF, UUSH, UULV…) are ordered newest-first
+NEWEST_FIRST_PLAYLIST_PREFIX = "UU"
 RESULTS_PER_PAGE = 50  # max: 50
-REQUEST_TIMEOUT = 60
+DEFAULT_METADATA_CONCURRENCY = 8  # parallel playlists lookups
+
+
+def get_fields(projection):
+    """`fields` request parameter (partial response) for items of a projection"""
+    items_fields = ",".join(
+        f"{part}({','.join(keys)})" if keys else part
+        for part, keys in projection.items()
+    )
+    return f"etag,nextPageToken,items({items_fields})"
+
+
+def prune_item(item, projection):
+    """copy of an API item with only the parts and keys of projection"""
+    return {
+        part: (
+            item[part]
+            if keys is None
+            else {key: item[part][key] for key in keys if key in item[part]}
+        )
+        for part, keys in projection.items()
+        if part in item
+    }
+
+
+class DiscoveredVideos:
+    """IDs of videos found while listing playlists, reserving quota for their details
+
+    details are requested by chunks of MAX_VIDEOS_PER_REQUEST (see
+    get_videos_authors_info). Those of the pages being fetched (up to `concurrency`
+    at once) are reserved as well so that discovery stops while details of all
+    videos it found can still be paid for"""
+
+    def __init__(self, concurrency=1):
+        self.ids = set()
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self.reserve()
+
+    def reserve(self):
+        api_client.reserve_quota(
+            math.ceil(len(self.ids) / MAX_VIDEOS_PER_REQUEST) + self.concurrency
+        )
+
+    def add(self, videos_ids):
+        with self._lock:
+            self.ids.update(videos_ids)
+            self.reserve()
+
+    def release(self):
+        """discovery is over, later steps are only limited by the budget"""
+        api_client.reserve_quota(0)
 
 
 class ChannelNotFoundError(Exception):
@@ -56,19 +137,30 @@ class Playlist:
 
     @classmethod
     def from_id(cls, playlist_id):
-        playlist_json = get_playlist_json(playlist_id)
-        if playlist_json is None:
-            raise PlaylistNotFoundError(
-                f"Invalid playlistId `{playlist_id}`: Not Found"
+        return cls.from_ids([playlist_id])[0]
+
+    @classmethod
+    def from_ids(cls, playlist_ids, concurrency=1):
+        """list of Playlist for playlist_ids, in order, using batched requests"""
+        playlists_json = get_playlists_json(playlist_ids, concurrency=concurrency)
+        playlists = []
+        for playlist_id in playlist_ids:
+            playlist_json = playlists_json[playlist_id]
+            if playlist_json is None:
+                raise PlaylistNotFoundError(
+                    f"Invalid playlistId `{playlist_id}`: Not Found"
+                )
+            playlists.append(
+                Playlist(
+                    playlist_id=playlist_id,
+                    title=playlist_json["snippet"]["title"],
+                    description=playlist_json["snippet"]["description"],
+                    creator_id=playlist_json["snippet"]["channelId"],
+                    creator_name=playlist_json["snippet"]["channelTitle"],
+                    published_at=playlist_json["snippet"]["publishedAt"],
+                )
             )
-        return Playlist(
-            playlist_id=playlist_id,
-            title=playlist_json["snippet"]["title"],
-            description=playlist_json["snippet"]["description"],
-            creator_id=playlist_json["snippet"]["channelId"],
-            creator_name=playlist_json["snippet"]["channelTitle"],
-            published_at=playlist_json["snippet"]["publishedAt"],
-        )
+        return playlists
 
     def to_dict(self):
         return {
@@ -82,41 +174,39 @@ class Playlist:
 
 
 def credentials_ok():
-    """check that a Youtube search is successful, validating API_KEY"""
-    req = requests.get(
-        SEARCH_API,
-        params={"part": "snippet", "maxResults": 1, "key": YOUTUBE.api_key},
-        timeout=REQUEST_TIMEOUT,
-    )
-    if req.status_code >= HTTPStatus.BAD_REQUEST:
-        logger.error(f"HTTP {req.status_code} Error response: {req.text}")
+    """check that a cheap (1 unit) Youtube API request succeeds, validating API_KEY"""
     try:
-        req.raise_for_status()
-        return bool(req.json()["regionCode"])
+        req_json = api_client.get(I18N_REGIONS_API, {"part": "snippet", "hl": "en"})
+        return bool(req_json["items"])
     except Exception:
         return False
 
 
+def get_channel_criteria(channel_id):
+    """API criteria to look for channel_id with, in order, based on its shape"""
+    if CHANNEL_ID_PATTERN.match(channel_id):
+        # a handle could look like an ID (but very unlikely)
+        return ["id", "forHandle"]
+    if channel_id.startswith("@"):
+        return ["forHandle"]
+    # handles can be passed without leading @ ; legacy usernames are last resort
+    return ["forHandle", "forUsername"]
+
+
 def get_channel_json(channel_id):
     """fetch or retieve-save and return the Youtube ChannelResult JSON"""
     fname = f"channel_{channel_id}"
     channel_json = load_json(YOUTUBE.cache_dir, fname)
     if channel_json is None:
-        for criteria in ["forHandle", "id", "forUsername"]:
+        for criteria in get_channel_criteria(channel_id):
             logger.debug(f"query youtube-api for {channel_id} by {criteria}")
-            req = requests.get(
+            req_json = api_client.get(
                 CHANNELS_API,
-                params={
+                {
                     criteria: channel_id,
-                    "part": "brandingSettings,snippet,contentDetails",
-                    "key": YOUTUBE.api_key,
+                    "part": CHANNEL_PARTS,
                 },
-                timeout=REQUEST_TIMEOUT,
             )
-            if req.status_code >= HTTPStatus.BAD_REQUEST:
-                logger.error(f"HTTP {req.status_code} Error response: {req.text}")
-            req.raise_for_status()
-            req_json = req.json()
             if "items" not in req_json:
                 logger.warning(f"Failed to find {channel_id} by {criteria}")
                 continue
@@ -128,170 +218,416 @@ def get_channel_json(channel_id):
     return channel_json
 
 
-def get_channel_playlists_json(channel_id):
-    """fetch or retieve-save and return the Youtube Playlists JSON for a channel"""
-    fname = f"channel_{channel_id}_playlists"
-    channel_playlists_json = load_json(YOUTUBE.cache_dir, fname)
+def get_channels_json(channel_ids, concurrency=1):
+    """fetch or retieve-save and return Youtube ChannelResult JSON of channels
+
+    dict of channel_id: ChannelResult JSON (None if not found).
+    Channels not in cache are requested by batches of MAX_CHANNELS_PER_REQUEST
+    when passed as technical IDs, individually otherwise (handles, usernames)"""
+    channels_json = {
+        channel_id: load_json(YOUTUBE.cache_dir, f"channel_{channel_id}")
+        for channel_id in channel_ids
+    }
+    missing_ids = [
+        channel_id
+        for channel_id, channel_json in channels_json.items()
+        if channel_json is None and CHANNEL_ID_PATTERN.match(channel_id)
+    ]
+    if missing_ids:
+        logger.debug(f"query youtube-api for {len(missing_ids)} Channels")
+
+    def retrieve_channels_for(channel_ids):
+        return api_client.get(
+            CHANNELS_API,
+            {
+                "id": ",".join(channel_ids),
+                "part": CHANNEL_PARTS,
+                "maxResults": MAX_CHANNELS_PER_REQUEST,
+            },
+        ).get("items", [])
+
+    for items in map_concurrently(
+        retrieve_channels_for,
+        [
+            missing_ids[interv : interv + MAX_CHANNELS_PER_REQUEST]
+            for interv in range(0, len(missing_ids), MAX_CHANNELS_PER_REQUEST)
+        ],
+        concurrency,
+    ):
+        for item in items:
+            save_json(YOUTUBE.cache_dir, f"channel_{item['id']}", item)
+            channels_json[item["id"]] = item
+
+    # remaining ones are either handles/usernames or IDs not found in batch
+    for channel_id, channel_json in channels_json.items():
+        if channel_json is None and channel_id not in missing_ids:
+            try:
+                channels_json[channel_id] = get_channel_json(channel_id)
+            except ChannelNotFoundError:
+                pass
+        if channels_json[channel_id] is None:
+            logger.error(f"Invalid channel ID `{channel_id}`: Not Found")
+    return channels_json
 
-    items = load_json(YOUTUBE.cache_dir, fname)
-    if items is not None:
-        return items
 
-    logger.debug(f"query youtube-api for Playlists of channel #{channel_id}")
+def get_channel_playlists_json(channel_id):
+    """fetch or retieve-save and return the Youtube Playlists JSON for a channel
+
+    snippets are requested as well so that individual playlists cache is warmed
+    without additional requests. Pages are stored as they arrive (see
+    iter_paged_json) and items are yielded lazily"""
+    fname = f"channel_{channel_id}_playlists"
+    if not is_paged_json_complete(YOUTUBE.cache_dir, fname):
+        logger.debug(f"query youtube-api for Playlists of channel #{channel_id}")
 
-    items = []
-    page_token = None
-    while True:
-        req = requests.get(
+    def fetch_page(page_token):
+        channel_playlists_json = api_client.get(
             PLAYLIST_API,
-            params={
+            {
                 "channelId": channel_id,
-                "part": "id",
-                "key": YOUTUBE.api_key,
+                "part": "snippet",
                 "maxResults": RESULTS_PER_PAGE,
                 "pageToken": page_token,
             },
-            timeout=REQUEST_TIMEOUT,
+            discovery=True,
         )
-        if req.status_code >= HTTPStatus.BAD_REQUEST:
-            logger.error(f"HTTP {req.status_code} Error response: {req.text}")
-        req.raise_for_status()
-        channel_playlists_json = req.json()
-        items += channel_playlists_json["items"]
-        save_json(YOUTUBE.cache_dir, fname, items)
-        page_token = channel_playlists_json.get("nextPageToken")
-        if not page_token:
-            break
-    return items
+        for item in channel_playlists_json["items"]:
+            save_json(YOUTUBE.cache_dir, f"playlist_{item['id']}", item)
+        return (
+            channel_playlists_json["items"],
+            channel_playlists_json.get("nextPageToken"),
+        )
+
+    return iter_paged_json(YOUTUBE.cache_dir, fname, fetch_page)
 
 
 def get_playlist_json(playlist_id):
     """fetch or retieve-save and return the Youtube PlaylistResult JSON"""
-    fname = f"playlist_{playlist_id}"
-    playlist_json = load_json(YOUTUBE.cache_dir, fname)
-    if playlist_json is None:
-        logger.debug(f"query youtube-api for Playlist #{playlist_id}")
-        req = requests.get(
+    return get_playlists_json([playlist_id])[playlist_id]
+
+
+def get_playlists_json(playlist_ids, concurrency=1):
+    """fetch or retieve-save and return Youtube PlaylistResult JSON of playlists
+
+    dict of playlist_id: PlaylistResult JSON (None if not found).
+    Playlists not in cache are requested by batches of MAX_PLAYLISTS_PER_REQUEST"""
+    playlists_json = {
+        playlist_id: load_json(YOUTUBE.cache_dir, f"playlist_{playlist_id}")
+        for playlist_id in playlist_ids
+    }
+    missing_ids = [
+        playlist_id
+        for playlist_id, playlist_json in playlists_json.items()
+        if playlist_json is None
+    ]
+    if not missing_ids:
+        return playlists_json
+
+    logger.debug(f"query youtube-api for {len(missing_ids)} Playlists")
+
+    def retrieve_playlists_for(playlist_ids):
+        return api_client.get(
             PLAYLIST_API,
-            params={"id": playlist_id, "part": "snippet", "key": YOUTUBE.api_key},
-            timeout=REQUEST_TIMEOUT,
-        )
-        if req.status_code >= HTTPStatus.BAD_REQUEST:
-            logger.error(f"HTTP {req.status_code} Error response: {req.text}")
-        req.raise_for_status()
-        try:
-            playlist_json = req.json()["items"][0]
-            total_results = req.json().get("pageInfo", {}).get("totalResults", 0)
-            if total_results == 0:
-                logger.error(f"Playlist `{playlist_id}`: No Item Available")
-                return None
-        except IndexError:
+            {
+                "id": ",".join(playlist_ids),
+                "part": "snippet",
+                "maxResults": MAX_PLAYLISTS_PER_REQUEST,
+            },
+        ).get("items", [])
+
+    for items in map_concurrently(
+        retrieve_playlists_for,
+        [
+            missing_ids[interv : interv + MAX_PLAYLISTS_PER_REQUEST]
+            for interv in range(0, len(missing_ids), MAX_PLAYLISTS_PER_REQUEST)
+        ],
+        concurrency,
+    ):
+        for item in items:
+            save_json(YOUTUBE.cache_dir, f"playlist_{item['id']}", item)
+            playlists_json[item["id"]] = item
+
+    for playlist_id in missing_ids:
+        if playlists_json[playlist_id] is None:
             logger.error(f"Invalid playlistId `{playlist_id}`: Not Found")
-            return None
-        save_json(YOUTUBE.cache_dir, fname, playlist_json)
-    return playlist_json
+    return playlists_json
+
+
+def get_previous_videos_json(playlist_id):
+    """refresh date of a newest-first playlist listed on a previous run, or None
+
+    None as well when previous run is too old and a full refresh is due.
+    Previous PlaylistItems are a paged collection (see iter_paged_json)"""
+    if not YOUTUBE.api_cache_dir or not playlist_id.startswith(
+        NEWEST_FIRST_PLAYLIST_PREFIX
+    ):
+        return None
+    playlists_dir = YOUTUBE.api_cache_dir.joinpath("playlists")
+    previous = load_json(playlists_dir, f"{playlist_id}_refresh")
+    if previous is None or not is_paged_json_complete(playlists_dir, playlist_id):
+        return None
+    refreshed_on = datetime.datetime.fromisoformat(previous["refreshed_on"])
+    if datetime.datetime.now(datetime.UTC) - refreshed_on > datetime.timedelta(
+        days=YOUTUBE.full_refresh_days
+    ):
+        logger.debug(f"Playlist #{playlist_id} is due for a full refresh")
+        return None
+    return refreshed_on
+
+
+def save_previous_videos_json(playlist_id, items, refreshed_on):
+    """persist PlaylistItems of a newest-first playlist for next runs"""
+    if not YOUTUBE.api_cache_dir or not playlist_id.startswith(
+        NEWEST_FIRST_PLAYLIST_PREFIX
+    ):
+        return
+    playlists_dir = YOUTUBE.api_cache_dir.joinpath("playlists")
+    save_paged_json(playlists_dir, playlist_id, items, page_size=RESULTS_PER_PAGE)
+    save_json(
+        playlists_dir,
+        f"{playlist_id}_refresh",
+        {"refreshed_on": refreshed_on.isoformat()},
+    )
 
 
-def get_videos_json(playlist_id):
-    """retrieve a list of youtube PlaylistItem dict
+def merge_previous_videos_json(new_items, previous_items, known_ids):
+    """new PlaylistItems followed by previous ones, renumbered
+
+    new_items may end with already known videos (last fetched page) ;
+    known_ids are the videos IDs of previous_items"""
+    new_ids = set()
+    position = 0
+    for item in new_items:
+        if item["contentDetails"]["videoId"] in known_ids:
+            break
+        new_ids.add(item["contentDetails"]["videoId"])
+        item["snippet"]["position"] = position
+        position += 1
+        yield item
+    for previous_item in previous_items:
+        if previous_item["contentDetails"]["videoId"] in new_ids:
+            continue
+        item = prune_item(previous_item, PLAYLIST_ITEM_PROJECTION)
+        # positions of previous items have shifted
+        item["snippet"]["position"] = position
+        position += 1
+        yield item
+
+
+def get_videos_json(playlist_id, date_range=None, discovered=None):
+    """retrieve youtube PlaylistItem dicts of a playlist (lazily, as an iterator)
 
     same request for both channel and playlist
-    channel mode uses `uploads` playlist from channel"""
+    channel mode uses `uploads` playlist from channel
+
+    items are fetched and stored page by page when not already stored ; an
+    interrupted pagination resumes from its last stored page token.
+    newest-first playlists known from a previous run (see api_cache_dir) are only
+    fetched until a known video, then merged with previous items.
+    newest-first playlists are only fetched until a page entirely published before
+    date_range (items are still to be filtered with skip_outofrange_videos).
+    videos are added to `discovered` (a DiscoveredVideos) as they are listed ; only
+    items fetched so far are returned once quota budget is reached"""
 
     fname = f"playlist_{playlist_id}_videos"
-    items = load_json(YOUTUBE.cache_dir, fname)
-    if items is not None:
-        return items
+    if is_paged_json_complete(YOUTUBE.cache_dir, fname):
+        if discovered is not None:
+            discovered.add(
+                item["contentDetails"]["videoId"]
+                for item in iter_paged_json(YOUTUBE.cache_dir, fname)
+            )
+        return iter_paged_json(YOUTUBE.cache_dir, fname)
 
     logger.debug(f"query youtube-api for PlaylistItems of playlist #{playlist_id}")
 
-    items = []
-    page_token = None
-    while True:
-        req = requests.get(
+    refreshed_on = get_previous_videos_json(playlist_id)
+    # folder of previous run items, only set when there are some to merge with
+    playlists_dir = (
+        YOUTUBE.api_cache_dir.joinpath("playlists")
+        if refreshed_on and YOUTUBE.api_cache_dir
+        else None
+    )
+    known_ids = (
+        {
+            item["contentDetails"]["videoId"]
+            for item in iter_paged_json(playlists_dir, playlist_id)
+        }
+        if playlists_dir
+        else set()
+    )
+    if discovered is not None:
+        discovered.add(known_ids)
+    # date of oldest wanted item, if playlist is newest-first
+    oldest_date = (
+        date_range.start
+        if date_range is not None
+        and date_range.start > datetime.date.min
+        and playlist_id.startswith(NEWEST_FIRST_PLAYLIST_PREFIX)
+        else None
+    )
+    truncated = False
+
+    def fetch_page(page_token):
+        nonlocal truncated
+        videos_json = api_client.get(
             PLAYLIST_ITEMS_API,
-            params={
+            {
                 "playlistId": playlist_id,
                 "part": "snippet,contentDetails,status",
-                "key": YOUTUBE.api_key,
+                "fields": get_fields(PLAYLIST_ITEM_PROJECTION),
                 "maxResults": RESULTS_PER_PAGE,
                 "pageToken": page_token,
             },
-            timeout=REQUEST_TIMEOUT,
+            discovery=True,
         )
-        if req.status_code >= HTTPStatus.BAD_REQUEST:
-            logger.error(f"HTTP {req.status_code} Error response: {req.text}")
-        req.raise_for_status()
-        videos_json = req.json()
-        items += videos_json["items"]
-        page_token = videos_json.get("nextPageToken")
-        if not page_token:
-            break
+        items = [
+            prune_item(item, PLAYLIST_ITEM_PROJECTION) for item in videos_json["items"]
+        ]
+        if any(item["contentDetails"]["videoId"] in known_ids for item in items):
+            # reached videos of previous run
+            return items, None
+        if oldest_date and all(get_published_on(item) < oldest_date for item in items):
+            # all next pages are out of range as well
+            truncated = True
+            return items, None
+        return items, videos_json.get("nextPageToken")
+
+    # when merging with previous run, new pages are stored aside
+    fetched_key = f"{fname}_new" if refreshed_on else fname
+    try:
+        for item in iter_paged_json(YOUTUBE.cache_dir, fetched_key, fetch_page):
+            if discovered is not None:
+                discovered.add([item["contentDetails"]["videoId"]])
+    except QuotaBudgetExceededError as exc:
+        logger.warning(f"PlaylistItems of playlist #{playlist_id} incomplete: {exc}")
+        # stored pages are kept, pagination resumes from there on next run
+        return iter_paged_json(YOUTUBE.cache_dir, fetched_key)
+
+    if truncated:
+        logger.debug(f"PlaylistItems of playlist #{playlist_id} stopped at date range")
+        # older items were not fetched ; nothing to merge with or persist
+        if refreshed_on:
+            save_paged_json(
+                YOUTUBE.cache_dir,
+                fname,
+                iter_paged_json(YOUTUBE.cache_dir, fetched_key),
+                page_size=RESULTS_PER_PAGE,
+            )
+        return iter_paged_json(YOUTUBE.cache_dir, fname)
+
+    if playlists_dir and any(
+        item["contentDetails"]["videoId"] in known_ids
+        for item in iter_paged_json(YOUTUBE.cache_dir, fetched_key)
+    ):
+        save_paged_json(
+            YOUTUBE.cache_dir,
+            fname,
+            merge_previous_videos_json(
+                iter_paged_json(YOUTUBE.cache_dir, fetched_key),
+                iter_paged_json(playlists_dir, playlist_id),
+                known_ids,
+            ),
+            page_size=RESULTS_PER_PAGE,
+        )
+    elif refreshed_on:
+        # no known video anymore, playlist was listed entirely
+        save_paged_json(
+            YOUTUBE.cache_dir,
+            fname,
+            iter_paged_json(YOUTUBE.cache_dir, fetched_key),
+            page_size=RESULTS_PER_PAGE,
+        )
+        refreshed_on = datetime.datetime.now(datetime.UTC)
+    else:
+        refreshed_on = datetime.datetime.now(datetime.UTC)
+
+    save_previous_videos_json(
+        playlist_id, iter_paged_json(YOUTUBE.cache_dir, fname), refreshed_on
+    )
+    return iter_paged_json(YOUTUBE.cache_dir, fname)
 
-    save_json(YOUTUBE.cache_dir, fname, items)
-    return items
 
+def get_videos_authors_info(videos_ids, concurrency=1):
+    """query authors' info for each video from their relative channel
 
-def get_videos_authors_info(videos_ids):
-    """query authors' info for each video from their relative channel"""
+    info is cached per video (in api_cache_dir if set) so that a rerun, or another
+    collection sharing videos, only requests the missing ones. Those are requested
+    by chunks of MAX_VIDEOS_PER_REQUEST, using up to `concurrency` parallel
+    requests. Chunks over quota budget are skipped: their videos have no info"""
 
-    items = load_json(YOUTUBE.cache_dir, "videos_channels")
+    items = load_json(YOUTUBE.cache_dir, "videos_details")
 
     if items is not None:
         return items
 
-    logger.debug(f"query youtube-api for Video details of {len(videos_ids)} videos")
+    details_dir = (YOUTUBE.api_cache_dir or YOUTUBE.cache_dir).joinpath("videos")
+    # persisted details are refreshed as often as uploads playlists
+    details_ttl = YOUTUBE.full_refresh_days * 86400 if YOUTUBE.api_cache_dir else None
 
     items = {}
+    missing_ids = []
+    for video_id in videos_ids:
+        video_item = load_json(details_dir, video_id)
+        if video_item is None:
+            missing_ids.append(video_id)
+        else:
+            items[video_id] = video_item
+
+    if missing_ids:
+        logger.debug(
+            f"query youtube-api for Video details of {len(missing_ids)} videos"
+        )
 
     def retrieve_videos_for(videos_ids):
         """{videoId: {channelId: channelTitle}} for all videos_ids"""
-        req_items = {}
-        page_token = None
-        while True:
-            req = requests.get(
+        # videos requested by ID are never paginated
+        try:
+            videos_json = api_client.get(
                 VIDEOS_API,
-                params={
+                {
                     "id": ",".join(videos_ids),
                     "part": "snippet,contentDetails",
-                    "key": YOUTUBE.api_key,
-                    "maxResults": RESULTS_PER_PAGE,
-                    "pageToken": page_token,
+                    "fields": get_fields(VIDEO_PROJECTION),
+                    "maxResults": MAX_VIDEOS_PER_REQUEST,
                 },
-                timeout=REQUEST_TIMEOUT,
             )
-            if req.status_code >= HTTPStatus.BAD_REQUEST:
-                logger.error(f"HTTP {req.status_code} Error response: {req.text}")
-            req.raise_for_status()
-            videos_json = req.json()
-            for item in videos_json["items"]:
-                duration_iso = item["contentDetails"]["duration"]
-                duration_seconds = int(
-                    isodate.parse_duration(duration_iso).total_seconds()
-                )
-                req_items.update(
-                    {
-                        item["id"]: {
-                            "channelId": item["snippet"]["channelId"],
-                            "channelTitle": item["snippet"]["channelTitle"],
-                            "duration": duration_iso,
-                            "duration_seconds": duration_seconds,
-                        }
-                    }
-                )
-            page_token = videos_json.get("nextPageToken")
-            if not page_token:
-                break
+        except QuotaBudgetExceededError as exc:
+            logger.warning(f"Details of {len(videos_ids)} videos not retrieved: {exc}")
+            return None
+        req_items = {}
+        for item in videos_json["items"]:
+            duration_iso = item["contentDetails"]["duration"]
+            duration_seconds = parse_duration(duration_iso)
+            req_items[item["id"]] = {
+                "channelId": item["snippet"]["channelId"],
+                "channelTitle": item["snippet"]["channelTitle"],
+                "duration": duration_iso,
+                "duration_seconds": duration_seconds,
+            }
+            save_json(details_dir, item["id"], req_items[item["id"]], ttl=details_ttl)
         return req_items
 
     # split it over n requests so that each request includes
     # as most MAX_VIDEOS_PER_REQUEST videoId to avoid too-large URI issue
-    for interv in range(0, len(videos_ids), MAX_VIDEOS_PER_REQUEST):
-        items.update(
-            retrieve_videos_for(videos_ids[interv : interv + MAX_VIDEOS_PER_REQUEST])
-        )
+    is_complete = True
+    for req_items in map_concurrently(
+        retrieve_videos_for,
+        [
+            missing_ids[interv : interv + MAX_VIDEOS_PER_REQUEST]
+            for interv in range(0, len(missing_ids), MAX_VIDEOS_PER_REQUEST)
+        ],
+        concurrency,
+    ):
+        if req_items is None:
+            is_complete = False
+            continue
+        items.update(req_items)
+    # in order of videos_ids
+    items = {video_id: items[video_id] for video_id in videos_ids if video_id in items}
 
-    save_json(YOUTUBE.cache_dir, "videos_channels", items)
+    # a rerun (with more budget) requests the missing videos
+    if is_complete:
+        save_json(YOUTUBE.cache_dir, "videos_details", items)
 
     return items
 
@@ -314,7 +650,7 @@ def save_channel_branding(channels_dir, channel_id, *, save_banner=False):
     if not profile_path.exists():
         if not thumnbail:
             raise Exception("thumnbail not found")
-        stream_file(thumnbail, profile_path)
+        stream_file(thumnbail, profile_path, session=api_client.session)
         # resize profile as we only use up 100px/80 sq
         resize_image(profile_path, width=100, height=100)
 
@@ -325,7 +661,7 @@ def save_channel_branding(channels_dir, channel_id, *, save_banner=False):
         banner = channel_json["brandingSettings"]["image"]["bannerImageUrl"]
         banner_path = channel_dir.joinpath("banner.jpg")
         if not banner_path.exists():
-            stream_file(banner, banner_path)
+            stream_file(banner, banner_path, session=api_client.session)
 
 
 def skip_deleted_videos(item):
@@ -341,13 +677,29 @@ def skip_non_public_videos(item):
     return item["status"]["privacyStatus"] in ("public", "unlisted")
 
 
+def get_published_on(item):
+    """publication date of a PlaylistItem"""
+    return parse_datetime(item["snippet"]["publishedAt"]).date()
+
+
 def skip_outofrange_videos(date_range, item):
     """filter func to filter-out videos that are not within specified date range"""
-    return dt_parser.parse(item["snippet"]["publishedAt"]).date() in date_range
+    return get_published_on(item) in date_range
+
 
+def get_collection_type(youtube_id: str):
+    """type of collection requested with youtube_id, as per its shape
 
-def extract_playlists_details_from(youtube_id: str):
-    """prepare a list of Playlist from user request"""
+    several IDs are playlists ; a single one is first looked-up as a channel"""
+    return "playlists" if "," in youtube_id else "channel"
+
+
+def extract_playlists_details_from(
+    youtube_id: str, concurrency: int = DEFAULT_METADATA_CONCURRENCY
+):
+    """prepare a list of Playlist from user request
+
+    playlists are looked-up by batches, using up to `concurrency` parallel requests"""
 
     main_channel_id = user_long_uploads_playlist_id = user_short_uploads_playlist_id = (
         user_lives_playlist_id
@@ -358,14 +710,25 @@ def extract_playlists_details_from(youtube_id: str):
             channel_json = get_channel_json(youtube_id)
             main_channel_id = channel_json["id"]
             # retrieve list of playlists for that channel
-            playlist_ids = [
-                p["id"] for p in get_channel_playlists_json(main_channel_id)
-            ]
+            playlist_ids = []
+            try:
+                for playlist_json in get_channel_playlists_json(main_channel_id):
+                    playlist_ids.append(playlist_json["id"])
+            except QuotaBudgetExceededError as exc:
+                logger.warning(
+                    f"Only {len(playlist_ids)} playlists of channel "
+                    f"#{main_channel_id} retrieved: {exc}"
+                )
 
-            # Get special playlists JSON objects
-            user_long_uploads_json = get_playlist_json("UULF" + main_channel_id[2:])
-            user_short_uploads_json = get_playlist_json("UUSH" + main_channel_id[2:])
-            user_lives_json = get_playlist_json("UULV" + main_channel_id[2:])
+            # Get special playlists JSON objects (in a single request)
+            user_long_uploads_json, user_short_uploads_json, user_lives_json = (
+                get_playlists_json(
+                    [
+                        f"{prefix}{main_channel_id[2:]}"
+                        for prefix in ("UULF", "UUSH", "UULV")
+                    ]
+                ).values()
+            )
 
             # Extract special playlists IDs if the JSON objects are not None
             user_long_uploads_playlist_id = (
@@ -407,7 +770,7 @@ def extract_playlists_details_from(youtube_id: str):
 
     return (
         # dict.fromkeys maintains the order of playlist_ids while removing duplicates
-        [Playlist.from_id(playlist_id) for playlist_id in dict.fromkeys(playlist_ids)],
+        Playlist.from_ids(list(dict.fromkeys(playlist_ids)), concurrency=concurrency),
         main_channel_id,
         user_long_uploads_playlist_id,
         user_short_uploads_playlist_id,
@@ -0,0 +1,74 @@
+import shutil
+from collections.abc import Callable, Iterator
+
+import pytest
+
+from youtube2zim.scraper import Youtube2Zim
+from youtube2zim.utils import close_stores
+
+# scraper arguments, as defaults of the command line would set them
+SCRAPER_ARGS = {
+    "youtube_id": "UCfakeChannel0000000000a",
+    "api_key": "fake",
+    "video_format": "webm",
+    "low_quality": False,
+    "nb_videos_per_page": 40,
+    "all_subtitles": False,
+    "zimui_dist": "../zimui/dist",
+    "fname": None,
+    "debug": False,
+    "work_dir": None,
+    "max_concurrency": 1,
+    "language": "eng",
+    "tags": "",
+    "dateafter": None,
+    "use_any_optimized_version": False,
+    "s3_url_with_credentials": None,
+    "local_cache_dir": None,
+    "local_cache_size": 0,
+    "upload_concurrency": 1,
+    "s3_chunk_size": 8 * 2**20,
+    "s3_transfer_concurrency": 1,
+    "s3_pool_size": None,
+    "publisher": "openZIM",
+    "disable_metadata_checks": True,
+    "stats_filename": None,
+    "skip_reencoding": False,
+    "subtitles_chapters_cache_expiry_days": 1,
+    "api_pool_size": 1,
+    "metadata_concurrency": 1,
+    "api_quota_budget": None,
+    "api_cache_dir": None,
+    "full_refresh_days": 30,
+    "rate_limits": None,
+    "encode_concurrency": None,
+    "postprocess_concurrency": None,
+    "encode_threads": None,
+    "encode_nice": 0,
+    "encode_ionice": None,
+}
+
+
+@pytest.fixture
+def make_scraper(tmp_path) -> Iterator[Callable[..., Youtube2Zim]]:
+    """factory of Youtube2Zim building in tmp_path, overriding some arguments"""
+    scrapers = []
+
+    def make(**kwargs) -> Youtube2Zim:
+        scraper = Youtube2Zim(
+            **{
+                **SCRAPER_ARGS,
+                "output_dir": tmp_path / "output",
+                "tmp_dir": tmp_path / "tmp",
+                **kwargs,
+            }
+        )
+        scrapers.append(scraper)
+        return scraper
+
+    yield make
+    close_stores()
+    for scraper in scrapers:
+        if scraper.local_cache:
+            scraper.local_cache.close()
+        shutil.rmtree(scraper.build_dir, ignore_errors=True)
@@ -0,0 +1,120 @@
+import json
+from typing import cast
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from youtube2zim.api import (
+    RETRY_STATUSES,
+    SEARCH_API,
+    VIDEOS_API,
+    QuotaBudgetExceededError,
+    YoutubeApiClient,
+)
+from youtube2zim.constants import YOUTUBE
+from youtube2zim.utils import close_stores, open_store
+
+
+def test_session_is_shared_and_pooled():
+    client = YoutubeApiClient(pool_size=4)
+    session = client.session
+    assert client.session is session
+    adapter = cast(
+        HTTPAdapter,
+        session.get_adapter("https://www.googleapis.com/youtube/v3/videos"),
+    )
+    assert adapter._pool_maxsize == 4  # pyright: ignore[reportAttributeAccessIssue]
+    assert adapter.max_retries.respect_retry_after_header
+    assert set(adapter.max_retries.status_forcelist) == set(RETRY_STATUSES)
+
+
+def test_configure_recreates_session():
+    client = YoutubeApiClient()
+    session = client.session
+    client.configure(pool_size=2)
+    assert client.session is not session
+    assert client.pool_size == 2
+
+
+def test_quota_accounting():
+    client = YoutubeApiClient()
+    client.consume_quota(SEARCH_API)
+    client.consume_quota(VIDEOS_API)
+    client.consume_quota(VIDEOS_API)
+    assert client.quota_report() == {
+        "used": 102,
+        "budget": None,
+        "endpoints": {"search": 100, "videos": 2},
+        "not_modified": 0,
+    }
+
+
+def test_quota_budget():
+    client = YoutubeApiClient(quota_budget=10)
+    client.reserve_quota(1)
+    for _ in range(9):
+        client.consume_quota(VIDEOS_API, discovery=True)
+    # reserved units are kept for non-discovery requests
+    with pytest.raises(QuotaBudgetExceededError):
+        client.consume_quota(VIDEOS_API, discovery=True)
+    client.consume_quota(VIDEOS_API)
+    with pytest.raises(QuotaBudgetExceededError):
+        client.consume_quota(VIDEOS_API)
+    assert client.quota_units_used == 10
+
+
+def make_response(status_code, payload=None, etag=None):
+    resp = requests.Response()
+    resp.status_code = status_code
+    if payload is not None:
+        resp._content = json.dumps(payload).encode("utf-8")
+    if etag:
+        resp.headers["ETag"] = etag
+    return resp
+
+
+@pytest.fixture
+def etag_cache_dir(tmp_path):
+    open_store(tmp_path)
+    yield tmp_path
+    close_stores()
+
+
+def test_etag_revalidation(etag_cache_dir, monkeypatch):
+    monkeypatch.setattr(YOUTUBE, "api_key", "xxx", raising=False)
+    client = YoutubeApiClient(etag_cache_dir=etag_cache_dir)
+    sent_headers = []
+    responses = [
+        make_response(200, {"etag": "abc", "items": [1]}, etag="abc"),
+        make_response(304),
+    ]
+
+    def fake_get(url, params, headers, timeout):  # noqa: ARG001
+        sent_headers.append(headers)
+        return responses.pop(0)
+
+    monkeypatch.setattr(client.session, "get", fake_get)
+    params = {"id": "xxx", "pageToken": None}
+    assert client.get(VIDEOS_API, params) == {"etag": "abc", "items": [1]}
+    assert client.get(VIDEOS_API, params) == {"etag": "abc", "items": [1]}
+    assert sent_headers == [None, {"If-None-Match": "abc"}]
+    assert client.quota_report()["not_modified"] == 1
+
+
+def test_etag_without_stored_response(etag_cache_dir, monkeypatch):
+    monkeypatch.setattr(YOUTUBE, "api_key", "xxx", raising=False)
+    client = YoutubeApiClient(etag_cache_dir=etag_cache_dir)
+    assert client.etag_cache
+    params = {"id": "xxx"}
+    client.etag_cache.save(VIDEOS_API, params, "abc", None)
+    sent_headers = []
+
+    def fake_get(url, params, headers, timeout):  # noqa: ARG001
+        sent_headers.append(headers)
+        return make_response(200, {"etag": "def", "items": [2]}, etag="def")
+
+    monkeypatch.setattr(client.session, "get", fake_get)
+    # a 304 could not be answered: response is requested again
+    assert client.get(VIDEOS_API, params) == {"etag": "def", "items": [2]}
+    assert sent_headers == [None]
@@ -0,0 +1,76 @@
+import os
+import time
+
+import pytest
+
+from youtube2zim.artifacts import ArtifactCache, parse_size
+
+
+@pytest.mark.parametrize(
+    "value, size",
+    [("512", 512), ("500M", 500 * 2**20), ("20GiB", 20 * 2**30), ("1.5t", 3 * 2**39)],
+)
+def test_parse_size(value, size):
+    assert parse_size(value) == size
+
+
+def test_parse_size_invalid():
+    with pytest.raises(ValueError):
+        parse_size("lots")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ArtifactCache(tmp_path / "cache", max_size=250)
+    yield cache
+    cache.close()
+
+
+def make_file(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def test_artifact_cache_put_get(tmp_path, cache):
+    src = make_file(tmp_path / "build" / "video.webm", 100)
+    cache.put("webm/high/vid", src, "v1")
+    dest = tmp_path / "other" / "video.webm"
+    assert cache.get("webm/high/vid", dest, "v1")
+    assert dest.read_bytes() == src.read_bytes()
+    # materialized with hardlinks rather than copies
+    assert os.path.samefile(dest, cache.get_path("webm/high/vid"))
+    assert not cache.get("webm/high/vid", dest, "v2")
+    assert cache.get("webm/high/vid", dest)
+    assert not cache.get("webm/high/other", dest)
+    assert not cache.get("webm/high/vid", dest, max_age_seconds=-1)
+
+
+def test_artifact_cache_survives_reopening(tmp_path, cache):
+    cache.put("thumbnails/high/vid", make_file(tmp_path / "video.webp", 10), "v1")
+    cache.close()
+    reopened = ArtifactCache(tmp_path / "cache")
+    assert reopened.get("thumbnails/high/vid", tmp_path / "copy.webp", "v1")
+    assert reopened.get_size() == 10
+    reopened.close()
+
+
+def test_artifact_cache_evicts_least_recently_used(tmp_path, cache):
+    for key in ("a", "b"):
+        cache.put(key, make_file(tmp_path / key, 100))
+        time.sleep(0.01)
+    assert cache.get("a", tmp_path / "a.copy")  # a is now more recent than b
+    time.sleep(0.01)
+    cache.put("c", make_file(tmp_path / "c", 100))
+    assert cache.get_size() == 200
+    assert not cache.get_path("b").exists()
+    assert not cache.get("b", tmp_path / "b.copy")
+    assert cache.get("a", tmp_path / "a.copy")
+    assert cache.get("c", tmp_path / "c.copy")
+
+
+def test_artifact_cache_missing_file(tmp_path, cache):
+    cache.put("a", make_file(tmp_path / "a", 10))
+    cache.get_path("a").unlink()
+    assert not cache.get("a", tmp_path / "a.copy")
+    assert cache.get_size() == 0
@@ -0,0 +1,110 @@
+import threading
+from http import HTTPStatus
+from typing import ClassVar
+
+import pytest
+from yt_dlp.utils import DownloadError
+
+from youtube2zim import extraction
+from youtube2zim.extraction import VideoInfoExtractor
+
+
+class ForbiddenError(Exception):
+    status = HTTPStatus.FORBIDDEN
+
+
+class FakeYoutubeDL:
+    """records extractions and processings instead of reaching Youtube"""
+
+    instances: ClassVar[list] = []
+    # number of processings refused with an HTTP 403 (expired format URLs)
+    nb_forbidden = 0
+
+    def __init__(self, params):
+        self.params = params
+        self.extracted = []
+        self.processed = []
+        self.closed = False
+        FakeYoutubeDL.instances.append(self)
+
+    def extract_info(self, video_id, download):
+        assert not download
+        self.extracted.append(video_id)
+        return {"id": video_id, "chapters": [{"title": "intro"}], "__private": 1}
+
+    @staticmethod
+    def sanitize_info(info, remove_private_keys):
+        assert remove_private_keys
+        return {key: value for key, value in info.items() if key[:2] != "__"}
+
+    def process_ie_result(self, info, download):
+        assert download
+        if FakeYoutubeDL.nb_forbidden:
+            FakeYoutubeDL.nb_forbidden -= 1
+            try:
+                raise ForbiddenError
+            except ForbiddenError as exc:
+                assert exc.__traceback__
+                raise DownloadError(
+                    "HTTP Error 403", (ForbiddenError, exc, exc.__traceback__)
+                ) from exc
+        info["filepath"] = "video.webm"
+        self.processed.append((info["id"], dict(self.params)))
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    FakeYoutubeDL.instances.clear()
+    FakeYoutubeDL.nb_forbidden = 0
+    monkeypatch.setattr(extraction, "RateLimitedYoutubeDL", FakeYoutubeDL)
+    return VideoInfoExtractor({"writethumbnail": True, "writesubtitles": True})
+
+
+def test_single_extraction_per_video(extractor):
+    extractor.process("vid", writethumbnail=False)
+    extractor.process("vid", skip_download=True, writesubtitles=False)
+    assert extractor.get_info("vid")["chapters"] == [{"title": "intro"}]
+    (ydl,) = FakeYoutubeDL.instances
+    assert ydl.extracted == ["vid"]
+    # each step processes its own copy of info with its own options
+    assert "filepath" not in extractor.get_info("vid")
+    assert "__private" not in extractor.get_info("vid")
+    assert ydl.processed == [
+        ("vid", {"writethumbnail": False, "writesubtitles": True}),
+        (
+            "vid",
+            {"writethumbnail": True, "writesubtitles": False, "skip_download": True},
+        ),
+    ]
+    assert ydl.params == {"writethumbnail": True, "writesubtitles": True}
+    extractor.forget("vid")
+    extractor.get_info("vid")
+    assert ydl.extracted == ["vid", "vid"]
+
+
+def test_youtubedl_per_thread(extractor):
+    extractor.get_info("main")
+    thread = threading.Thread(target=extractor.get_info, args=("other",))
+    thread.start()
+    thread.join()
+    extractor.get_info("main")
+    assert [ydl.extracted for ydl in FakeYoutubeDL.instances] == [["main"], ["other"]]
+    extractor.close()
+    assert all(ydl.closed for ydl in FakeYoutubeDL.instances)
+
+
+def test_extracts_again_when_forbidden(extractor):
+    extractor.get_info("vid")
+    FakeYoutubeDL.nb_forbidden = 1
+    extractor.process("vid")
+    (ydl,) = FakeYoutubeDL.instances
+    assert ydl.extracted == ["vid", "vid"]
+    assert [video_id for video_id, _ in ydl.processed] == ["vid"]
+
+    # only retried once
+    FakeYoutubeDL.nb_forbidden = 2
+    with pytest.raises(DownloadError):
+        extractor.process("vid")
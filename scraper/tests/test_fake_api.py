@@ -0,0 +1,111 @@
+import collections
+from http import HTTPStatus
+
+import pytest
+from contrib.fake_youtube_api import (
+    CHANNEL_ID,
+    FakeChannel,
+    FakeYoutubeApi,
+    FakeYoutubeApiServer,
+)
+from yt_dlp.utils import DateRange
+
+from youtube2zim.api import api_client
+from youtube2zim.constants import YOUTUBE
+from youtube2zim.utils import close_stores, open_store
+from youtube2zim.youtube import (
+    DiscoveredVideos,
+    extract_playlists_details_from,
+    get_videos_authors_info,
+    get_videos_json,
+)
+
+# yt-dlp parses date strings although its stubs only accept dates
+DATEAFTER = DateRange("20241215")  # pyright: ignore[reportArgumentType]
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(YOUTUBE, "cache_dir", tmp_path, raising=False)
+    open_store(tmp_path)
+    yield tmp_path
+    close_stores()
+
+
+@pytest.fixture
+def fake_api(cache_dir, monkeypatch):  # noqa: ARG001
+    api = FakeYoutubeApi(FakeChannel(nb_videos=120, nb_playlists=3))
+    with FakeYoutubeApiServer(api) as server:
+        monkeypatch.setattr(api_client, "api_url", server.url)
+        monkeypatch.setattr(YOUTUBE, "api_key", "fake", raising=False)
+        yield api
+
+
+def test_metadata_phase_on_fake_api(fake_api):
+    playlists, main_channel_id, long_uploads_id, short_uploads_id, lives_id, _ = (
+        extract_playlists_details_from(CHANNEL_ID)
+    )
+    assert main_channel_id == CHANNEL_ID
+    assert long_uploads_id == f"UULF{CHANNEL_ID[2:]}"
+    assert short_uploads_id == f"UUSH{CHANNEL_ID[2:]}"
+    assert lives_id is None
+    assert len(playlists) == 5
+
+    items = list(get_videos_json(long_uploads_id))
+    assert len(items) == 96
+    assert [item["snippet"]["position"] for item in items] == list(range(96))
+
+    videos_ids = [item["contentDetails"]["videoId"] for item in items]
+    authors = get_videos_authors_info(videos_ids)
+    assert authors[videos_ids[0]]["channelId"] == CHANNEL_ID
+
+    stats = fake_api.stats()
+    assert stats["endpoints"] == {
+        "channels": 1,
+        "playlists": 2,
+        "playlistItems": 2,
+        "videos": 2,
+    }
+    assert stats["quota"] == 7
+
+
+def test_fake_api_error_injection():
+    api = FakeYoutubeApi(FakeChannel(nb_videos=1), error_rate=1)
+    status, _, _ = api.handle("videos", {"key": "fake", "id": "v0000000000"})
+    assert status == HTTPStatus.SERVICE_UNAVAILABLE
+    assert api.stats()["errors"] == 1
+
+
+def test_get_videos_json_stops_at_date_range(fake_api):
+    # one video a day, newest first from 2025-01-01 ; 50 items per page
+    items = list(get_videos_json(f"UU{CHANNEL_ID[2:]}", DATEAFTER))
+    assert len(items) == 100
+    assert fake_api.stats()["endpoints"] == {"playlistItems": 2}
+
+    # user playlists are not ordered by date: all items are fetched
+    playlist_id = FakeChannel.get_playlist_id(0)
+    assert len(list(get_videos_json(playlist_id, DATEAFTER))) == 40
+
+
+def test_discovery_keeps_quota_for_details(cache_dir, monkeypatch):  # noqa: ARG001
+    api = FakeYoutubeApi(FakeChannel(nb_videos=2000, nb_playlists=3))
+    with FakeYoutubeApiServer(api) as server:
+        monkeypatch.setattr(api_client, "api_url", server.url)
+        monkeypatch.setattr(api_client, "quota_budget", 60)
+        monkeypatch.setattr(api_client, "quota_used", collections.Counter())
+        monkeypatch.setattr(api_client, "quota_reserved", 0)
+        monkeypatch.setattr(YOUTUBE, "api_key", "fake", raising=False)
+
+        playlists = extract_playlists_details_from(CHANNEL_ID)[0]
+        discovered = DiscoveredVideos()
+        videos_ids = set()
+        for playlist in playlists:
+            for item in get_videos_json(playlist.playlist_id, discovered=discovered):
+                videos_ids.add(item["contentDetails"]["videoId"])
+        discovered.release()
+        assert 0 < len(videos_ids) < 2000
+
+        # details of all videos found are within budget
+        authors = get_videos_authors_info(sorted(videos_ids))
+        assert set(authors) == videos_ids
+        assert api_client.quota_units_used <= 60
@@ -0,0 +1,49 @@
+import pytest
+
+from youtube2zim.journal import Journal
+from youtube2zim.utils import close_stores, open_store
+
+OPTIONS = {"video_format": "webm", "video_quality": "high"}
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    open_store(tmp_path)
+    yield tmp_path
+    close_stores()
+
+
+def test_journal_survives_reopening(cache_dir):
+    journal = Journal(cache_dir, OPTIONS)
+    journal.mark("vid", "downloaded")
+    journal.mark("vid", "encoded", value="videos/vid/video.webm")
+    close_stores()
+
+    open_store(cache_dir)
+    journal = Journal(cache_dir, OPTIONS)
+    assert not journal.options_changed
+    assert journal.get("vid", "downloaded") is True
+    assert journal.get("vid", "encoded") == "videos/vid/video.webm"
+    assert journal.get("vid", "thumbnail") is None
+    assert journal.get("other", "downloaded") is None
+
+
+def test_journal_forget(cache_dir):
+    journal = Journal(cache_dir, OPTIONS)
+    journal.mark("vid", "downloaded")
+    journal.mark("vid", "thumbnail")
+    journal.forget("vid")
+    assert journal.get("vid", "downloaded") is None
+    assert journal.get("vid", "thumbnail") is None
+
+
+def test_journal_reset_on_options_change(cache_dir):
+    Journal(cache_dir, OPTIONS).mark("vid", "encoded", value="videos/vid/video.webm")
+    journal = Journal(cache_dir, {**OPTIONS, "video_quality": "low"})
+    assert journal.options_changed
+    assert journal.get("vid", "encoded") is None
+
+
+def test_journal_unknown_stage(cache_dir):
+    with pytest.raises(ValueError):
+        Journal(cache_dir, OPTIONS).mark("vid", "uploaded")
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from youtube2zim.pipeline import Pipeline, Stage
+
+
+def test_pipeline_runs_all_stages():
+    done = []
+    pipeline = Pipeline(
+        [
+            Stage("double", lambda value: value * 2, workers=3),
+            Stage("skip-odd-tens", lambda value: None if value % 20 else value),
+            Stage("negate", lambda value: -value, workers=2, queue_size=1),
+        ],
+        on_item_done=lambda item, success: done.append((item, success)),
+    )
+    assert sorted(pipeline.run(range(50))) == [-80, -60, -40, -20, 0]
+    assert sorted(done) == [(item, not item % 10) for item in range(50)]
+    assert pipeline.run_sequentially(range(50)) == [0, -20, -40, -60, -80]
+
+
+def test_pipeline_stages_run_concurrently():
+    threads = {}
+
+    def record(stage):
+        def func(value):
+            threads.setdefault(stage, set()).add(threading.current_thread().name)
+            time.sleep(0.01)
+            return value
+
+        return func
+
+    Pipeline(
+        [Stage("first", record("first"), workers=2), Stage("second", record("second"))]
+    ).run(range(10))
+    assert threads["first"] == {"first-0", "first-1"}
+    assert threads["second"] == {"second-0"}
+
+
+def test_pipeline_aborts_on_error():
+    def fail(value):
+        if value == 3:
+            raise RuntimeError("boom")
+        return value
+
+    pipeline = Pipeline([Stage("one", lambda value: value), Stage("fail", fail)])
+    with pytest.raises(RuntimeError, match="boom"):
+        pipeline.run(range(1000))
+
+
+def test_invalid_stage_workers():
+    with pytest.raises(ValueError):
+        Stage("none", lambda value: value, workers=0)
+
+
+def test_pipeline_stage_initializer_per_worker():
+    initialized = []
+    Pipeline(
+        [
+            Stage(
+                "init",
+                lambda value: value,
+                workers=3,
+                initializer=lambda: initialized.append(threading.current_thread().name),
+            )
+        ]
+    ).run(range(10))
+    assert sorted(initialized) == ["init-0", "init-1", "init-2"]
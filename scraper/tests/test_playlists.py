@@ -0,0 +1,42 @@
+from contrib.fake_youtube_api import (
+    CHANNEL_ID,
+    FakeChannel,
+    FakeYoutubeApi,
+    FakeYoutubeApiServer,
+)
+
+from youtube2zim.api import api_client
+from youtube2zim.constants import YOUTUBE
+from youtube2zim.playlists.scraper import YoutubeHandler
+
+
+def test_playlists_mode_runs_each_playlist(monkeypatch):
+    api = FakeYoutubeApi(FakeChannel(nb_videos=20, nb_playlists=2))
+    for name in ("build_dir", "api_key", "cache_dir"):
+        monkeypatch.setattr(YOUTUBE, name, None, raising=False)
+    with FakeYoutubeApiServer(api) as server:
+        monkeypatch.setattr(api_client, "api_url", server.url)
+        handler = YoutubeHandler(
+            {
+                "api_key": "fake",
+                "debug": False,
+                "disable_metadata_checks": True,
+                "playlists_mode": True,
+                "youtube_id": CHANNEL_ID,
+            },
+            [],
+        )
+        ran = []
+        monkeypatch.setattr(
+            handler,
+            "run_playlist_zim",
+            lambda playlist: ran.append(playlist.playlist_id) or (True, None),
+        )
+        handler.run()
+    assert ran == [
+        f"UULF{CHANNEL_ID[2:]}",
+        f"UUSH{CHANNEL_ID[2:]}",
+        FakeChannel.get_playlist_id(0),
+        FakeChannel.get_playlist_id(1),
+    ]
+    assert not handler.build_dir.exists()
@@ -0,0 +1,31 @@
+import os
+import threading
+
+import pytest
+
+from youtube2zim.processing import compute_encode_threads, lower_thread_priority
+
+
+@pytest.mark.parametrize(
+    "encode_concurrency, cpu_count, threads",
+    [(1, 8, 8), (2, 8, 4), (3, 8, 2), (4, 2, 1)],
+)
+def test_compute_encode_threads(encode_concurrency, cpu_count, threads):
+    assert compute_encode_threads(encode_concurrency, cpu_count) == threads
+
+
+def test_lower_thread_priority_only_affects_current_thread():
+    priorities = {}
+
+    def encode():
+        lower_thread_priority(niceness=5)
+        priorities["encode"] = os.getpriority(
+            os.PRIO_PROCESS, threading.get_native_id()
+        )
+
+    main_priority = os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+    thread = threading.Thread(target=encode)
+    thread.start()
+    thread.join()
+    assert priorities["encode"] == min(main_priority + 5, 19)
+    assert os.getpriority(os.PRIO_PROCESS, threading.get_native_id()) == (main_priority)
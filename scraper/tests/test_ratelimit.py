@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from youtube2zim.ratelimit import (
+    HostRateLimiter,
+    TokenBucket,
+    get_host_category,
+    parse_rate_limits,
+)
+
+
+@pytest.mark.parametrize(
+    "url, category",
+    [
+        ("https://www.googleapis.com/youtube/v3/videos", "api"),
+        ("https://rr3---sn-4g5e6nze.googlevideo.com/videoplayback?x=1", "googlevideo"),
+        ("https://www.youtube.com/api/timedtext?v=xxx&lang=en", "timedtext"),
+        ("https://i.ytimg.com/vi/xxx/maxresdefault.webp", "images"),
+        ("https://yt3.ggpht.com/xxx", "images"),
+        ("https://www.youtube.com/watch?v=xxx", "web"),
+        ("https://example.com/banner.jpg", None),
+    ],
+)
+def test_get_host_category(url, category):
+    assert get_host_category(url) == category
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("api=2.5,googlevideo=0") == {
+        "api": 2.5,
+        "googlevideo": None,
+    }
+    with pytest.raises(ValueError):
+        parse_rate_limits("unknown=1")
+    with pytest.raises(ValueError):
+        parse_rate_limits("api=-1")
+
+
+def test_token_bucket_paces_after_burst():
+    bucket = TokenBucket(rate=100, burst=5)
+    start = time.monotonic()
+    for _ in range(15):
+        bucket.acquire()
+    # 5 immediate, then 10 at 100/s
+    assert time.monotonic() - start >= 0.09
+
+
+def test_host_rate_limiter_unlimited_categories():
+    limiter = HostRateLimiter({"images": None})
+    assert "images" not in limiter.buckets
+    assert "api" in limiter.buckets
+    start = time.monotonic()
+    for _ in range(100):
+        limiter.acquire("https://i.ytimg.com/vi/xxx/hq.jpg")
+        limiter.acquire("https://example.com/")
+    assert time.monotonic() - start < 0.5
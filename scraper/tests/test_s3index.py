@@ -0,0 +1,135 @@
+import datetime
+import types
+from typing import cast
+
+from youtube2zim.s3index import (
+    KEYS_PER_LOOKUP,
+    LIST_PAGE_SIZE,
+    S3CacheIndex,
+    get_max_keys,
+)
+from youtube2zim.scraper import Youtube2Zim
+from youtube2zim.transfers import TunedStorage
+
+NOW = datetime.datetime.now(datetime.UTC)
+OLD = NOW - datetime.timedelta(days=30)
+
+
+class FakeStorage:
+    """KiwixStorage stand-in listing a few objects and counting HEAD requests"""
+
+    bucket_name = "bucket"
+
+    def __init__(self, objects, page_size=2):
+        self.objects = objects
+        self.page_size = page_size
+        self.heads = []
+        self.downloads = []
+        self.pages = 0
+        self.client = types.SimpleNamespace(
+            get_paginator=lambda _: types.SimpleNamespace(paginate=self.paginate),
+            head_object=self.head_object,
+        )
+
+    def paginate(self, Bucket, Prefix):  # noqa: N803
+        assert Bucket == self.bucket_name
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        for start in range(0, len(keys), self.page_size):
+            self.pages += 1
+            yield {
+                "Contents": [
+                    {"Key": key, "Size": 1, "LastModified": self.objects[key][0]}
+                    for key in keys[start : start + self.page_size]
+                ]
+            }
+
+    def head_object(self, Bucket, Key):  # noqa: N803, ARG002
+        self.heads.append(Key)
+        return {"LastModified": self.objects[Key][0]}
+
+    def has_object(self, key, bucket_name):  # noqa: ARG002
+        self.heads.append(key)
+        return key in self.objects
+
+    def has_object_matching_meta(self, key, tag, value):  # noqa: ARG002
+        self.heads.append(key)
+        return key in self.objects and self.objects[key][1] == value
+
+    def download_file(self, key, fpath):
+        self.downloads.append(key)
+        fpath.write_text(key)
+
+
+def make_storage():
+    return FakeStorage(
+        {
+            "webm/high/a": (NOW, "v3"),
+            "webm/high/b": (NOW, "v2"),
+            "webm/high/c": (NOW, "v3"),
+            "mp4/high/a": (NOW, "v3"),
+            "subtitles/a.json": (NOW, None),
+            "subtitles/b.json": (OLD, None),
+        }
+    )
+
+
+def test_s3_cache_index_build():
+    index = S3CacheIndex(make_storage(), ["webm/high/", "subtitles/", "chapters/"])
+    assert index.build() == 5
+    assert index.is_indexed("webm/high/z")
+    assert not index.is_indexed("mp4/high/a")
+    info = index.get("webm/high/c")
+    assert info is not None
+    assert info.size == 1
+    assert index.get("chapters/a.json") is None
+
+
+def test_s3_cache_index_skips_large_prefixes():
+    storage = make_storage()
+    storage.objects.update({f"webm/high/v{index}": (NOW, "v3") for index in range(9)})
+    index = S3CacheIndex(storage, ["webm/high/", "subtitles/"], max_keys=2)
+    assert index.build() == 2
+    assert index.indexed_prefixes == ["subtitles/"]
+    assert not index.is_indexed("webm/high/a")
+    # listing of large prefix stopped once over max_keys
+    assert storage.pages == 3
+
+
+def test_s3_cache_index_max_keys():
+    assert get_max_keys(20) == LIST_PAGE_SIZE
+    assert get_max_keys(2000) == 2000 * KEYS_PER_LOOKUP
+
+
+def test_download_from_cache_uses_index(make_scraper, tmp_path):
+    storage = make_storage()
+    scraper: Youtube2Zim = make_scraper()
+    scraper.s3_storage = cast(TunedStorage, storage)
+    scraper.s3_index = S3CacheIndex(storage, ["webm/high/", "subtitles/"])
+    scraper.s3_index.build()
+    download = scraper.download_from_cache
+
+    # missing objects and expiry are answered without any HEAD
+    assert not download("webm/high/missing", tmp_path / "missing", 3)
+    assert not download("subtitles/missing.json", tmp_path / "missing.json")
+    assert not download("subtitles/b.json", tmp_path / "b.json", max_age_seconds=60)
+    assert download("subtitles/a.json", tmp_path / "a.json", max_age_seconds=60)
+    assert storage.heads == []
+    # encoder version of existing objects still needs a HEAD
+    assert download("webm/high/a", tmp_path / "a", 3)
+    assert not download("webm/high/b", tmp_path / "b", 3)
+    assert storage.heads == ["webm/high/a", "webm/high/b"]
+    assert storage.downloads == ["subtitles/a.json", "webm/high/a"]
+
+
+def test_any_version_from_s3_not_stored_as_current(make_scraper, tmp_path):
+    storage = make_storage()
+    scraper: Youtube2Zim = make_scraper(
+        local_cache_dir=tmp_path / "cache", use_any_optimized_version=True
+    )
+    scraper.s3_storage = cast(TunedStorage, storage)
+    assert scraper.download_from_cache("webm/high/b", tmp_path / "b", 3)
+    local_cache = scraper.local_cache
+    assert local_cache is not None
+    # encoded with an older preset: not to be served as v3 by later runs
+    assert not local_cache.get("webm/high/b", tmp_path / "b3", version="v3")
+    assert local_cache.get("webm/high/b", tmp_path / "b3")
@@ -0,0 +1,207 @@
+import threading
+import time
+
+import pytest
+
+from youtube2zim.extraction import VideoInfoExtractor
+from youtube2zim.schemas import Subtitle, Subtitles
+from youtube2zim.scraper import Youtube2Zim
+from youtube2zim.uploads import UploadQueue
+from youtube2zim.utils import close_stores, load_json, save_json
+
+
+@pytest.fixture
+def pipeline_scraper(make_scraper, monkeypatch):
+    """factory of scrapers whose stages only record which worker ran them"""
+
+    def make(videos_ids, durations, concurrency=1):
+        scraper: Youtube2Zim = make_scraper(
+            encode_concurrency=concurrency, postprocess_concurrency=concurrency
+        )
+        scraper.prepare_build_folder()
+        scraper.videos_ids = videos_ids
+        scraper.video_ids_count = len(videos_ids)
+        scraper.videos_costs = durations
+        workers = {}
+
+        def download_video(video_id, extractor):  # noqa: ARG001
+            workers[video_id] = threading.get_ident()
+            time.sleep(durations.get(video_id, 0.01))
+            return video_id != "failing"
+
+        monkeypatch.setattr(scraper, "download_video", download_video)
+        for name, result in (
+            ("process_video", True),
+            ("download_thumbnail", True),
+            ("download_subtitles", None),
+            ("generate_chapters_vtt", None),
+        ):
+            monkeypatch.setattr(scraper, name, lambda *_, result=result: result)
+        return scraper, workers
+
+    return make
+
+
+def test_download_video_files_shared_queue(pipeline_scraper):
+    videos_ids = ["long", *(f"v{index}" for index in range(9)), "failing"]
+    scraper, workers = pipeline_scraper(videos_ids, {"long": 0.3}, 2)
+    succeeded, failed = scraper.download_video_files(max_concurrency=2)
+    assert sorted(succeeded) == sorted(videos_ids[:-1])
+    assert failed == ["failing"]
+    assert scraper.videos_processed == len(videos_ids)
+    # the worker busy with the long video did not get any other one
+    assert list(workers.values()).count(workers["long"]) == 1
+
+
+def test_download_video_files_without_videos(pipeline_scraper):
+    scraper, _ = pipeline_scraper([], {})
+    assert scraper.download_video_files(max_concurrency=2) == ([], [])
+
+
+def test_skip_videos_without_details(make_scraper):
+    scraper: Youtube2Zim = make_scraper()
+    scraper.videos_ids = ["a", "b"]
+    scraper.skip_videos_without_details({"b": {"duration_seconds": 1}})
+    assert (scraper.videos_ids, scraper.video_ids_count) == (["b"], 1)
+    # over quota budget before any details was retrieved
+    with pytest.raises(Exception, match="No videos to process"):
+        scraper.skip_videos_without_details({})
+
+
+def test_download_video_files_longest_first(pipeline_scraper, monkeypatch):
+    processed = []
+    scraper, _ = pipeline_scraper(["short", "unknown", "long"], {})
+    scraper.videos_costs = {"short": 10, "long": 100}
+    monkeypatch.setattr(
+        scraper,
+        "download_thumbnail",
+        lambda video_id, _: processed.append(video_id) or True,
+    )
+    succeeded, failed = scraper.download_video_files(max_concurrency=1)
+    assert processed == ["long", "short", "unknown"]
+    assert (succeeded, failed) == (["long", "short", "unknown"], [])
+
+
+def test_download_video_files_overlaps_download_and_encode(
+    pipeline_scraper, monkeypatch
+):
+    events = []
+    scraper, _ = pipeline_scraper(["a", "b"], {})
+
+    def process_video(video_id, extractor):  # noqa: ARG001
+        events.append(f"encode {video_id} start")
+        time.sleep(0.2)
+        events.append(f"encode {video_id} end")
+        return True
+
+    def download_video(video_id, extractor):  # noqa: ARG001
+        events.append(f"download {video_id}")
+        return True
+
+    monkeypatch.setattr(scraper, "process_video", process_video)
+    monkeypatch.setattr(scraper, "download_video", download_video)
+    scraper.download_video_files(max_concurrency=1)
+    # b is downloaded while a is being encoded
+    assert events.index("download b") < events.index("encode a end")
+
+
+def test_resume_skips_completed_stages(make_scraper, monkeypatch):
+    """video and thumbnail kept by an interrupted run are added without download"""
+    scraper: Youtube2Zim = make_scraper()
+    scraper.prepare_build_folder()
+    added = []
+    monkeypatch.setattr(
+        scraper, "add_file_to_zim", lambda path, *_, **__: added.append(path)
+    )
+    # extractor is not to be used for completed stages
+    extractor = VideoInfoExtractor({"y2z_videos_dir": scraper.videos_dir})
+    video_dir = scraper.videos_dir / "vid"
+    video_dir.mkdir(parents=True)
+    for name in ("video.webm", "video.webp"):
+        video_dir.joinpath(name).touch()
+    scraper.journal.mark("vid", "encoded", value="videos/vid/video.webm")
+    scraper.journal.mark("vid", "thumbnail")
+
+    assert scraper.download_video("vid", extractor)
+    assert scraper.process_video("vid", extractor)
+    assert scraper.download_thumbnail("vid", extractor)
+    assert scraper.videos_zim_path == {"vid": "videos/vid/video.webm"}
+    assert added == ["videos/vid/video.webm", "videos/vid/video.webp"]
+
+
+def test_local_cache_without_s3(make_scraper, tmp_path):
+    scraper: Youtube2Zim = make_scraper(local_cache_dir=tmp_path / "cache")
+    video_path = tmp_path / "build" / "video.webm"
+    video_path.parent.mkdir()
+    video_path.write_bytes(b"video")
+    dest_path = tmp_path / "rebuild" / "video.webm"
+    assert scraper.upload_to_cache("webm/high/vid", video_path, 2)
+    assert scraper.download_from_cache("webm/high/vid", dest_path, 2)
+    assert not scraper.download_from_cache("webm/high/vid", dest_path, 3)
+    assert dest_path.read_bytes() == b"video"
+
+
+def test_work_dir_builds_in_own_subfolder(make_scraper, tmp_path):
+    work_dir = tmp_path / "home"
+    work_dir.mkdir()
+    work_dir.joinpath("notes.txt").write_text("user file")
+    scraper: Youtube2Zim = make_scraper(work_dir=work_dir)
+    # build folder (removed once ZIM is complete) is never the user's folder
+    assert scraper.build_dir == work_dir / "youtube2zim-build"
+    assert scraper.build_dir.is_dir()
+    assert work_dir.joinpath("notes.txt").read_text() == "user file"
+
+
+def test_work_dir_reset_for_another_collection(make_scraper, tmp_path):
+    previous: Youtube2Zim = make_scraper(work_dir=tmp_path / "work")
+    previous.prepare_build_folder()
+    save_json(previous.cache_dir, "videos", ["vid"])
+    previous.videos_dir.joinpath("vid").mkdir()
+    close_stores()
+
+    scraper: Youtube2Zim = make_scraper(work_dir=tmp_path / "work")
+    scraper.prepare_build_folder()
+    assert not scraper.journal.options_changed
+    assert load_json(scraper.cache_dir, "videos") == ["vid"]
+    close_stores()
+
+    scraper = make_scraper(work_dir=tmp_path / "work", youtube_id="PLa,PLb")
+    scraper.prepare_build_folder()
+    assert scraper.journal.options_changed
+    assert load_json(scraper.cache_dir, "videos") is None
+    assert not scraper.videos_dir.joinpath("vid").exists()
+
+
+def test_subtitles_kept_for_zim_when_uploaded_first(
+    make_scraper, tmp_path, monkeypatch
+):
+    scraper: Youtube2Zim = make_scraper(local_cache_dir=tmp_path / "cache")
+    scraper.prepare_build_folder()
+    langs = [f"l{index}" for index in range(8)]
+    video_dir = scraper.videos_dir / "vid"
+    video_dir.mkdir(parents=True)
+    for lang in langs:
+        video_dir.joinpath(f"video.{lang}.vtt").write_text("WEBVTT")
+    extractor = VideoInfoExtractor({"y2z_videos_dir": scraper.videos_dir})
+    monkeypatch.setattr(extractor, "process", lambda *_, **__: None)
+    monkeypatch.setattr(
+        scraper,
+        "fetch_video_subtitles_list",
+        lambda _: Subtitles(
+            subtitles=[Subtitle(code=lang, name=lang) for lang in langs]
+        ),
+    )
+    # uploads complete (and release their files) while others are being queued
+    scraper.uploads = UploadQueue(lambda *_: True, workers=2)
+    added = []
+
+    def add_file_to_zim(path, fpath, callback):
+        added.append((path, fpath.exists()))
+        callback.call()
+
+    monkeypatch.setattr(scraper, "add_file_to_zim", add_file_to_zim)
+    scraper.download_subtitles("vid", extractor)
+    scraper.uploads.close()
+    assert sorted(added) == [(f"videos/vid/video.{lang}.vtt", True) for lang in langs]
+    # files are deleted once both uploaded and added to ZIM
+    assert not list(video_dir.iterdir())
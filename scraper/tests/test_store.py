@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from youtube2zim.store import MetadataStore
+from youtube2zim.utils import close_stores, load_json, open_store, save_json
+
+
+def test_store_get_set_delete(tmp_path):
+    store = MetadataStore(tmp_path / "metadata.sqlite3")
+    assert store.get("videos", "abc") is None
+    store.set("videos", "abc", {"id": "abc"})
+    store.set("playlists", "abc", [1, 2])
+    assert store.get("videos", "abc") == {"id": "abc"}
+    assert store.get("playlists", "abc") == [1, 2]
+    store.delete("videos", "abc")
+    assert store.get("videos", "abc") is None
+    store.close()
+
+
+def test_store_ttl(tmp_path):
+    store = MetadataStore(tmp_path / "metadata.sqlite3")
+    store.set("videos", "expired", {}, ttl=-1)
+    store.set("videos", "valid", {}, ttl=3600)
+    assert store.get("videos", "expired") is None
+    assert store.get("videos", "valid") == {}
+    store.set("videos", "expired", {}, ttl=-1)
+    assert store.purge_expired() == 1
+    store.close()
+
+
+def test_store_threads(tmp_path):
+    store = MetadataStore(tmp_path / "metadata.sqlite3")
+
+    def write(idx):
+        for key in range(20):
+            store.set(f"thread{idx}", str(key), key)
+
+    threads = [threading.Thread(target=write, args=(idx,)) for idx in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(store.get(f"thread{idx}", "19") == 19 for idx in range(4))
+    store.close()
+
+
+def test_json_helpers_use_root_store(tmp_path):
+    open_store(tmp_path)
+    save_json(tmp_path / "videos", "abc", {"id": "abc"})
+    assert load_json(tmp_path / "videos", "abc") == {"id": "abc"}
+    assert load_json(tmp_path, "abc") is None
+    assert not (tmp_path / "videos").exists()
+    close_stores()
+    # persisted across runs
+    open_store(tmp_path)
+    assert load_json(tmp_path / "videos", "abc") == {"id": "abc"}
+    close_stores()
+
+
+def test_json_helpers_require_open_store(tmp_path):
+    with pytest.raises(ValueError):
+        load_json(tmp_path / "videos", "abc")
+    assert not (tmp_path / "metadata.sqlite3").exists()
+
+
+def test_load_json_unreadable_record(tmp_path):
+    store = open_store(tmp_path)
+    store.connection.execute(
+        "INSERT INTO records (namespace, key, data) VALUES ('.', 'abc', '{')"
+    )
+    store.connection.commit()
+    assert load_json(tmp_path, "abc") is None
+    close_stores()
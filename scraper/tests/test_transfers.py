@@ -0,0 +1,83 @@
+import os
+
+import pytest
+from contrib.fake_s3 import FakeS3, FakeS3Server
+
+from youtube2zim.s3index import S3CacheIndex
+from youtube2zim.transfers import (
+    MIN_POOL_SIZE,
+    MIN_S3_CHUNK_SIZE,
+    TunedStorage,
+    get_pool_size,
+)
+
+
+@pytest.fixture
+def s3_server():
+    with FakeS3Server(FakeS3()) as server:
+        yield server
+
+
+@pytest.fixture
+def fake_s3(s3_server):
+    return s3_server.s3
+
+
+@pytest.fixture
+def storage(s3_server):
+    return TunedStorage(
+        s3_server.url, chunk_size=MIN_S3_CHUNK_SIZE, concurrency=4, pool_size=8
+    )
+
+
+def test_pool_size():
+    assert get_pool_size(8, 5) == 40
+    assert get_pool_size(1, 2) == MIN_POOL_SIZE
+
+
+def test_storage_config(storage):
+    assert storage.client.meta.config.max_pool_connections == 8
+    assert storage.transfer_config.multipart_chunksize == MIN_S3_CHUNK_SIZE
+    assert storage.transfer_config.max_concurrency == 4
+
+
+def test_multipart_transfers(fake_s3, storage, tmp_path):
+    data = os.urandom(MIN_S3_CHUNK_SIZE * 2 + 1024)
+    src_path = tmp_path / "video.webm"
+    src_path.write_bytes(data)
+
+    storage.upload_file(src_path, "webm/high/vid", meta={"encoder_version": "v3"})
+    assert fake_s3.stats()["requests"]["PUT part"] == 3
+    assert storage.has_object_matching_meta(
+        "webm/high/vid", tag="encoder_version", value="v3"
+    )
+
+    dest_path = tmp_path / "downloaded.webm"
+    fake_s3.reset_stats()
+    storage.download_file("webm/high/vid", dest_path)
+    assert fake_s3.stats()["requests"]["GET range"] == 3
+    assert dest_path.read_bytes() == data
+
+
+def test_small_object_single_request(fake_s3, storage, tmp_path):
+    src_path = tmp_path / "thumbnail.webp"
+    src_path.write_bytes(b"thumbnail")
+    storage.upload_file(src_path, "thumbnails/high/vid")
+    storage.download_file("thumbnails/high/vid", tmp_path / "downloaded.webp")
+    requests = fake_s3.stats()["requests"]
+    assert requests["PUT"] == 1
+    assert "PUT part" not in requests
+    assert (tmp_path / "downloaded.webp").read_bytes() == b"thumbnail"
+
+
+def test_index_listing(storage, tmp_path):
+    src_path = tmp_path / "subtitles.vtt"
+    src_path.write_bytes(b"WEBVTT")
+    for index in range(3):
+        storage.upload_file(src_path, f"subtitles/vid{index}/en")
+    index = S3CacheIndex(storage, ["subtitles/", "chapters/"])
+    assert index.build() == 3
+    info = index.get("subtitles/vid1/en")
+    assert info is not None
+    assert info.size == len(b"WEBVTT")
+    assert index.is_indexed("chapters/vid1")
@@ -0,0 +1,70 @@
+import threading
+
+from youtube2zim.uploads import FileRefs, UploadQueue
+
+
+def test_file_deleted_after_last_release(tmp_path):
+    fpath = tmp_path / "video.webm"
+    fpath.write_bytes(b"data")
+    refs = FileRefs()
+    refs.acquire(fpath)
+    callback = refs.callback(fpath)
+    callback.call()
+    assert fpath.exists()
+    refs.release(fpath)
+    assert not fpath.exists()
+
+
+def test_upload_retried_then_file_released(tmp_path):
+    fpath = tmp_path / "video.webm"
+    fpath.write_bytes(b"data")
+    attempts = []
+
+    def upload(key, fpath, version):
+        attempts.append((key, fpath.exists(), version))
+        return len(attempts) == 2
+
+    uploads = UploadQueue(upload, workers=1, backoff=0)
+    uploads.submit("webm/high/vid", fpath, "v1")
+    uploads.flush()
+    uploads.close()
+    assert attempts == [("webm/high/vid", True, "v1")] * 2
+    assert uploads.failed == 0
+    # only reference was the upload's
+    assert not fpath.exists()
+
+
+def test_failed_uploads_counted(tmp_path):
+    def upload(*_):
+        raise OSError("unreachable")
+
+    uploads = UploadQueue(upload, workers=2, retries=1, backoff=0)
+    for index in range(3):
+        fpath = tmp_path / f"file{index}"
+        fpath.write_bytes(b"data")
+        uploads.submit(f"key{index}", fpath)
+    uploads.close()
+    assert uploads.failed == 3
+
+
+def test_flush_waits_for_pending_uploads(tmp_path):
+    started = threading.Event()
+    proceed = threading.Event()
+    done = []
+
+    def upload(key, _):
+        started.set()
+        proceed.wait()
+        done.append(key)
+        return True
+
+    fpath = tmp_path / "thumbnail.webp"
+    fpath.write_bytes(b"data")
+    uploads = UploadQueue(upload, workers=1)
+    uploads.submit("thumbnails/high/vid", fpath)
+    started.wait()
+    assert not done
+    proceed.set()
+    uploads.flush()
+    assert done == ["thumbnails/high/vid"]
+    uploads.close()
@@ -0,0 +1,70 @@
+import datetime
+import threading
+import time
+
+import isodate
+import pytest
+from dateutil import parser as dt_parser
+
+from youtube2zim.utils import (
+    format_duration,
+    map_concurrently,
+    parse_datetime,
+    parse_duration,
+)
+
+
+def test_map_concurrently_keeps_order():
+    def slow_square(value):
+        time.sleep(0.01 * (5 - value))
+        return value * value
+
+    assert map_concurrently(slow_square, range(5), 4) == [0, 1, 4, 9, 16]
+
+
+def test_map_concurrently_uses_threads():
+    threads = set()
+
+    def record(_):
+        threads.add(threading.get_ident())
+        time.sleep(0.05)
+
+    map_concurrently(record, range(4), 4)
+    assert len(threads) > 1
+
+
+def test_map_concurrently_sequential():
+    assert map_concurrently(str, [1, 2], 1) == ["1", "2"]
+
+
+def test_map_concurrently_raises():
+    def fail(value):
+        if value == 2:
+            raise ValueError(value)
+        return value
+
+    with pytest.raises(ValueError):
+        map_concurrently(fail, range(4), 2)
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["PT1M5S", "P0D", "PT0S", "PT1H", "P1DT2H3M4S", "PT15H59M", "P1W", "PT1.5S"],
+)
+def test_parse_duration(value):
+    assert parse_duration(value) == int(isodate.parse_duration(value).total_seconds())
+
+
+@pytest.mark.parametrize("seconds", [0, 5, 60, 65, 3600, 3661, 86400, 90061])
+def test_format_duration(seconds):
+    assert format_duration(seconds) == isodate.duration_isoformat(
+        datetime.timedelta(seconds=seconds)
+    )
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["2024-01-02T03:04:05Z", "2024-01-02T03:04:05.123456Z", "2024-01-02 03:04:05 UTC"],
+)
+def test_parse_datetime(value):
+    assert parse_datetime(value) == dt_parser.parse(value)
@@ -0,0 +1,261 @@
+import pytest
+
+from youtube2zim.api import CHANNELS_API, PLAYLIST_API, VIDEOS_API, api_client
+from youtube2zim.constants import YOUTUBE
+from youtube2zim.utils import close_stores, get_store, open_store
+from youtube2zim.youtube import (
+    MAX_CHANNELS_PER_REQUEST,
+    MAX_PLAYLISTS_PER_REQUEST,
+    MAX_VIDEOS_PER_REQUEST,
+    PLAYLIST_ITEM_PROJECTION,
+    VIDEO_PROJECTION,
+    Playlist,
+    PlaylistNotFoundError,
+    get_channel_criteria,
+    get_channels_json,
+    get_fields,
+    get_playlists_json,
+    get_videos_authors_info,
+    get_videos_json,
+    prune_item,
+)
+
+CHANNEL_ID = "UC8elThf5TGMpQfQc_VE917Q"
+
+
+def playlist_item(playlist_id):
+    return {
+        "id": playlist_id,
+        "snippet": {
+            "title": f"Title {playlist_id}",
+            "description": "",
+            "channelId": "UCxxxx",
+            "channelTitle": "Channel",
+            "publishedAt": "2024-01-01T00:00:00Z",
+        },
+    }
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    YOUTUBE.cache_dir = tmp_path
+    open_store(tmp_path)
+    yield tmp_path
+    close_stores()
+
+
+@pytest.fixture
+def api_requests(monkeypatch):
+    """list of (url, params) of API requests, answering with known playlists"""
+    requests = []
+
+    def fake_get(url, params):
+        requests.append((url, params))
+        assert url == PLAYLIST_API
+        return {
+            "items": [
+                playlist_item(playlist_id)
+                for playlist_id in params["id"].split(",")
+                if not playlist_id.startswith("missing")
+            ]
+        }
+
+    monkeypatch.setattr(api_client, "get", fake_get)
+    return requests
+
+
+def test_get_playlists_json_batches(cache_dir, api_requests):  # noqa: ARG001
+    playlist_ids = [f"PL{idx}" for idx in range(MAX_PLAYLISTS_PER_REQUEST + 1)]
+    playlists_json = get_playlists_json(playlist_ids)
+    assert list(playlists_json.keys()) == playlist_ids
+    assert len(api_requests) == 2
+
+    # all playlists are now cached
+    get_playlists_json(playlist_ids)
+    assert len(api_requests) == 2
+
+
+def test_playlist_from_ids(cache_dir, api_requests):  # noqa: ARG001
+    playlists = Playlist.from_ids(["PL2", "PL1"])
+    assert [playlist.playlist_id for playlist in playlists] == ["PL2", "PL1"]
+    assert playlists[0].title == "Title PL2"
+    assert len(api_requests) == 1
+
+    with pytest.raises(PlaylistNotFoundError):
+        Playlist.from_ids(["PL1", "missing1"])
+
+
+@pytest.mark.parametrize(
+    "channel_id, expected",
+    [
+        (CHANNEL_ID, ["id", "forHandle"]),
+        ("@openZIM_testing", ["forHandle"]),
+        ("Vsauce", ["forHandle", "forUsername"]),
+    ],
+)
+def test_get_channel_criteria(channel_id, expected):
+    assert get_channel_criteria(channel_id) == expected
+
+
+def test_get_channels_json_batches(cache_dir, monkeypatch):  # noqa: ARG001
+    requests = []
+
+    def fake_get(url, params):
+        requests.append(params)
+        assert url == CHANNELS_API
+        if "id" in params:
+            return {
+                "items": [
+                    {"id": channel_id, "snippet": {}}
+                    for channel_id in params["id"].split(",")
+                ]
+            }
+        return {"items": [{"id": CHANNEL_ID, "snippet": {}}]}
+
+    monkeypatch.setattr(api_client, "get", fake_get)
+    channel_ids = [f"UC{idx:022d}" for idx in range(MAX_CHANNELS_PER_REQUEST + 1)] + [
+        "@handle"
+    ]
+    channels_json = get_channels_json(channel_ids)
+    assert all(channels_json.values())
+    # two batches of IDs and one request for the handle
+    assert len(requests) == 3
+    assert requests[-1] == {"forHandle": "@handle", "part": requests[-1]["part"]}
+
+    get_channels_json(channel_ids)
+    assert len(requests) == 3
+
+
+def playlist_items_page(videos_ids):
+    return [
+        {
+            "snippet": {"position": position, "title": video_id},
+            "contentDetails": {"videoId": video_id},
+        }
+        for position, video_id in enumerate(videos_ids)
+    ]
+
+
+def test_get_videos_json_incremental(cache_dir, monkeypatch):
+    monkeypatch.setattr(YOUTUBE, "cache_dir", cache_dir / "run1", raising=False)
+    monkeypatch.setattr(YOUTUBE, "api_cache_dir", cache_dir / "persistent")
+    YOUTUBE.cache_dir.mkdir()
+    pages = {
+        None: {"items": playlist_items_page(["v3", "v2"]), "nextPageToken": "p2"},
+        "p2": {"items": playlist_items_page(["v1"])},
+    }
+    requests = []
+
+    def fake_get(url, params, *, discovery=False):  # noqa: ARG001
+        requests.append(params["pageToken"])
+        return pages[params["pageToken"]]
+
+    monkeypatch.setattr(api_client, "get", fake_get)
+    items = list(get_videos_json("UULFxxxx"))
+    assert [item["contentDetails"]["videoId"] for item in items] == ["v3", "v2", "v1"]
+    assert requests == [None, "p2"]
+
+    # a new video was published ; pagination stops at first known video
+    monkeypatch.setattr(YOUTUBE, "cache_dir", cache_dir / "run2")
+    YOUTUBE.cache_dir.mkdir()
+    pages[None] = {"items": playlist_items_page(["v4", "v3"]), "nextPageToken": "p2"}
+    requests.clear()
+    items = list(get_videos_json("UULFxxxx"))
+    assert [item["contentDetails"]["videoId"] for item in items] == [
+        "v4",
+        "v3",
+        "v2",
+        "v1",
+    ]
+    assert [item["snippet"]["position"] for item in items] == [0, 1, 2, 3]
+    assert requests == [None]
+
+
+def test_get_videos_json_resumes_pagination(cache_dir, monkeypatch):  # noqa: ARG001
+    pages = {
+        None: {"items": playlist_items_page(["v3", "v2"]), "nextPageToken": "p2"},
+        "p2": {"items": playlist_items_page(["v1"])},
+    }
+    requests = []
+
+    def fake_get(url, params, *, discovery=False):  # noqa: ARG001
+        requests.append(params["pageToken"])
+        if params["pageToken"] == "p2" and requests.count("p2") == 1:
+            raise ConnectionError("interrupted")
+        return pages[params["pageToken"]]
+
+    monkeypatch.setattr(api_client, "get", fake_get)
+    with pytest.raises(ConnectionError):
+        get_videos_json("PLxxxx")
+    items = list(get_videos_json("PLxxxx"))
+    assert [item["contentDetails"]["videoId"] for item in items] == ["v3", "v2", "v1"]
+    assert requests == [None, "p2", "p2"]
+
+    # complete collection is not requested again
+    assert len(list(get_videos_json("PLxxxx"))) == 3
+    assert len(requests) == 3
+
+
+def test_get_fields():
+    assert get_fields(VIDEO_PROJECTION) == (
+        "etag,nextPageToken,"
+        "items(id,snippet(channelId,channelTitle),contentDetails(duration))"
+    )
+
+
+def test_prune_item():
+    item = {
+        "kind": "youtube#playlistItem",
+        "snippet": {
+            "title": "title",
+            "description": "",
+            "position": 0,
+            "publishedAt": "2024-01-01T00:00:00Z",
+            "thumbnails": {"default": {}},
+        },
+        "contentDetails": {"videoId": "v1"},
+        "status": {"privacyStatus": "public"},
+    }
+    assert prune_item(item, PLAYLIST_ITEM_PROJECTION) == {
+        "snippet": {
+            "title": "title",
+            "description": "",
+            "position": 0,
+            "publishedAt": "2024-01-01T00:00:00Z",
+        },
+        "contentDetails": {"videoId": "v1"},
+        "status": {"privacyStatus": "public"},
+    }
+
+
+def test_get_videos_authors_info_cached_per_video(cache_dir, monkeypatch):
+    monkeypatch.setattr(YOUTUBE, "api_cache_dir", None)
+    requests = []
+
+    def fake_get(url, params):
+        assert url == VIDEOS_API
+        requests.append(params["id"])
+        return {
+            "items": [
+                {
+                    "id": video_id,
+                    "snippet": {"channelId": CHANNEL_ID, "channelTitle": "Channel"},
+                    "contentDetails": {"duration": "PT1M5S"},
+                }
+                for video_id in params["id"].split(",")
+            ]
+        }
+
+    monkeypatch.setattr(api_client, "get", fake_get)
+    videos_ids = [f"v{idx}" for idx in range(MAX_VIDEOS_PER_REQUEST * 2 + 1)]
+    items = get_videos_authors_info(videos_ids, concurrency=3)
+    assert list(items.keys()) == videos_ids
+    assert items["v0"]["duration_seconds"] == 65
+    assert len(requests) == 3
+
+    # videos are cached individually: only missing ones are requested
+    store, namespace = get_store(cache_dir)
+    store.delete(namespace, "videos_details")
+    items = get_videos_authors_info(["vnew", *videos_ids[1:]], concurrency=3)
+    assert list(items.keys()) == ["vnew", *videos_ids[1:]]
+    assert requests[3:] == ["vnew"]